@@ -0,0 +1,175 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+
+import aiohttp
+
+from bench import latency_summary
+
+
+# ------------------------------------------------------------------------------
+# Micro-batching latency / throughput tradeoff
+#
+# Starts Processor/async_processor.py once per batch window (result cache
+# off), drives it with `--concurrency` clients sending free-text queries
+# back to back, and reports throughput, p50/p99 latency and the mean batch
+# size the server formed. The max_batch=1 row is the unbatched baseline.
+#
+#     python batch_load.py --windows 0,1,2,5,10 --concurrency 32
+#     python batch_load.py --corpus data/synthetic_100000_s0.jsonl \
+#         --index data/synthetic_100000_s0_index/quotes.idx
+# ------------------------------------------------------------------------------
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SERVER = os.path.join(BENCH_DIR, "../Processor/async_processor.py")
+sys.path.insert(0, os.path.join(BENCH_DIR, "../Indexer"))
+
+from sources import find_corpus, iter_records  # noqa: E402
+
+
+def sample_queries(corpus_path, count, seed=0):
+    """1-3 word queries cut from random quotes of the corpus."""
+    rng = random.Random(seed)
+    texts = [quote for quote, _, _ in iter_records(corpus_path)]
+    queries = []
+    while len(queries) < count:
+        words = [w.strip(".,;:!?\"'") for w in rng.choice(texts).split()]
+        words = [w for w in words if len(w) > 2]
+        if words:
+            n = rng.randint(1, min(3, len(words)))
+            queries.append(" ".join(rng.sample(words, n)))
+    return queries
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def wait_ready(session, url, timeout=120):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            async with session.get(url + "/batching") as response:
+                if response.status == 200:
+                    return
+        except aiohttp.ClientError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError(f"Server at {url} did not start.")
+
+
+async def drive(url, queries, concurrency, top_k):
+    """Send every query once from `concurrency` clients; per-request latencies."""
+    latencies = []
+    pending = iter(queries)
+
+    async def client(session):
+        for q in pending:
+            started = time.perf_counter()
+            async with session.post(url + "/query", json={"query": q, "top_k": top_k}) as r:
+                await r.read()
+                if r.status != 200:
+                    raise RuntimeError(f"/query {q!r} -> {r.status}")
+            latencies.append(time.perf_counter() - started)
+
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        await wait_ready(session, url)
+        # Warm up the server (first transform, lazy structures)
+        for q in queries[:10]:
+            async with session.post(url + "/query", json={"query": q}) as r:
+                await r.read()
+        async with session.get(url + "/batching") as r:
+            before = await r.json()
+
+        started = time.perf_counter()
+        await asyncio.gather(*(client(session) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+        async with session.get(url + "/batching") as r:
+            after = await r.json()
+
+    batches = after["batches"] - before["batches"]
+    batched = after["requests"] - before["requests"]
+    return latencies, elapsed, (batched / batches if batches else 0.0)
+
+
+def run_window(window_ms, max_batch, queries, args, env):
+    port = free_port()
+    cmd = [sys.executable, SERVER, "--port", str(port), "--window-ms", str(window_ms),
+           "--max-batch", str(max_batch), "--workers", str(args.workers)]
+    server = subprocess.Popen(cmd, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        latencies, elapsed, mean_batch = asyncio.run(
+            drive(f"http://127.0.0.1:{port}", queries, args.concurrency, args.top_k)
+        )
+    finally:
+        server.terminate()
+        server.wait()
+
+    row = {
+        "window_ms": window_ms,
+        "max_batch": max_batch,
+        "concurrency": args.concurrency,
+        "requests": len(latencies),
+        "throughput_qps": len(latencies) / elapsed,
+        "mean_batch_size": mean_batch,
+    }
+    row.update(latency_summary(latencies))
+    return row
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Batch window latency/throughput sweep.")
+    parser.add_argument("--windows", default="0,1,2,5,10", help="batch windows in ms")
+    parser.add_argument("--max-batch", type=int, default=64)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--corpus", help="crawl output / synthetic JSONL (default: the crawl)")
+    parser.add_argument("--index", help="quotes.idx built from --corpus")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default="batch_results.json")
+    args = parser.parse_args(argv)
+
+    corpus = os.path.abspath(args.corpus) if args.corpus else find_corpus(
+        os.path.join(BENCH_DIR, "..")
+    )
+    env = dict(os.environ, QUOTES_CACHE_SIZE="0", QUOTES_CORPUS_FILE=corpus)
+    if args.index:
+        env["QUOTES_INDEX_FILE"] = os.path.abspath(args.index)
+
+    queries = sample_queries(corpus, args.requests, args.seed)
+    windows = [float(w) for w in args.windows.split(",") if w.strip()]
+
+    rows = [run_window(0.0, 1, queries, args, env)]
+    for window in windows:
+        rows.append(run_window(window, args.max_batch, queries, args, env))
+
+    for row in rows:
+        print(f"[batch] window {row['window_ms']:>5.1f} ms  max {row['max_batch']:>3}  "
+              f"{row['throughput_qps']:8.1f} q/s  p50 {row['p50_ms']:7.2f} ms  "
+              f"p99 {row['p99_ms']:7.2f} ms  batch {row['mean_batch_size']:.1f}", file=sys.stderr)
+
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "corpus": corpus,
+        "cpu_count": os.cpu_count(),
+        "results": rows,
+    }
+    with open(args.out, "w", encoding="utf-8") as fp:
+        json.dump(report, fp, indent=2)
+    print(f"[batch] results -> {args.out}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,350 @@
+import argparse
+import contextlib
+import gc
+import io
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from synthetic import SyntheticCorpus
+
+
+# ------------------------------------------------------------------------------
+# Scaling benchmark
+#
+# For each corpus size a fresh worker process (so peak RSS is per size):
+#     1. writes the synthetic corpus (cached under --data-dir)
+#     2. times parsing the crawl output (JSONL, and the legacy HTML if asked)
+#     3. times QuoteIndexer building quotes.idx / quotes.postings
+#     4. times fitting the LSA projection + IVF index (quotes.lsa)
+#     5. loads the Flask processor on that index (result cache off) and times
+#        /query for free-text (exhaustive, WAND, LSA), tag-filtered and
+#        Boolean queries, plus resolve_boolean and process_csv_queries.rank_docs
+#        called directly, and query vectorization by TfidfVectorizer
+#        (encode_sklearn) vs QueryEncoder (encode); lsa_recall is the share
+#        of the exhaustive top-k that engine="lsa" also returns
+#
+#     python bench.py --sizes 1e3,1e4,1e5 --out bench_results.json
+#     python bench.py --sizes 1e3,1e4 --baseline old.json   # exit 1 on regression
+#
+# peak_rss_mb values are ru_maxrss read after each stage, i.e. the peak so
+# far in that worker.
+# ------------------------------------------------------------------------------
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+INDEXER_DIR = os.path.join(BENCH_DIR, "../Indexer")
+PROCESSOR_DIR = os.path.join(BENCH_DIR, "../Processor")
+
+RESULTS_VERSION = 1
+DEFAULT_SIZES = "1e3,1e4,1e5"
+# Metrics checked against --baseline (lower is better for all of them)
+COMPARED = {"parse_s", "build_s", "lsa_build_s", "load_s", "index_bytes", "peak_rss_mb",
+            "p50_ms", "p99_ms"}
+RECALL_K = 10
+
+
+def parse_sizes(value):
+    return [int(float(s)) for s in value.split(",") if s.strip()]
+
+
+def peak_rss_mb():
+    # ru_maxrss is KB on Linux, bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1 << 20) if sys.platform == "darwin" else rss / 1024
+
+
+def latency_summary(samples):
+    ms = np.asarray(samples, dtype=np.float64) * 1000
+    return {
+        "count": int(len(ms)),
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p99_ms": float(np.percentile(ms, 99)),
+        "mean_ms": float(ms.mean()),
+    }
+
+
+def timed(fn, items, warmup=5):
+    """Per-call latencies of fn(item) over `items` (first few run untimed)."""
+    for item in items[:warmup]:
+        fn(item)
+    samples = []
+    for item in items:
+        started = time.perf_counter()
+        fn(item)
+        samples.append(time.perf_counter() - started)
+    return latency_summary(samples)
+
+
+# ----------------------------------------------------------------------
+# Worker: one corpus size
+# ----------------------------------------------------------------------
+
+def run_size(size, seed, num_queries, data_dir, with_html, shards=0):
+    sys.path.insert(0, INDEXER_DIR)
+    from sources import iter_records
+
+    result = {"size": size, "seed": seed}
+    corpus = SyntheticCorpus(size, seed=seed)
+    result["vocab_size"] = corpus.vocab_size
+    result["authors"] = len(corpus.authors)
+    result["tags"] = len(corpus.tags)
+
+    # 1. corpus
+    os.makedirs(data_dir, exist_ok=True)
+    stem = os.path.join(data_dir, f"synthetic_{size}_s{seed}")
+    jsonl_path = stem + ".jsonl"
+    if not os.path.exists(jsonl_path):
+        corpus.write_jsonl(jsonl_path + ".tmp")
+        os.replace(jsonl_path + ".tmp", jsonl_path)
+    result["corpus_bytes"] = {"jsonl": os.path.getsize(jsonl_path)}
+
+    # 2. parse
+    parse_s = {}
+    paths = {"jsonl": jsonl_path}
+    if with_html:
+        paths["html"] = stem + ".html"
+        if not os.path.exists(paths["html"]):
+            corpus.write_html(paths["html"] + ".tmp")
+            os.replace(paths["html"] + ".tmp", paths["html"])
+        result["corpus_bytes"]["html"] = os.path.getsize(paths["html"])
+    for fmt, path in paths.items():
+        started = time.perf_counter()
+        count = sum(1 for _ in iter_records(path))
+        parse_s[fmt] = time.perf_counter() - started
+        if count != size:
+            raise RuntimeError(f"Parsed {count} of {size} quotes from {path}.")
+    result["parse_s"] = parse_s
+    result["peak_rss_mb"] = {"parse": peak_rss_mb()}
+
+    # 3. index build (QuoteIndexer writes into the current directory)
+    from Indexer import QuoteIndexer
+
+    index_dir = stem + "_index"
+    os.makedirs(index_dir, exist_ok=True)
+    cwd = os.getcwd()
+    os.chdir(index_dir)
+    try:
+        started = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            indexer = QuoteIndexer([jsonl_path])
+        result["build_s"] = time.perf_counter() - started
+        result["terms"] = len(indexer.index)
+    finally:
+        os.chdir(cwd)
+    result["peak_rss_mb"]["build"] = peak_rss_mb()
+
+    # 4. LSA projection + IVF index
+    from index_store import corpus_checksum
+    from lsa import build_lsa
+
+    lsa_file = os.path.join(index_dir, "quotes.lsa")
+    started = time.perf_counter()
+    build_lsa(indexer.doc_vectors, corpus_checksum([jsonl_path])).save(lsa_file)
+    result["lsa_build_s"] = time.perf_counter() - started
+    result["peak_rss_mb"]["lsa"] = peak_rss_mb()
+    del indexer
+    gc.collect()
+
+    index_file = os.path.join(index_dir, "quotes.idx")
+    result["index_bytes"] = {
+        "idx": os.path.getsize(index_file),
+        "postings": os.path.getsize(os.path.join(index_dir, "quotes.postings")),
+        "lsa": os.path.getsize(lsa_file),
+    }
+
+    # 5. queries against the processor
+    os.environ["QUOTES_CORPUS_FILE"] = jsonl_path
+    os.environ["QUOTES_INDEX_FILE"] = index_file
+    os.environ["QUOTES_LSA_FILE"] = lsa_file
+    os.environ["QUOTES_CACHE_SIZE"] = "0"
+    os.environ["QUOTES_SHARDS"] = str(shards)
+    sys.path.insert(0, PROCESSOR_DIR)
+
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        import flask_processor
+        from process_csv_queries import rank_docs
+    result["load_s"] = time.perf_counter() - started
+
+    client = flask_processor.app.test_client()
+    snap = flask_processor.INDEX.current
+    workload = corpus.queries(num_queries)
+
+    def post(body):
+        response = client.post("/query", json=body)
+        if response.status_code != 200:
+            raise RuntimeError(f"/query {body} -> {response.status_code}")
+
+    free_text = workload["free_text"]
+    result["queries"] = {
+        "free_text": timed(lambda q: post({"query": q}), free_text),
+        "free_text_wand": timed(lambda q: post({"query": q, "engine": "wand"}), free_text),
+        "free_text_lsa": timed(lambda q: post({"query": q, "engine": "lsa"}), free_text),
+        "free_text_facets": timed(lambda q: post({"query": q, "facets": 10}), free_text),
+        "tag_filtered": timed(
+            lambda qt: post({"query": qt[0], "tag_filter": qt[1]}), workload["tag_filtered"]
+        ),
+        "tag_field": timed(
+            lambda qt: post({"query": f'{qt[0]} tag:"{qt[1][0]}"'}), workload["tag_filtered"]
+        ),
+        "boolean": timed(lambda q: post({"query": q}), workload["boolean"]),
+        "resolve_boolean": timed(flask_processor.resolve_boolean, workload["boolean"]),
+        "rank_docs": timed(
+            lambda q: rank_docs(snap.query_encoder, snap.matrix, q, top_k=5),
+            free_text,
+        ),
+        "encode_sklearn": timed(lambda q: snap.tfidf.transform([q]), free_text),
+        "encode": timed(lambda q: snap.query_encoder.transform([q]), free_text),
+    }
+    result["lsa_recall"] = lsa_recall(snap, free_text, RECALL_K)
+    result["peak_rss_mb"]["queries"] = peak_rss_mb()
+    return result
+
+
+def lsa_recall(snap, queries, k):
+    """Mean share of the exhaustive top-k that the LSA engine also returns."""
+    from ranking import score_rows, select_top_k
+
+    lsa = snap.lsa_index()
+    recalls = []
+    for q in queries:
+        q_vec = snap.query_encoder.transform([q])
+        exact, _ = select_top_k(score_rows(q_vec, snap.matrix), k)
+        if not len(exact):
+            continue
+        approx, _ = lsa.search(q_vec, k, snap.matrix)
+        recalls.append(len(np.intersect1d(exact, approx)) / len(exact))
+    return {
+        "k": k,
+        "queries": len(recalls),
+        "mean": float(np.mean(recalls)) if recalls else None,
+        "min": float(np.min(recalls)) if recalls else None,
+    }
+
+
+# ----------------------------------------------------------------------
+# Regression check
+# ----------------------------------------------------------------------
+
+def flatten(result, path=()):
+    """{"queries.boolean.p99_ms": 1.2, ...}: the leaves under COMPARED keys."""
+    out = {}
+    for key, value in result.items():
+        name = path + (key,)
+        if isinstance(value, dict):
+            out.update(flatten(value, name))
+        elif isinstance(value, (int, float)) and COMPARED.intersection(name):
+            out[".".join(name)] = float(value)
+    return out
+
+
+def compare(current, baseline, tolerance):
+    """Metrics that grew by more than `tolerance` (0.25 = 25%) vs baseline."""
+    before = {r["size"]: flatten(r) for r in baseline["results"]}
+    regressions = []
+    for r in current["results"]:
+        if r["size"] not in before:
+            continue
+        for name, value in flatten(r).items():
+            old = before[r["size"]].get(name)
+            if old and value > old * (1 + tolerance):
+                regressions.append({
+                    "size": r["size"], "metric": name,
+                    "baseline": old, "current": value, "ratio": value / old,
+                })
+    return regressions
+
+
+def git_revision():
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BENCH_DIR,
+            capture_output=True, text=True, check=True,
+        )
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# ----------------------------------------------------------------------
+# MAIN EXECUTION
+# ----------------------------------------------------------------------
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Indexer / Processor scaling benchmark.")
+    parser.add_argument("--sizes", type=parse_sizes, default=parse_sizes(DEFAULT_SIZES),
+                        help=f"comma-separated corpus sizes, 1e3 .. 1e7 (default {DEFAULT_SIZES})")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--queries", type=int, default=200, help="queries per workload")
+    parser.add_argument("--html", action="store_true", help="also time parsing the legacy HTML")
+    parser.add_argument("--shards", type=int, default=0,
+                        help="serve queries from this many shard processes")
+    parser.add_argument("--data-dir", default=os.path.join(BENCH_DIR, "data"))
+    parser.add_argument("--out", default="bench_results.json")
+    parser.add_argument("--baseline", help="earlier results to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed growth before a metric counts as a regression")
+    parser.add_argument("--worker", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker is not None:
+        result = run_size(args.worker, args.seed, args.queries, args.data_dir, args.html,
+                          args.shards)
+        print(json.dumps(result))
+        return 0
+
+    results = []
+    for size in args.sizes:
+        print(f"[bench] {size} quotes ...", file=sys.stderr)
+        cmd = [sys.executable, os.path.abspath(__file__), "--worker", str(size),
+               "--seed", str(args.seed), "--queries", str(args.queries),
+               "--shards", str(args.shards), "--data-dir", args.data_dir]
+        if args.html:
+            cmd.append("--html")
+        out = subprocess.run(cmd, cwd=BENCH_DIR, capture_output=True, text=True)
+        if out.returncode != 0:
+            sys.stderr.write(out.stderr)
+            raise RuntimeError(f"Benchmark worker failed for size {size}.")
+        result = json.loads(out.stdout.strip().splitlines()[-1])
+        q = result["queries"]
+        print(f"[bench] {size}: build {result['build_s']:.2f}s, "
+              f"free-text p50/p99 {q['free_text']['p50_ms']:.2f}/{q['free_text']['p99_ms']:.2f} ms, "
+              f"lsa p50 {q['free_text_lsa']['p50_ms']:.2f} ms recall {result['lsa_recall']['mean']}, "
+              f"rss {result['peak_rss_mb']['queries']:.0f} MB", file=sys.stderr)
+        results.append(result)
+
+    report = {
+        "version": RESULTS_VERSION,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "git_revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "config": {"seed": args.seed, "queries": args.queries, "html": args.html,
+                   "shards": args.shards},
+        "results": results,
+    }
+
+    status = 0
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as fp:
+            report["regressions"] = compare(report, json.load(fp), args.tolerance)
+        for reg in report["regressions"]:
+            print(f"[bench] REGRESSION size={reg['size']} {reg['metric']}: "
+                  f"{reg['baseline']:.4g} -> {reg['current']:.4g} ({reg['ratio']:.2f}x)",
+                  file=sys.stderr)
+        status = 1 if report["regressions"] else 0
+
+    with open(args.out, "w", encoding="utf-8") as fp:
+        json.dump(report, fp, indent=2)
+    print(f"[bench] results -> {args.out}", file=sys.stderr)
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
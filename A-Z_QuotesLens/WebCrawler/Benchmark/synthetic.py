@@ -0,0 +1,234 @@
+import argparse
+import html
+import json
+
+import numpy as np
+from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS
+
+
+# ------------------------------------------------------------------------------
+# Deterministic synthetic quotes corpus
+#
+# Stands in for the crawl output at sizes the real site cannot give us
+# (1e3 .. 1e7 quotes). Everything is drawn from a seeded generator, so the
+# same (size, seed) always produces the same bytes:
+#
+#     words     Zipfian (s=1.07) over a vocabulary that grows with the corpus
+#               (Heaps' law); frequent words are the short ones
+#     length    log-normal, ~12 words per quote
+#     authors   Zipfian (s=1.2): a few prolific authors, a long tail
+#     tags      0-8 per quote (Poisson, mean 2.5), Zipfian over the tag set;
+#               some are two words ("Deep Thought"), all Title Case
+#
+# Words are built from syllables ("kavo", "rinelu", ...), so they survive
+# the vectorizer's stop-word list and token pattern unchanged.
+# ------------------------------------------------------------------------------
+CONSONANTS = "bdfgklmnprstvz"
+VOWELS = "aeiou"
+SYLLABLES = [c + v for c in CONSONANTS for v in VOWELS]
+
+WORD_EXPONENT = 1.07
+AUTHOR_EXPONENT = 1.2
+TAG_EXPONENT = 1.0
+QUERY_EXPONENT = 0.8
+
+CHUNK_SIZE = 50_000
+
+
+def syllable_word(i, min_syllables=2):
+    """The i-th pseudo-word: i written in base len(SYLLABLES)."""
+    parts = []
+    while True:
+        parts.append(SYLLABLES[i % len(SYLLABLES)])
+        i //= len(SYLLABLES)
+        if i == 0 and len(parts) >= min_syllables:
+            break
+    return "".join(reversed(parts))
+
+
+def make_words(count, offset=0):
+    """`count` distinct pseudo-words, skipping any that are stop words."""
+    words = []
+    i = offset
+    while len(words) < count:
+        w = syllable_word(i)
+        if w not in ENGLISH_STOP_WORDS:
+            words.append(w)
+        i += 1
+    return words
+
+
+def zipf_cdf(n, exponent):
+    weights = 1.0 / np.arange(1, n + 1, dtype=np.float64) ** exponent
+    cdf = np.cumsum(weights)
+    return cdf / cdf[-1]
+
+
+def zipf_sample(rng, cdf, size):
+    """Ranks (0-based) drawn from the distribution given by `cdf`."""
+    idx = np.searchsorted(cdf, rng.random(size), side="right")
+    return np.minimum(idx, len(cdf) - 1)
+
+
+class SyntheticCorpus:
+    """
+    A synthetic corpus of `size` quotes. Records are generated lazily in
+    chunks, so even 1e7 quotes are written in bounded memory.
+    """
+
+    def __init__(self, size, seed=0, vocab_size=None, num_authors=None, num_tags=None):
+        self.size = int(size)
+        self.seed = seed
+
+        # Heaps' law: V = K * n^beta (5k words at 1e3 quotes, 500k at 1e7)
+        self.vocab_size = vocab_size or int(5000 * (self.size / 1000) ** 0.5)
+        self.num_authors = num_authors or max(10, self.size // 25)
+        self.num_tags = num_tags or min(50_000, max(50, int(20 * self.size ** 0.5)))
+
+        self.vocab = make_words(self.vocab_size)
+        self._authors = None
+        self._tags = None
+
+    @property
+    def authors(self):
+        if self._authors is None:
+            # First and last names from a block of words the quotes never use
+            names = make_words(2 * int(np.ceil(self.num_authors ** 0.5)) + 2,
+                               offset=10 ** 7)
+            half = len(names) // 2
+            self._authors = [
+                f"{names[i % half].title()} {names[half + i // half].title()}"
+                for i in range(self.num_authors)
+            ]
+        return self._authors
+
+    @property
+    def tags(self):
+        if self._tags is None:
+            rng = np.random.default_rng([self.seed, 1])
+            words = self.vocab[:max(self.num_tags, 2)]
+            tags = []
+            i = 0
+            while len(tags) < self.num_tags:
+                # Roughly one tag in five is a two-word phrase
+                if rng.random() < 0.2:
+                    j = int(rng.integers(len(words)))
+                    tags.append(f"{words[i].title()} {words[j].title()}")
+                else:
+                    tags.append(words[i].title())
+                i += 1
+            self._tags = list(dict.fromkeys(tags))
+        return self._tags
+
+    # ----------------------------------------------------------------------
+
+    def records(self):
+        """Yield (quote, author, tags) for every quote, in order."""
+        word_cdf = zipf_cdf(len(self.vocab), WORD_EXPONENT)
+        author_cdf = zipf_cdf(len(self.authors), AUTHOR_EXPONENT)
+        tag_cdf = zipf_cdf(len(self.tags), TAG_EXPONENT)
+        vocab = np.array(self.vocab, dtype=object)
+
+        start = 0
+        while start < self.size:
+            n = min(CHUNK_SIZE, self.size - start)
+            # Seeded per chunk, so a chunk does not depend on the ones before it
+            rng = np.random.default_rng([self.seed, 2, start])
+
+            lengths = np.clip(np.rint(rng.lognormal(2.4, 0.45, n)), 3, 60).astype(np.int64)
+            words = vocab[zipf_sample(rng, word_cdf, int(lengths.sum()))]
+            authors = zipf_sample(rng, author_cdf, n)
+            tag_counts = np.minimum(rng.poisson(2.5, n), 8)
+            tag_ids = zipf_sample(rng, tag_cdf, int(tag_counts.sum()))
+
+            w = 0
+            t = 0
+            for i in range(n):
+                text = " ".join(words[w:w + lengths[i]])
+                w += lengths[i]
+                picked = dict.fromkeys(tag_ids[t:t + tag_counts[i]].tolist())
+                t += tag_counts[i]
+                yield (
+                    text[0].upper() + text[1:] + ".",
+                    self.authors[authors[i]],
+                    [self.tags[x] for x in picked],
+                )
+            start += n
+
+    def write_jsonl(self, path):
+        """Write the corpus in the crawler's JSONL feed format."""
+        with open(path, "w", encoding="utf-8") as fp:
+            for i, (text, author, tags) in enumerate(self.records()):
+                fp.write(json.dumps({
+                    "text": text,
+                    "author": author,
+                    "tags": tags,
+                    "url": f"https://synthetic.invalid/page/{i // 25 + 1}",
+                }, ensure_ascii=False) + "\n")
+        return path
+
+    def write_html(self, path):
+        """Write the corpus in the legacy quotes_output.html format."""
+        with open(path, "w", encoding="utf-8") as fp:
+            fp.write('<html><head><meta charset="utf-8"><title>Quotes</title></head><body>\n')
+            for text, author, tags in self.records():
+                fp.write(f"""
+                    <p>
+                        <strong>{html.escape(text, quote=False)}</strong><br>
+                        — {html.escape(author, quote=False)}<br>
+                        Tags: {html.escape(", ".join(tags), quote=False)}
+                    </p>
+                    """)
+            fp.write("\n</body></html>\n")
+        return path
+
+    # ----------------------------------------------------------------------
+
+    def queries(self, count, seed=None):
+        """
+        Deterministic query workload drawn from the corpus vocabulary:
+        {"free_text": [...], "tag_filtered": [(query, tags), ...],
+         "boolean": [...]}, `count` of each. Query words follow a flatter
+        Zipf curve than the corpus, so both head and tail terms show up.
+        """
+        rng = np.random.default_rng([self.seed if seed is None else seed, 3])
+        cdf = zipf_cdf(len(self.vocab), QUERY_EXPONENT)
+        tag_cdf = zipf_cdf(len(self.tags), TAG_EXPONENT)
+
+        def words(n):
+            return [self.vocab[i] for i in zipf_sample(rng, cdf, n)]
+
+        free_text = [" ".join(words(int(rng.integers(1, 4)))) for _ in range(count)]
+
+        tag_filtered = []
+        for _ in range(count):
+            tags = [self.tags[i] for i in zipf_sample(rng, tag_cdf, int(rng.integers(1, 3)))]
+            tag_filtered.append((" ".join(words(int(rng.integers(1, 3)))), tags))
+
+        templates = ("{} AND {}", "{} OR {}", "{} AND NOT {}", "({} OR {}) AND {}")
+        boolean = []
+        for _ in range(count):
+            template = templates[int(rng.integers(len(templates)))]
+            boolean.append(template.format(*words(template.count("{}"))))
+
+        return {"free_text": free_text, "tag_filtered": tag_filtered, "boolean": boolean}
+
+
+# ----------------------------------------------------------------------
+# MAIN EXECUTION
+# ----------------------------------------------------------------------
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write a synthetic quotes corpus.")
+    parser.add_argument("size", type=lambda s: int(float(s)), help="number of quotes, e.g. 1e5")
+    parser.add_argument("output", help="output file (.jsonl or .html)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    corpus = SyntheticCorpus(args.size, seed=args.seed)
+    if args.output.endswith(".html"):
+        corpus.write_html(args.output)
+    else:
+        corpus.write_jsonl(args.output)
+    print(f"{args.size} quotes, {corpus.vocab_size} words, {len(corpus.authors)} authors, "
+          f"{len(corpus.tags)} tags -> {args.output}")
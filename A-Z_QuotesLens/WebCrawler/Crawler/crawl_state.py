@@ -0,0 +1,69 @@
+import hashlib
+import json
+import os
+import re
+
+
+# ------------------------------------------------------------------------------
+# State kept between crawls
+#
+#     pages   url -> {"etag", "last_modified", "fingerprint", "next"}
+#             validators for conditional requests, a hash of the body to spot
+#             unchanged pages served without validators, and the next-page
+#             link so pagination continues past a 304 (which has no body)
+#     quotes  hashes of the normalized text of every quote already written
+# ------------------------------------------------------------------------------
+STATE_VERSION = 1
+
+
+def quote_hash(text):
+    """Hash of a quote's text, insensitive to case, spacing and outer punctuation."""
+    norm = re.sub(r"\s+", " ", text.replace("\xa0", " ")).strip().casefold()
+    norm = norm.strip(" \"'“”‘’.,;:!?-—")
+    return hashlib.sha1(norm.encode("utf-8")).hexdigest()
+
+
+def body_fingerprint(body):
+    return hashlib.sha256(body).hexdigest()
+
+
+class CrawlState:
+
+    def __init__(self, path, pages=None, quotes=None):
+        self.path = path
+        self.pages = pages or {}
+        self.quotes = set(quotes or ())
+
+    @classmethod
+    def load(cls, path):
+        """State saved by a previous crawl, or an empty one."""
+        if not path or not os.path.exists(path):
+            return cls(path)
+        with open(path, "r", encoding="utf-8") as fp:
+            data = json.load(fp)
+        if data.get("version") != STATE_VERSION:
+            return cls(path)
+        return cls(path, data.get("pages"), data.get("quotes"))
+
+    def save(self):
+        if not self.path:
+            return
+        data = {
+            "version": STATE_VERSION,
+            "pages": self.pages,
+            "quotes": sorted(self.quotes),
+        }
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as fp:
+            json.dump(data, fp)
+            fp.flush()
+            os.fsync(fp.fileno())
+        os.replace(tmp, self.path)
+
+    def add_quote(self, text):
+        """Record a quote; False when an equivalent one was seen before."""
+        h = quote_hash(text)
+        if h in self.quotes:
+            return False
+        self.quotes.add(h)
+        return True
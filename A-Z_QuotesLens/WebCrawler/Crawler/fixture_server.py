@@ -0,0 +1,97 @@
+import hashlib
+import os
+import sys
+import threading
+from email.utils import formatdate, parsedate_to_datetime
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+
+# ------------------------------------------------------------------------------
+# Local stand-in for the quotes site
+#
+# Serves Crawler/fixtures/ (three paginated listing pages in the azquotes
+# markup) with ETag and Last-Modified headers and answers conditional
+# requests with 304, so a crawl can be exercised offline:
+#
+#     python fixture_server.py 8765
+#     scrapy crawl quote_spider -a start_url=http://127.0.0.1:8765/top_quotes.html
+#     scrapy crawl quote_spider -a start_url=... -a incremental=1
+# ------------------------------------------------------------------------------
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+class FixtureHandler(SimpleHTTPRequestHandler):
+
+    def send_head(self):
+        path = self.translate_path(self.path)
+        if not os.path.isfile(path):
+            return super().send_head()
+
+        with open(path, "rb") as fp:
+            body = fp.read()
+        etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+        mtime = int(os.path.getmtime(path))
+
+        if self._not_modified(etag, mtime):
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return None
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.send_header("Last-Modified", formatdate(mtime, usegmt=True))
+        self.end_headers()
+        return _Body(body)
+
+    def _not_modified(self, etag, mtime):
+        if_none_match = self.headers.get("If-None-Match")
+        if if_none_match is not None:
+            return etag in [t.strip() for t in if_none_match.split(",")]
+
+        since = self.headers.get("If-Modified-Since")
+        if since:
+            try:
+                return mtime <= parsedate_to_datetime(since).timestamp()
+            except (TypeError, ValueError):
+                return False
+        return False
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _Body:
+    """File-like wrapper SimpleHTTPRequestHandler.do_GET can copy from."""
+
+    def __init__(self, data):
+        self.data = data
+
+    def read(self, *args):
+        data, self.data = self.data, b""
+        return data
+
+    def close(self):
+        pass
+
+
+def serve_fixtures(port=0, directory=FIXTURE_DIR):
+    """Start the server in a daemon thread; returns (server, base_url)."""
+    handler = partial(FixtureHandler, directory=directory)
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/"
+
+
+if __name__ == "__main__":
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8765
+    server, url = serve_fixtures(port)
+    print(f"Serving {FIXTURE_DIR} at {url}top_quotes.html (Ctrl+C to stop)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -101,3 +101,23 @@ class CrawlerDownloaderMiddleware:
 
     def spider_opened(self, spider):
         spider.logger.info("Spider opened: %s" % spider.name)
+
+
+class ConditionalRequestMiddleware:
+    """
+    Incremental crawls: send the ETag / Last-Modified saved for a URL as
+    If-None-Match / If-Modified-Since, so unchanged pages come back as an
+    empty 304 instead of a full download.
+    """
+
+    def process_request(self, request, spider):
+        if not getattr(spider, "incremental", False) or spider.state is None:
+            return None
+
+        known = spider.state.pages.get(request.url)
+        if known:
+            if known.get("etag"):
+                request.headers.setdefault("If-None-Match", known["etag"])
+            if known.get("last_modified"):
+                request.headers.setdefault("If-Modified-Since", known["last_modified"])
+        return None
@@ -3,11 +3,280 @@
 # Don't forget to add your pipeline to the ITEM_PIPELINES setting
 # See: https://docs.scrapy.org/en/latest/topics/item-pipeline.html
 
+import html
+import json
+import os
+import queue
+import sys
+import threading
 
 # useful for handling different item types with a single interface
 from itemadapter import ItemAdapter
+from scrapy.exceptions import DropItem
+from twisted.internet.threads import deferToThread
 
+# Indexing code shared with the Indexer / Processor
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "../Indexer"))
+from segments import SegmentedIndex  # noqa: E402
+
+
+FSYNC_MODES = ("batch", "close", "never")
+
+
+class QuoteDedupPipeline:
+    """
+    Drops quotes whose normalized text was already written, in this crawl
+    or (for incremental crawls) in an earlier one.
+    """
+
+    def process_item(self, item, spider):
+        text = ItemAdapter(item).get("text") or ""
+        if not spider.state.add_quote(text):
+            spider.crawler.stats.inc_value("quotes/duplicates")
+            raise DropItem(f"Duplicate quote: {text[:60]!r}")
+        return item
+
+
+class QuoteJsonlPipeline:
+    """
+    Buffers QuoteItems and writes them as JSONL, one write per batch.
+
+    Settings:
+        QUOTES_JSONL_PATH    output feed (default ../quotes_output.jsonl)
+        QUOTES_BATCH_SIZE    items buffered before a write (default 100)
+        QUOTES_FSYNC         "batch": fsync after every write,
+                             "close": once when the spider closes,
+                             "never": leave it to the OS
+        QUOTES_LEGACY_HTML   also write the old <p> block HTML to this path
+                             (empty to disable)
+
+    Incremental crawls append to the feed; the legacy HTML is then
+    regenerated from the whole feed when the spider closes.
+    """
+
+    def __init__(self, path, batch_size=100, fsync="batch", legacy_html=None):
+        if fsync not in FSYNC_MODES:
+            raise ValueError(f"QUOTES_FSYNC must be one of {FSYNC_MODES}")
+        self.path = path
+        self.batch_size = max(1, batch_size)
+        self.fsync = fsync
+        self.legacy_html = legacy_html or None
+        self.buffer = []
+        self.written = 0
+        self.fp = None
+        self.html_fp = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        s = crawler.settings
+        return cls(
+            path=s.get("QUOTES_JSONL_PATH", "../quotes_output.jsonl"),
+            batch_size=s.getint("QUOTES_BATCH_SIZE", 100),
+            fsync=s.get("QUOTES_FSYNC", "batch"),
+            legacy_html=s.get("QUOTES_LEGACY_HTML"),
+        )
+
+    def open_spider(self, spider):
+        self.append = getattr(spider, "incremental", False)
+        self.fp = open(self.path, "a" if self.append else "w", encoding="utf-8")
+        if self.legacy_html and not self.append:
+            self.html_fp = open(self.legacy_html, "w", encoding="utf-8")
+            self.html_fp.write(
+                '<html><head><meta charset="utf-8"><title>Quotes</title></head><body>\n'
+            )
 
-class CrawlerPipeline:
     def process_item(self, item, spider):
+        adapter = ItemAdapter(item)
+        self.buffer.append({
+            "text": adapter.get("text"),
+            "author": adapter.get("author"),
+            "tags": list(adapter.get("tags") or []),
+            "url": adapter.get("url"),
+        })
+        if len(self.buffer) >= self.batch_size:
+            self._flush()
         return item
+
+    def close_spider(self, spider):
+        self._flush()
+        if self.html_fp is not None:
+            self.html_fp.write("</body></html>")
+            self._close(self.html_fp)
+        self._close(self.fp)
+        if self.legacy_html and self.append:
+            self._rewrite_legacy_html()
+        spider.logger.info(f"Wrote {self.written} quotes to {self.path}")
+
+    # ------------------------------------------------------------------
+
+    def _flush(self):
+        if not self.buffer:
+            return
+
+        self.fp.write("".join(
+            json.dumps(rec, ensure_ascii=False) + "\n" for rec in self.buffer
+        ))
+        self._sync(self.fp, self.fsync == "batch")
+
+        if self.html_fp is not None:
+            self.html_fp.write("".join(_legacy_block(rec) for rec in self.buffer))
+            self._sync(self.html_fp, self.fsync == "batch")
+
+        self.written += len(self.buffer)
+        self.buffer = []
+
+    def _rewrite_legacy_html(self):
+        tmp = self.legacy_html + ".tmp"
+        with open(self.path, "r", encoding="utf-8") as src, \
+                open(tmp, "w", encoding="utf-8") as out:
+            out.write('<html><head><meta charset="utf-8"><title>Quotes</title></head><body>\n')
+            for line in src:
+                if line.strip():
+                    out.write(_legacy_block(json.loads(line)))
+            out.write("</body></html>")
+            self._sync(out, self.fsync != "never")
+        os.replace(tmp, self.legacy_html)
+
+    def _close(self, fp):
+        self._sync(fp, self.fsync != "never")
+        fp.close()
+
+    @staticmethod
+    def _sync(fp, durable):
+        fp.flush()
+        if durable:
+            os.fsync(fp.fileno())
+
+
+class SegmentIndexPipeline:
+    """
+    Streams quotes into the segment index while the crawl runs.
+
+    Items go through a bounded queue to an indexing thread, which turns
+    every QUOTES_SEGMENT_SIZE quotes (or whatever arrived within
+    QUOTES_SEGMENT_WAIT seconds) into a new segment. When the queue is
+    full, process_item's Deferred does not fire until there is room, and
+    Scrapy stops scheduling downloads while items are pending, so a slow
+    indexer slows the crawl instead of buffering without bound.
+
+    On close the segments are merged and written out as QUOTES_INDEX_ARTIFACT
+    (quotes.idx), stamped with the JSONL feed, ready for the Processor.
+
+    Settings:
+        QUOTES_SEGMENT_DIR      segment directory
+        QUOTES_INDEX_ARTIFACT   artifact written when the crawl ends
+        QUOTES_INDEX_QUEUE      queue capacity in items (default 1000)
+        QUOTES_SEGMENT_SIZE     quotes per segment (default 500)
+        QUOTES_SEGMENT_WAIT     seconds to wait for a segment to fill (default 2)
+    """
+
+    _DONE = object()
+
+    def __init__(self, segment_dir, artifact, feed_path=None, queue_size=1000,
+                 segment_size=500, segment_wait=2.0):
+        self.segment_dir = segment_dir
+        self.artifact = artifact
+        self.feed_path = feed_path
+        self.queue = queue.Queue(maxsize=max(1, queue_size))
+        self.segment_size = max(1, segment_size)
+        self.segment_wait = segment_wait
+        self.index = None
+        self.worker = None
+        self.error = None
+        self.indexed = 0
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        s = crawler.settings
+        return cls(
+            segment_dir=s.get("QUOTES_SEGMENT_DIR", "../Indexer/quotes_segments"),
+            artifact=s.get("QUOTES_INDEX_ARTIFACT", "../Indexer/quotes.idx"),
+            feed_path=s.get("QUOTES_JSONL_PATH"),
+            queue_size=s.getint("QUOTES_INDEX_QUEUE", 1000),
+            segment_size=s.getint("QUOTES_SEGMENT_SIZE", 500),
+            segment_wait=s.getfloat("QUOTES_SEGMENT_WAIT", 2.0),
+        )
+
+    def open_spider(self, spider):
+        self.index = SegmentedIndex(self.segment_dir)
+        if not getattr(spider, "incremental", False):
+            self.index.reset()
+        self.index.start_background_merge()
+
+        self.worker = threading.Thread(
+            target=self._run, args=(spider,), name="segment-indexer", daemon=True
+        )
+        self.worker.start()
+
+    def process_item(self, item, spider):
+        if self.error is not None:
+            raise self.error
+
+        adapter = ItemAdapter(item)
+        record = (
+            adapter.get("text"),
+            adapter.get("author") or "",
+            list(adapter.get("tags") or []),
+        )
+        try:
+            self.queue.put_nowait(record)
+            return item
+        except queue.Full:
+            spider.crawler.stats.inc_value("quotes/index_backpressure")
+            # Wait for room off the reactor thread; the item stays
+            # "in progress" meanwhile, which throttles the crawl
+            d = deferToThread(self.queue.put, record)
+            d.addCallback(lambda _: item)
+            return d
+
+    def close_spider(self, spider):
+        return deferToThread(self._finish, spider)
+
+    # ------------------------------------------------------------------
+
+    def _run(self, spider):
+        done = False
+        while not done:
+            batch = [self.queue.get()]
+            try:
+                while len(batch) < self.segment_size:
+                    batch.append(self.queue.get(timeout=self.segment_wait))
+            except queue.Empty:
+                pass
+
+            if batch[-1] is self._DONE:
+                batch.pop()
+                done = True
+            if batch and self.error is None:
+                try:
+                    self.index.add(batch)
+                    self.indexed += len(batch)
+                except Exception as err:
+                    spider.logger.error(f"Indexing failed: {err}")
+                    self.error = err
+
+    def _finish(self, spider):
+        self.queue.put(self._DONE)
+        self.worker.join()
+        self.index.close()
+        if self.error is not None:
+            raise self.error
+
+        self.index.maybe_merge()
+        sources = [self.feed_path] if self.feed_path and os.path.exists(self.feed_path) else []
+        count = self.index.save_artifact(self.artifact, sources)
+        spider.logger.info(
+            f"Indexed {self.indexed} new quotes into {len(self.index.segments)} "
+            f"segment(s); {count} quotes served from {self.artifact}"
+        )
+
+
+def _legacy_block(rec):
+    """The <p> block the spider used to write for each quote."""
+    return f"""
+                    <p>
+                        <strong>{html.escape(rec["text"], quote=False)}</strong><br>
+                        — {html.escape(rec["author"], quote=False)}<br>
+                        Tags: {html.escape(", ".join(rec["tags"]), quote=False)}
+                    </p>
+                    """
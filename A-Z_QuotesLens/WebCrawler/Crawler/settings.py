@@ -20,18 +20,21 @@ NEWSPIDER_MODULE = "Crawler.spiders"
 ROBOTSTXT_OBEY = True
 
 # Configure maximum concurrent requests performed by Scrapy (default: 16)
-#CONCURRENT_REQUESTS = 32
+# Parsing is cheap now that file writes are batched in the pipeline, so the
+# downloader can keep more requests in flight; AutoThrottle below keeps the
+# per-site load polite.
+CONCURRENT_REQUESTS = 32
 
 # Configure a delay for requests for the same website (default: 0)
 # See https://docs.scrapy.org/en/latest/topics/settings.html#download-delay
 # See also autothrottle settings and docs
 #DOWNLOAD_DELAY = 3
 # The download delay setting will honor only one of:
-#CONCURRENT_REQUESTS_PER_DOMAIN = 16
+CONCURRENT_REQUESTS_PER_DOMAIN = 8
 #CONCURRENT_REQUESTS_PER_IP = 16
 
 # Disable cookies (enabled by default)
-#COOKIES_ENABLED = False
+COOKIES_ENABLED = False
 
 # Disable Telnet Console (enabled by default)
 #TELNETCONSOLE_ENABLED = False
@@ -50,9 +53,9 @@ ROBOTSTXT_OBEY = True
 
 # Enable or disable downloader middlewares
 # See https://docs.scrapy.org/en/latest/topics/downloader-middleware.html
-#DOWNLOADER_MIDDLEWARES = {
-#    "Crawler.middlewares.CrawlerDownloaderMiddleware": 543,
-#}
+DOWNLOADER_MIDDLEWARES = {
+    "Crawler.middlewares.ConditionalRequestMiddleware": 543,
+}
 
 # Enable or disable extensions
 # See https://docs.scrapy.org/en/latest/topics/extensions.html
@@ -62,20 +65,43 @@ ROBOTSTXT_OBEY = True
 
 # Configure item pipelines
 # See https://docs.scrapy.org/en/latest/topics/item-pipeline.html
-#ITEM_PIPELINES = {
-#    "Crawler.pipelines.CrawlerPipeline": 300,
-#}
+ITEM_PIPELINES = {
+    "Crawler.pipelines.QuoteDedupPipeline": 200,
+    "Crawler.pipelines.QuoteJsonlPipeline": 300,
+    "Crawler.pipelines.SegmentIndexPipeline": 400,
+}
+
+# Validators, page fingerprints and quote hashes kept between crawls
+# (used by "-a incremental=1")
+QUOTES_CRAWL_STATE = "../crawl_state.json"
+
+# QuoteJsonlPipeline output (paths are relative to where the crawl runs)
+QUOTES_JSONL_PATH = "../quotes_output.jsonl"
+QUOTES_BATCH_SIZE = 100
+# "batch" (fsync every write), "close" (once at the end) or "never"
+QUOTES_FSYNC = "batch"
+# Legacy <p> block HTML for older readers; set to "" to turn it off
+QUOTES_LEGACY_HTML = "../quotes_output.html"
+
+# SegmentIndexPipeline: quotes are indexed while the crawl runs and the
+# merged index is written to QUOTES_INDEX_ARTIFACT when it ends
+QUOTES_SEGMENT_DIR = "../Indexer/quotes_segments"
+QUOTES_INDEX_ARTIFACT = "../Indexer/quotes.idx"
+# Items allowed to wait for the indexer before the crawl is slowed down
+QUOTES_INDEX_QUEUE = 1000
+QUOTES_SEGMENT_SIZE = 500
+QUOTES_SEGMENT_WAIT = 2.0
 
 # Enable and configure the AutoThrottle extension (disabled by default)
 # See https://docs.scrapy.org/en/latest/topics/autothrottle.html
-#AUTOTHROTTLE_ENABLED = True
+AUTOTHROTTLE_ENABLED = True
 # The initial download delay
-#AUTOTHROTTLE_START_DELAY = 5
+AUTOTHROTTLE_START_DELAY = 0.5
 # The maximum download delay to be set in case of high latencies
-#AUTOTHROTTLE_MAX_DELAY = 60
+AUTOTHROTTLE_MAX_DELAY = 10
 # The average number of requests Scrapy should be sending in parallel to
 # each remote server
-#AUTOTHROTTLE_TARGET_CONCURRENCY = 1.0
+AUTOTHROTTLE_TARGET_CONCURRENCY = 4.0
 # Enable showing throttling stats for every response received:
 #AUTOTHROTTLE_DEBUG = False
 
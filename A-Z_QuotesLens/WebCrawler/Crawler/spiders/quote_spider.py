@@ -1,46 +1,112 @@
+from urllib.parse import urlparse
+
 from scrapy import Spider
-from scrapy.exceptions import CloseSpider
-import os
+
+from Crawler.crawl_state import CrawlState, body_fingerprint
+from Crawler.items import QuoteItem
+
 
 class QuotesToScrapeSpider(Spider):
+    """
+    Arguments (scrapy crawl quote_spider -a name=value):
+        start_url     first listing page (default: azquotes top quotes)
+        max_pages     pagination limit (default 10)
+        incremental   1 to reuse the saved crawl state: conditional
+                      requests, unchanged pages skipped, output appended
+    """
     name = "quote_spider"
     allowed_domains = ["azquotes.com"]
     start_urls = ["https://www.azquotes.com/top_quotes.html"]
+    max_pages = 10
 
-    output_file = "../quotes_output.html"
+    # 304 Not Modified reaches parse() so pagination can continue
+    handle_httpstatus_list = [304]
 
     custom_settings = {
         "ROBOTSTXT_OBEY": False,
         "FEED_EXPORT_ENCODING": "utf-8"
     }
 
-    def __init__(self, *args, **kwargs):
+    def __init__(self, start_url=None, max_pages=None, incremental="0", *args, **kwargs):
         super().__init__(*args, **kwargs)
-        with open(self.output_file, "w", encoding="utf-8") as f:
-            f.write('<html><head><meta charset="utf-8"><title>Quotes</title></head><body>\n')
+        if start_url:
+            self.start_urls = [start_url]
+            self.allowed_domains = [urlparse(start_url).hostname]
+        if max_pages:
+            self.max_pages = int(max_pages)
+        self.incremental = str(incremental).lower() in ("1", "true", "yes")
+        self.pages_seen = 0
+        self.state = None
 
-    def closed(self, spider):
-        with open(self.output_file, "a", encoding="utf-8") as f:
-            f.write("</body></html>")
+    @classmethod
+    def from_crawler(cls, crawler, *args, **kwargs):
+        spider = super().from_crawler(crawler, *args, **kwargs)
+        path = crawler.settings.get("QUOTES_CRAWL_STATE")
+        if spider.incremental:
+            spider.state = CrawlState.load(path)
+        else:
+            # A full crawl rebuilds the state from scratch
+            spider.state = CrawlState(path)
+        return spider
+
+    def closed(self, reason):
+        self.state.save()
 
     def parse(self, response):
+        self.pages_seen += 1
+        known = self.state.pages.get(response.url, {})
+
+        if response.status == 304:
+            self.crawler.stats.inc_value("quotes/pages_not_modified")
+            next_url = known.get("next")
+        else:
+            fingerprint = body_fingerprint(response.body)
+            next_url = self._next_page(response)
+            self.state.pages[response.url] = {
+                "etag": _header(response, b"ETag"),
+                "last_modified": _header(response, b"Last-Modified"),
+                "fingerprint": fingerprint,
+                "next": next_url,
+            }
+
+            if self.incremental and known.get("fingerprint") == fingerprint:
+                self.crawler.stats.inc_value("quotes/pages_unchanged")
+            else:
+                yield from self._parse_quotes(response)
+
+        if next_url and self.pages_seen < self.max_pages:
+            yield response.follow(next_url, callback=self.parse)
+
+    def _parse_quotes(self, response):
         blocks = response.css("ul.list-quotes > li > div.wrap-block")
 
+        # Items go through the pipelines (see QuoteJsonlPipeline), which
+        # batch the writes instead of touching files in this callback
         found = 0
-        with open(self.output_file, "a", encoding="utf-8") as f:
-            for block in blocks:
-                text = block.css("a.title::text").get(default="").strip()
-                author = block.css("div.author a::text").get(default="").strip()
-                tags = block.css("div.tags a::text").getall()
-
-                if text and author:
-                    found += 1
-                    f.write(f"""
-                    <p>
-                        <strong>{text}</strong><br>
-                        — {author}<br>
-                        Tags: {", ".join(tags)}
-                    </p>
-                    """)
+        for block in blocks:
+            text = block.css("a.title::text").get(default="").strip()
+            author = block.css("div.author a::text").get(default="").strip()
+            tags = block.css("div.tags a::text").getall()
+
+            if text and author:
+                found += 1
+                yield QuoteItem(
+                    text=text,
+                    author=author,
+                    tags=[t.strip() for t in tags],
+                    url=response.url
+                )
 
         self.logger.info(f"Extracted {found} quotes from {response.url}")
+
+    @staticmethod
+    def _next_page(response):
+        href = response.css(
+            "li.next a::attr(href), a[rel='next']::attr(href), div.pager a.next::attr(href)"
+        ).get()
+        return response.urljoin(href) if href else None
+
+
+def _header(response, name):
+    value = response.headers.get(name)
+    return value.decode("latin-1") if value else None
@@ -0,0 +1,76 @@
+import json
+import os
+import re
+import subprocess
+import sys
+
+import pytest
+
+from Crawler.fixture_server import serve_fixtures
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURE_PAGES = ("top_quotes.html", "top_quotes_2.html", "top_quotes_3.html")
+
+
+@pytest.fixture(scope="module")
+def fixture_url():
+    server, url = serve_fixtures(0)
+    yield url
+    server.shutdown()
+
+
+def crawl(tmp_path, start_url, incremental):
+    """
+    Run quote_spider in a subprocess (the Twisted reactor cannot be
+    restarted in one process) with every output under tmp_path; returns
+    the Scrapy stats of the run.
+    """
+    log = tmp_path / f"crawl_{incremental}.log"
+    settings = {
+        "QUOTES_CRAWL_STATE": tmp_path / "crawl_state.json",
+        "QUOTES_JSONL_PATH": tmp_path / "quotes_output.jsonl",
+        "QUOTES_LEGACY_HTML": "",
+        "QUOTES_SEGMENT_DIR": tmp_path / "segments",
+        "QUOTES_INDEX_ARTIFACT": tmp_path / "quotes.idx",
+        "QUOTES_SEGMENT_WAIT": 0.1,
+        "AUTOTHROTTLE_ENABLED": 0,
+        "LOG_FILE": log,
+    }
+    cmd = [sys.executable, "-m", "scrapy", "crawl", "quote_spider",
+           "-a", f"start_url={start_url}", "-a", f"incremental={incremental}"]
+    for name, value in settings.items():
+        cmd += ["-s", f"{name}={value}"]
+    subprocess.run(cmd, cwd=PROJECT_DIR, check=True, capture_output=True, timeout=300)
+
+    dump = log.read_text(encoding="utf-8").split("Dumping Scrapy stats:")[-1]
+    return {key: int(value) for key, value in re.findall(r"'([^']+)': (\d+),?\n", dump)}
+
+
+def read_feed(tmp_path):
+    with open(tmp_path / "quotes_output.jsonl", encoding="utf-8") as fp:
+        return [json.loads(line) for line in fp if line.strip()]
+
+
+def test_full_then_incremental_crawl(tmp_path, fixture_url):
+    start_url = fixture_url + FIXTURE_PAGES[0]
+
+    # Full crawl: every page fetched through the pagination links
+    stats = crawl(tmp_path, start_url, 0)
+    assert stats["downloader/response_status_count/200"] == len(FIXTURE_PAGES)
+    assert stats["item_scraped_count"] == 11
+    assert stats["quotes/duplicates"] == 1
+
+    items = read_feed(tmp_path)
+    assert len(items) == 11
+    assert {item["url"] for item in items} == {fixture_url + page for page in FIXTURE_PAGES}
+    with open(tmp_path / "crawl_state.json", encoding="utf-8") as fp:
+        assert sorted(json.load(fp)["pages"]) == sorted(fixture_url + p for p in FIXTURE_PAGES)
+    assert os.path.exists(tmp_path / "quotes.idx")
+
+    # Incremental rerun: conditional requests, all 304, nothing new written
+    stats = crawl(tmp_path, start_url, 1)
+    assert stats["downloader/response_status_count/304"] == len(FIXTURE_PAGES)
+    assert stats["quotes/pages_not_modified"] == len(FIXTURE_PAGES)
+    assert "downloader/response_status_count/200" not in stats
+    assert "item_scraped_count" not in stats
+    assert read_feed(tmp_path) == items
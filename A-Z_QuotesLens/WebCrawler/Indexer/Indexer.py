@@ -1,20 +1,34 @@
 import json
+import os
 import pickle
-from bs4 import BeautifulSoup
+import sys
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
 
+from facets import build_facets
+from fields import build_fields
+from index_store import corpus_checksum, normalize_tag, save_index
+from lsa import DEFAULT_DIMS, build_lsa
+from postings import save_postings
+from pruning import WandSearcher
+from query_encoder import QueryEncoder
+from ranking import select_top_k
+from sources import find_corpus, iter_records
+from suggest import suggester_from_index
+
+SEARCH_ENGINES = ("exhaustive", "wand")
+
 
 class QuoteIndexer:
     """
-    Processes quotes stored in HTML format and builds an index.
-    Expected <p> block structure:
+    Processes crawled quotes and builds an index. Input files are the
+    crawler's JSONL feed or HTML with <p> blocks of the form
         <strong>Quote text</strong><br>
         — Author<br>
         Tags: tag1, tag2, ...
     """
 
-    def __init__(self, input_files):
+    def __init__(self, input_files, write_json=False, lsa_dims=0):
         self.input_files = input_files
 
         # Parse HTML & load content
@@ -24,18 +38,43 @@ class QuoteIndexer:
         if len(self.corpus) == 0:
             raise RuntimeError("No quotes found. Check file location.")
 
+        # Hashed once; every artifact below records it
+        self.checksum = corpus_checksum(self.input_files)
+
         # Build TF-IDF vectors
         self.vectorizer = TfidfVectorizer(stop_words="english", min_df=1)
         self.doc_vectors = self.vectorizer.fit_transform(self.corpus)
+        self.encoder = QueryEncoder.from_vectorizer(self.vectorizer)
         print("TF-IDF dimensions:", self.doc_vectors.shape)
 
+        # Pruned (Block-Max WAND) searcher, built on first use
+        self._wand = None
+
         # Build inverted index
         self.index = self._create_index()
         print("\nIndex sample:")
         self.display_index_preview(limit=20)
 
-        # Save JSON file
-        self._save_index_json("quotes.json")
+        # Save compressed postings; JSON only as a debug dump
+        self._save_postings("quotes.postings")
+        if write_json:
+            self._save_index_json("quotes.json")
+
+        # Save binary artifact loaded by the Processor
+        self._save_index_artifact("quotes.idx")
+
+        # Prefix completions for /suggest
+        self._save_suggest("quotes.suggest")
+
+        # Tag / author incidence matrices for facet counts
+        self._save_facets("quotes.facets")
+
+        # Author / tag field indexes for author: and tag: clauses
+        self._save_fields("quotes.fields")
+
+        # Optional LSA projection + IVF index for engine="lsa"
+        if lsa_dims:
+            self._save_lsa("quotes.lsa", lsa_dims)
 
     # ----------------------------------------------------------------------
 
@@ -48,44 +87,19 @@ class QuoteIndexer:
         while i < len(self.input_files):
             file_path = self.input_files[i]
 
-            with open(file_path, "r", encoding="utf-8") as f:
-                soup = BeautifulSoup(f.read(), "html.parser")
-
-            paragraphs = soup.find_all("p")
-            j = 0
-            while j < len(paragraphs):  # replaced for with while
-                p = paragraphs[j]
-                strong_tag = p.find("strong")
-
-                if strong_tag:
-                    quote_line = strong_tag.get_text(strip=True)
-
-                    if quote_line:
-                        parts = list(p.stripped_strings)
-                        author = ""
-                        tags = []
-
-                        k = 1
-                        while k < len(parts):  # replaced for with while
-                            txt = parts[k].strip()
-                            if txt.startswith("—"):
-                                author = txt[1:].strip()
-                            elif txt.startswith("Tags:"):
-                                tags = [t.strip() for t in txt[5:].split(",")]
-                            k += 1
-
-                        doc_id = len(docs)
-                        docs.append(quote_line)
-
-                        meta_info.append({
-                            "id": doc_id,
-                            "quote": quote_line,
-                            "author": author,
-                            "tags": tags,
-                            "source_file": file_path
-                        })
-
-                j += 1
+            # Streamed one record at a time; no document tree is built
+            for quote_line, author, tags in iter_records(file_path):
+                doc_id = len(docs)
+                docs.append(quote_line)
+
+                meta_info.append({
+                    "id": doc_id,
+                    "quote": quote_line,
+                    "author": author,
+                    "tags": tags,
+                    "source_file": file_path
+                })
+
             i += 1
 
         return docs, meta_info
@@ -125,37 +139,108 @@ class QuoteIndexer:
 
     # ----------------------------------------------------------------------
 
-    def search_quotes(self, user_query, k=5):
-        q_vec = self.vectorizer.transform([user_query])
-        sim = cosine_similarity(q_vec, self.doc_vectors)[0]
+    def _save_postings(self, output_file):
+        save_postings(output_file, self.index, len(self.corpus))
+
+        size_kb = os.path.getsize(output_file) / 1024
+        print(f"\n[Postings saved] -> {output_file} ({size_kb:.1f} KB)")
+
+    # ----------------------------------------------------------------------
+
+    def _save_index_artifact(self, output_file):
+        save_index(
+            output_file,
+            self.vectorizer,
+            self.doc_vectors,
+            self.metadata,
+            self.input_files,
+            checksum=self.checksum,
+        )
+
+        print(f"[Artifact saved] -> {output_file}")
+
+    # ----------------------------------------------------------------------
+
+    def _save_suggest(self, output_file):
+        tag_index = {}
+        for doc_id, info in enumerate(self.metadata):
+            for tag in info["tags"]:
+                norm = normalize_tag(tag)
+                if norm:
+                    tag_index.setdefault(norm, set()).add(doc_id)
+
+        suggester = suggester_from_index(
+            self.checksum,
+            self.vectorizer.get_feature_names_out().tolist(),
+            self.doc_vectors,
+            tag_index,
+            [info["author"] for info in self.metadata],
+        )
+        suggester.save(output_file)
+
+        print(f"[Suggestions saved] -> {output_file} ({suggester.header['entries']} entries)")
+
+    def _save_facets(self, output_file):
+        facets = build_facets(
+            self.checksum,
+            [info["tags"] for info in self.metadata],
+            [info["author"] for info in self.metadata],
+        )
+        facets.save(output_file)
+
+        print(f"[Facets saved] -> {output_file}")
 
-        ranked = sorted(
-            range(len(sim)),
-            key=lambda x: sim[x],
-            reverse=True
+    def _save_fields(self, output_file):
+        fields = build_fields(
+            self.checksum,
+            [info["author"] for info in self.metadata],
+            [[t for t in (normalize_tag(tag) for tag in info["tags"]) if t]
+             for info in self.metadata],
         )
+        fields.save(output_file)
+
+        print(f"[Fields saved] -> {output_file}")
+
+    # ----------------------------------------------------------------------
+
+    def _save_lsa(self, output_file, dims):
+        lsa = build_lsa(self.doc_vectors, self.checksum, dims=dims)
+        lsa.save(output_file)
+
+        print(f"[LSA saved] -> {output_file} ({lsa.header['dims']} dims, "
+              f"{lsa.num_lists} lists)")
+
+    # ----------------------------------------------------------------------
+
+    def search_quotes(self, user_query, k=5, engine="exhaustive"):
+        """
+        engine="exhaustive" scores every document; engine="wand" walks the
+        postings with Block-Max WAND pruning and returns the same top-k.
+        """
+        if engine not in SEARCH_ENGINES:
+            raise ValueError(f"Unknown engine: {engine}")
+
+        q_vec = self.encoder.transform([user_query])
+
+        if engine == "wand":
+            if self._wand is None:
+                self._wand = WandSearcher(self.doc_vectors)
+            ranked, scores = self._wand.search(q_vec, k)
+        else:
+            sim = cosine_similarity(q_vec, self.doc_vectors)[0]
+            ranked, scores = select_top_k(sim, k)
 
         results = []
         c = 0
         while c < len(ranked):  # replaced for with while
-            idx = ranked[c]
-            score = float(sim[idx])
-
-            if score <= 0:
-                break
-
-            info = self.metadata[idx]
+            info = self.metadata[int(ranked[c])]
             results.append({
                 "id": info["id"],
                 "quote": info["quote"],
                 "author": info["author"],
                 "tags": info["tags"],
-                "score": score
+                "score": float(scores[c])
             })
-
-            if len(results) == k:
-                break
-
             c += 1
 
         return results
@@ -200,8 +285,14 @@ class QuoteIndexer:
 # ----------------------------------------------------------------------
 
 if __name__ == "__main__":
-    files = ["../quotes_output.html"]
-    engine = QuoteIndexer(files)
+    files = [find_corpus("..")]
+    # --json also writes the pretty-printed quotes.json for debugging,
+    # --lsa the quotes.lsa projection used by engine="lsa"
+    engine = QuoteIndexer(
+        files,
+        write_json="--json" in sys.argv[1:],
+        lsa_dims=DEFAULT_DIMS if "--lsa" in sys.argv[1:] else 0,
+    )
 
     engine.show_pickle_index()
 
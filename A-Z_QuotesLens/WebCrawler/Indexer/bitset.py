@@ -0,0 +1,100 @@
+import numpy as np
+
+
+# ------------------------------------------------------------------------------
+# Fixed-size bitset over doc ids
+#
+# One bit per document packed into little-endian uint64 words, so AND / OR /
+# NOT between filters are word-level NumPy operations and a bitset converts
+# to a boolean row mask (or sorted doc ids) without any Python loop.
+# ------------------------------------------------------------------------------
+_WORD = np.dtype("<u8")
+
+
+class Bitset:
+    __slots__ = ("words", "size")
+
+    def __init__(self, words, size):
+        self.words = words
+        self.size = size
+
+    @classmethod
+    def empty(cls, size):
+        return cls(np.zeros((size + 63) // 64, dtype=_WORD), size)
+
+    @classmethod
+    def full(cls, size):
+        return ~cls.empty(size)
+
+    @classmethod
+    def from_ids(cls, ids, size):
+        """Bitset with the given doc ids set (ids must be < size)."""
+        bits = np.zeros(((size + 63) // 64) * 64, dtype=bool)
+        bits[np.asarray(ids, dtype=np.int64)] = True
+        return cls.from_mask(bits, size)
+
+    @classmethod
+    def from_mask(cls, mask, size=None):
+        size = len(mask) if size is None else size
+        bits = np.zeros(((size + 63) // 64) * 64, dtype=bool)
+        bits[:len(mask)] = mask
+        packed = np.packbits(bits, bitorder="little")
+        return cls(packed.view(_WORD), size)
+
+    # -- set algebra ------------------------------------------------------
+
+    def __and__(self, other):
+        return Bitset(self.words & other.words, self.size)
+
+    def __or__(self, other):
+        return Bitset(self.words | other.words, self.size)
+
+    def __sub__(self, other):
+        return Bitset(self.words & ~other.words, self.size)
+
+    def __invert__(self):
+        words = ~self.words
+        tail = self.size % 64
+        if tail and len(words):
+            words[-1] &= np.uint64((1 << tail) - 1)
+        return Bitset(words, self.size)
+
+    @staticmethod
+    def union(bitsets, size):
+        if not bitsets:
+            return Bitset.empty(size)
+        return Bitset(np.bitwise_or.reduce([b.words for b in bitsets]), size)
+
+    @staticmethod
+    def intersection(bitsets, size):
+        if not bitsets:
+            return Bitset.full(size)
+        return Bitset(np.bitwise_and.reduce([b.words for b in bitsets]), size)
+
+    # -- queries ----------------------------------------------------------
+
+    def any(self):
+        return bool(self.words.any())
+
+    def __len__(self):
+        return int(np.unpackbits(self.words.view(np.uint8)).sum())
+
+    def __contains__(self, doc_id):
+        doc_id = int(doc_id)
+        if not 0 <= doc_id < self.size:
+            return False
+        return bool((int(self.words[doc_id >> 6]) >> (doc_id & 63)) & 1)
+
+    def contains(self, ids):
+        """Vectorized membership test for an array of doc ids."""
+        ids = np.asarray(ids, dtype=np.int64)
+        return ((self.words[ids >> 6] >> (ids & 63).astype(np.uint64)) & np.uint64(1)).astype(bool)
+
+    def mask(self):
+        """Boolean array of length size; usable directly to mask row scores."""
+        bits = np.unpackbits(self.words.view(np.uint8), bitorder="little")
+        return bits[:self.size].astype(bool)
+
+    def to_ids(self):
+        """Set doc ids, ascending."""
+        return np.flatnonzero(self.mask())
@@ -0,0 +1,278 @@
+import re
+
+import numpy as np
+
+from fields import FIELD_CLAUSE, field_terms, split_clause
+
+
+# ------------------------------------------------------------------------------
+# Boolean query engine
+#
+# Grammar (operators are case-insensitive, AND binds tighter than OR,
+# juxtaposed operands are OR-ed as the original flat evaluator did, except
+# a juxtaposed NOT, which excludes: "a NOT b" is "a AND NOT b"):
+#
+#     expr    := and_expr ( ["OR"] and_expr )*
+#     and_expr:= unary ( "AND" unary | not_expr )*
+#     unary   := not_expr | "(" expr ")" | '"' words '"' | word
+#     not_expr:= "NOT" unary
+#
+# A quoted string is literal: operator words inside it are plain terms and
+# all of its words must match (the index has no positions, so it is not a
+# phrase match). `author:word` / `tag:"some words"` look the words up in
+# that field's postings instead of the body's (see fields.py). Dangling
+# operators and unbalanced parentheses are ignored.
+#
+# Evaluation works on sorted doc-id arrays and returns sorted doc ids.
+# ------------------------------------------------------------------------------
+OPERATORS = ("AND", "OR", "NOT")
+
+_TOKEN_RE = re.compile(FIELD_CLAUSE + r'|\(|\)|"[^"]*"?|[^\s()"]+')
+_FIELD_RE = re.compile(FIELD_CLAUSE)
+
+# Probe the longer list by binary search once it is this many times longer
+GALLOP_RATIO = 8
+
+
+def tokenize(expr):
+    return _TOKEN_RE.findall(expr)
+
+
+def clean_term(token):
+    """Same cleanup the original evaluator applied to every token."""
+    return re.sub(r"[^a-zA-Z]", "", token).lower()
+
+
+class Node:
+    """
+    Expression tree node: op is "TERM", "AND", "OR", "NOT" or "NONE"; a
+    TERM's field is None for the quote body.
+    """
+    __slots__ = ("op", "children", "term", "field")
+
+    def __init__(self, op, children=(), term=None, field=None):
+        self.op = op
+        self.children = list(children)
+        self.term = term
+        self.field = field
+
+    def __repr__(self):
+        if self.op == "TERM":
+            return repr(self.term) if self.field is None else f"{self.field}:{self.term!r}"
+        return f"{self.op}({', '.join(map(repr, self.children))})"
+
+
+class _Parser:
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.pos = 0
+
+    def peek(self):
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else None
+
+    def peek_op(self):
+        tok = self.peek()
+        if tok is not None and tok.upper() in OPERATORS:
+            return tok.upper()
+        return None
+
+    def starts_operand(self):
+        tok = self.peek()
+        return tok is not None and tok != ")" and self.peek_op() in (None, "NOT")
+
+    def parse(self):
+        node = self.parse_or()
+        # Stray ")" or operators left over: skip them and keep OR-ing
+        while self.pos < len(self.tokens):
+            self.pos += 1
+            if self.starts_operand():
+                node = _combine("OR", [node, self.parse_or()])
+        return node
+
+    def parse_or(self):
+        children = [self.parse_and()]
+        while True:
+            if self.peek_op() == "OR":
+                self.pos += 1
+            elif not self.starts_operand():
+                break
+            if self.starts_operand():
+                children.append(self.parse_and())
+        return _combine("OR", children)
+
+    def parse_and(self):
+        children = [self.parse_unary()]
+        while True:
+            op = self.peek_op()
+            if op == "AND":
+                self.pos += 1
+                if not self.starts_operand():
+                    break
+            elif op != "NOT":
+                break
+            # "a NOT b": the NOT operand joins this AND
+            children.append(self.parse_unary())
+        return _combine("AND", children)
+
+    def parse_unary(self):
+        tok = self.peek()
+        if tok is None or tok == ")" or self.peek_op() in ("AND", "OR"):
+            return Node("NONE")
+        self.pos += 1
+
+        if tok.upper() == "NOT":
+            if self.starts_operand():
+                return Node("NOT", [self.parse_unary()])
+            return Node("NONE")
+
+        if tok == "(":
+            node = self.parse_or()
+            if self.peek() == ")":
+                self.pos += 1
+            return node
+
+        if _FIELD_RE.fullmatch(tok):
+            field, value = split_clause(tok)
+            return _combine(
+                "AND", [Node("TERM", term=w, field=field) for w in field_terms(value)]
+            )
+
+        if tok.startswith('"'):
+            words = [clean_term(w) for w in tok.strip('"').split()]
+            return _combine("AND", [Node("TERM", term=w) for w in words])
+
+        return Node("TERM", term=clean_term(tok))
+
+
+def _combine(op, children):
+    children = [c for c in children if c.op != "NONE"]
+    if not children:
+        return Node("NONE")
+    if len(children) == 1:
+        return children[0]
+    return Node(op, children)
+
+
+def parse(expr):
+    """Parse a Boolean query string into a Node tree."""
+    return _Parser(tokenize(expr)).parse()
+
+
+def is_boolean(expr):
+    """
+    AND / OR in any case switch to Boolean mode, as before; NOT only when
+    written in capitals, so "do not give up" stays a free-text query.
+    """
+    for tok in tokenize(expr):
+        if tok.upper() in ("AND", "OR") or tok == "NOT":
+            return True
+    return False
+
+
+# ------------------------------------------------------------------------------
+# Sorted-array set operations
+# ------------------------------------------------------------------------------
+_EMPTY = np.zeros(0, dtype=np.int64)
+
+
+def intersect_sorted(a, b):
+    """a ∩ b; a skewed pair probes the long list by binary search."""
+    if len(a) > len(b):
+        a, b = b, a
+    if len(a) == 0:
+        return _EMPTY
+    if len(b) >= GALLOP_RATIO * len(a):
+        pos = np.searchsorted(b, a)
+        hit = pos < len(b)
+        hit[hit] = b[pos[hit]] == a[hit]
+        return a[hit]
+    return np.intersect1d(a, b, assume_unique=True)
+
+
+def difference_sorted(a, b):
+    """a minus b."""
+    if len(a) == 0 or len(b) == 0:
+        return a
+    pos = np.searchsorted(b, a)
+    keep = pos >= len(b)
+    keep[~keep] = b[pos[~keep]] != a[~keep]
+    return a[keep]
+
+
+def union_sorted(lists):
+    """
+    Union of sorted lists: a stable sort of the concatenation merges the
+    already-sorted runs (a k-way merge), then duplicates are dropped.
+    """
+    lists = [x for x in lists if len(x)]
+    if not lists:
+        return _EMPTY
+    if len(lists) == 1:
+        return lists[0]
+    merged = np.sort(np.concatenate(lists), kind="stable")
+    keep = np.empty(len(merged), dtype=bool)
+    keep[0] = True
+    np.not_equal(merged[1:], merged[:-1], out=keep[1:])
+    return merged[keep]
+
+
+# ------------------------------------------------------------------------------
+# Evaluation
+# ------------------------------------------------------------------------------
+class BooleanEngine:
+    """
+    Evaluates query trees against postings.
+
+    postings:       callable term -> ascending np array of doc ids (empty
+                    when the term is unknown)
+    field_postings: callable (field, term) -> the same for a field term;
+                    without it field terms match nothing
+    """
+
+    def __init__(self, postings, num_docs, field_postings=None):
+        self.postings = postings
+        self.num_docs = num_docs
+        self.field_postings = field_postings
+
+    def search(self, expr):
+        """All matching doc ids, ascending."""
+        return self.evaluate(parse(expr))
+
+    def evaluate(self, node):
+        if node.op == "NONE":
+            return _EMPTY
+        if node.op == "TERM":
+            if not node.term:
+                return _EMPTY
+            if node.field is not None:
+                if self.field_postings is None:
+                    return _EMPTY
+                return np.asarray(self.field_postings(node.field, node.term), dtype=np.int64)
+            return np.asarray(self.postings(node.term), dtype=np.int64)
+        if node.op == "OR":
+            return union_sorted([self.evaluate(c) for c in node.children])
+        if node.op == "NOT":
+            return self._complement(self.evaluate(node.children[0]))
+
+        # AND: intersect positive operands shortest first, then subtract the
+        # negated ones, so NOT never has to materialize a complement here.
+        positive = [c for c in node.children if c.op != "NOT"]
+        negative = [c.children[0] for c in node.children if c.op == "NOT"]
+        if not positive:
+            return self._complement(union_sorted([self.evaluate(c) for c in negative]))
+
+        lists = sorted((self.evaluate(c) for c in positive), key=len)
+        result = lists[0]
+        for other in lists[1:]:
+            if len(result) == 0:
+                return _EMPTY
+            result = intersect_sorted(result, other)
+
+        for child in negative:
+            if len(result) == 0:
+                break
+            result = difference_sorted(result, self.evaluate(child))
+        return result
+
+    def _complement(self, ids):
+        return difference_sorted(np.arange(self.num_docs, dtype=np.int64), ids)
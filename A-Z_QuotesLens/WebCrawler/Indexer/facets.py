@@ -0,0 +1,124 @@
+import numpy as np
+from scipy.sparse import csr_matrix
+
+from index_store import (
+    StaleIndexError, StringPool, normalize_tag, pack_strings, read_sections, write_sections
+)
+
+
+# ------------------------------------------------------------------------------
+# Facet counts over sparse incidence matrices
+#
+# For each field (tags, authors) a docs x values CSR matrix holds a 1 where
+# a document carries a value. The counts for a candidate set are one
+# sparse product of its indicator row with that matrix:
+#
+#     counts = [1 at each candidate doc] (1 x docs) . incidence (docs x values)
+#
+# which only touches the rows of the candidates; the top-n are picked with
+# argpartition, ties broken by value name.
+#
+# File (quotes.facets, write_sections container), per field F:
+#     F_offsets / F_pool   sorted value names
+#     F_indptr             docs + 1   int64   CSR row offsets
+#     F_indices            nnz        int32   value ids of each document
+# ------------------------------------------------------------------------------
+FACETS_MAGIC = b"QLFACET\0"
+FACETS_VERSION = 1
+
+FIELDS = ("tags", "authors")
+
+
+def _incidence(values_per_doc):
+    """Sorted value names and the (indptr, indices) rows of the incidence matrix."""
+    names = sorted(
+        {v for values in values_per_doc for v in values}, key=lambda v: v.encode("utf-8")
+    )
+    ids = {name: i for i, name in enumerate(names)}
+    indptr = np.zeros(len(values_per_doc) + 1, dtype=np.int64)
+    indices = []
+    for doc_id, values in enumerate(values_per_doc):
+        row = sorted({ids[v] for v in values})
+        indices.extend(row)
+        indptr[doc_id + 1] = indptr[doc_id] + len(row)
+    return names, indptr, np.asarray(indices, dtype=np.int32)
+
+
+def build_facets(checksum, doc_tags, doc_authors):
+    """
+    doc_tags:    raw tags of every document (normalized here)
+    doc_authors: author name of every document
+    """
+    per_field = {
+        "tags": [[t for t in (normalize_tag(tag) for tag in tags) if t] for tags in doc_tags],
+        "authors": [[name] if name else [] for name in doc_authors],
+    }
+    header = {"checksum": checksum, "num_docs": len(doc_authors)}
+    arrays = {}
+    for field in FIELDS:
+        names, indptr, indices = _incidence(per_field[field])
+        offsets, pool = pack_strings(names)
+        arrays[f"{field}_offsets"] = offsets
+        arrays[f"{field}_pool"] = pool
+        arrays[f"{field}_indptr"] = indptr
+        arrays[f"{field}_indices"] = indices
+    return FacetIndex(header, arrays)
+
+
+def load_facets(path, checksum=None, use_mmap=False):
+    """Load quotes.facets; StaleIndexError when built from another corpus."""
+    header, arrays = read_sections(path, FACETS_MAGIC, FACETS_VERSION, use_mmap)
+    if checksum is not None and header["checksum"] != checksum:
+        raise StaleIndexError(f"{path}: built from a different corpus")
+    return FacetIndex(header, arrays)
+
+
+class FacetIndex:
+
+    def __init__(self, header, arrays):
+        self.header = header
+        self.arrays = arrays
+        self.num_docs = header["num_docs"]
+        self.names = {}
+        self.incidence = {}
+        for field in FIELDS:
+            names = StringPool(arrays[f"{field}_offsets"], arrays[f"{field}_pool"])
+            indices = arrays[f"{field}_indices"]
+            self.names[field] = names
+            self.incidence[field] = csr_matrix(
+                (np.ones(len(indices), dtype=np.int32), indices, arrays[f"{field}_indptr"]),
+                shape=(self.num_docs, len(names)),
+            )
+
+    def save(self, path):
+        write_sections(path, self.header, self.arrays, FACETS_MAGIC, FACETS_VERSION)
+
+    def indicator(self, doc_ids):
+        """1 x docs row with a 1 at every candidate."""
+        doc_ids = np.asarray(doc_ids, dtype=np.int64)
+        return csr_matrix(
+            (np.ones(len(doc_ids), dtype=np.int32), doc_ids, np.array([0, len(doc_ids)])),
+            shape=(1, self.num_docs),
+        )
+
+    def counts(self, doc_ids, field):
+        """(value ids, counts) of the values carried by the candidates."""
+        row = (self.indicator(doc_ids) @ self.incidence[field]).tocsr()
+        return row.indices, row.data
+
+    def top(self, doc_ids, n, fields=FIELDS):
+        """{field: [{"value", "count"}]}, the n most frequent values first."""
+        result = {}
+        for field in fields:
+            ids, counts = self.counts(doc_ids, field)
+            if 0 < n < len(counts):
+                # Keep everything tied with the n-th count, then sort exactly
+                kth = np.partition(counts, len(counts) - n)[len(counts) - n]
+                keep = counts >= kth
+                ids, counts = ids[keep], counts[keep]
+            order = np.lexsort((ids, -counts))[:n]
+            names = self.names[field]
+            result[field] = [
+                {"value": names[int(ids[i])], "count": int(counts[i])} for i in order
+            ]
+        return result
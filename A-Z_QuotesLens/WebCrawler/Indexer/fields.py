@@ -0,0 +1,207 @@
+import re
+
+import numpy as np
+from scipy.sparse import csc_matrix
+
+from index_store import StaleIndexError, StringPool, pack_strings, read_sections, write_sections
+from query_encoder import QueryEncoder
+
+
+# ------------------------------------------------------------------------------
+# Field indexes (author, tag)
+#
+# The quote body is the TF-IDF matrix of the main artifact. Author names and
+# tags get one TF-IDF matrix each, over their own vocabulary (no stop words,
+# the body's token pattern, smooth idf, l2-normalized rows like sklearn).
+# Each matrix is stored column-major (CSC): column t is the postings list of
+# term t (sorted doc ids) with its weights, so the same arrays serve Boolean
+# lookups and cosine scoring. A term resolves to its column through a dict.
+#
+# Query syntax: `author:einstein`, `tag:love`, `author:"albert einstein"`
+# (every word must match). Outside Boolean mode the clauses are scored on
+# their field and added to the body score, each times its field weight.
+#
+# File (quotes.fields, write_sections container), per field F:
+#     F_offsets / F_pool   vocabulary, sorted; the position is the term id
+#     F_idf                terms     float64
+#     F_colptr             terms + 1 int64    CSC column offsets
+#     F_docs               nnz       int32    doc ids of each term, ascending
+#     F_weights            nnz       float64
+# ------------------------------------------------------------------------------
+FIELDS_MAGIC = b"QLFIELD\0"
+FIELDS_VERSION = 1
+
+FIELDS = ("author", "tag")
+TOKEN_PATTERN = r"(?u)\b\w\w+\b"
+
+# `field:word` or `field:"some words"`; the field name is case-insensitive
+FIELD_CLAUSE = r'(?i:%s):(?:"[^"]*"?|[^\s()"]*)' % "|".join(FIELDS)
+_CLAUSE_RE = re.compile(r'\b(?i:(%s)):("[^"]*"?|[^\s()"]*)' % "|".join(FIELDS))
+_TOKEN_RE = re.compile(TOKEN_PATTERN)
+
+
+def field_terms(text):
+    """Lowercased tokens of a field value, as they are indexed."""
+    return _TOKEN_RE.findall(text.lower())
+
+
+def split_clause(token):
+    """("author", "albert einstein") for the token 'author:"Albert Einstein"'."""
+    field, _, value = token.partition(":")
+    return field.lower(), value.strip('"')
+
+
+def split_fields(expr):
+    """
+    Free text and field clauses of a query: ("body words", {field: text}).
+    Several clauses on one field are joined into one text.
+    """
+    clauses = {}
+    for field, value in _CLAUSE_RE.findall(expr):
+        field, value = field.lower(), value.strip('"')
+        clauses[field] = f"{clauses[field]} {value}" if field in clauses else value
+    if not clauses:
+        return expr, clauses
+    return _CLAUSE_RE.sub(" ", expr).strip(), clauses
+
+
+def has_fields(expr):
+    return _CLAUSE_RE.search(expr) is not None
+
+
+def parse_weights(spec, defaults=None):
+    """
+    "author=2,tag=0.5" -> {"body": 1.0, "author": 2.0, "tag": 0.5}; fields
+    left out keep their default. Raises ValueError on anything else.
+    """
+    weights = dict(defaults or {name: 1.0 for name in ("body",) + FIELDS})
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, value = item.partition("=")
+        name = name.strip().lower()
+        try:
+            weight = float(value)
+        except ValueError:
+            weight = -1.0
+        if name not in weights or not 0 <= weight < float("inf"):
+            raise ValueError(f"Invalid field weight {item!r}")
+        weights[name] = weight
+    return weights
+
+
+# ------------------------------------------------------------------------------
+# Build / load
+# ------------------------------------------------------------------------------
+def _tfidf_columns(texts):
+    """Sorted vocabulary, idf and the CSC arrays of an l2-normalized TF-IDF matrix."""
+    counts = [{} for _ in texts]
+    for doc_id, text in enumerate(texts):
+        row = counts[doc_id]
+        for term in field_terms(text):
+            row[term] = row.get(term, 0) + 1
+
+    terms = sorted({t for row in counts for t in row}, key=lambda t: t.encode("utf-8"))
+    ids = {term: i for i, term in enumerate(terms)}
+
+    # Doc-major triplets, rows l2-normalized
+    df = np.zeros(len(terms), dtype=np.int64)
+    docs, cols, tf = [], [], []
+    for doc_id, row in enumerate(counts):
+        for term, count in row.items():
+            docs.append(doc_id)
+            cols.append(ids[term])
+            tf.append(count)
+    docs = np.asarray(docs, dtype=np.int32)
+    cols = np.asarray(cols, dtype=np.int64)
+    np.add.at(df, cols, 1)
+    idf = np.log((1.0 + len(texts)) / (1.0 + df)) + 1.0
+    weights = np.asarray(tf, dtype=np.float64) * idf[cols]
+    norms = np.zeros(len(texts))
+    np.add.at(norms, docs, weights * weights)
+    weights /= np.sqrt(norms[docs])
+
+    # Column-major: a stable sort by term keeps each column's doc ids ascending
+    order = np.argsort(cols, kind="stable")
+    colptr = np.zeros(len(terms) + 1, dtype=np.int64)
+    np.cumsum(df, out=colptr[1:])
+    return terms, idf, colptr, docs[order], weights[order]
+
+
+def build_fields(checksum, doc_authors, doc_tags):
+    """
+    doc_authors: author name of every document
+    doc_tags:    normalized tags of every document
+    """
+    texts = {
+        "author": [name or "" for name in doc_authors],
+        "tag": [" ".join(tags) for tags in doc_tags],
+    }
+    header = {"checksum": checksum, "num_docs": len(texts["author"])}
+    arrays = {}
+    for field in FIELDS:
+        terms, idf, colptr, docs, weights = _tfidf_columns(texts[field])
+        offsets, pool = pack_strings(terms)
+        arrays[f"{field}_offsets"] = offsets
+        arrays[f"{field}_pool"] = pool
+        arrays[f"{field}_idf"] = idf
+        arrays[f"{field}_colptr"] = colptr
+        arrays[f"{field}_docs"] = docs
+        arrays[f"{field}_weights"] = weights
+    return FieldIndex(header, arrays)
+
+
+def load_fields(path, checksum=None, use_mmap=False):
+    """Load quotes.fields; StaleIndexError when built from another corpus."""
+    header, arrays = read_sections(path, FIELDS_MAGIC, FIELDS_VERSION, use_mmap)
+    if checksum is not None and header["checksum"] != checksum:
+        raise StaleIndexError(f"{path}: built from a different corpus")
+    return FieldIndex(header, arrays)
+
+
+class FieldIndex:
+
+    def __init__(self, header, arrays):
+        self.header = header
+        self.arrays = arrays
+        self.num_docs = header["num_docs"]
+        self.vocabulary = {}
+        self.matrix = {}
+        self.encoders = {}
+        for field in FIELDS:
+            terms = StringPool(arrays[f"{field}_offsets"], arrays[f"{field}_pool"])
+            vocabulary = {term: i for i, term in enumerate(terms)}
+            self.vocabulary[field] = vocabulary
+            self.matrix[field] = csc_matrix(
+                (arrays[f"{field}_weights"], arrays[f"{field}_docs"],
+                 arrays[f"{field}_colptr"]),
+                shape=(self.num_docs, len(terms)),
+            )
+            self.encoders[field] = QueryEncoder(
+                vocabulary, arrays[f"{field}_idf"], token_pattern=TOKEN_PATTERN
+            )
+
+    def save(self, path):
+        write_sections(path, self.header, self.arrays, FIELDS_MAGIC, FIELDS_VERSION)
+
+    def postings(self, field, term):
+        """Sorted doc ids whose field contains term (empty when unknown)."""
+        col = self.vocabulary[field].get(term)
+        if col is None:
+            return self.matrix[field].indices[:0]
+        matrix = self.matrix[field]
+        return matrix.indices[matrix.indptr[col]:matrix.indptr[col + 1]]
+
+    def docs(self, field, text):
+        """Sorted doc ids sharing at least one term with text on field."""
+        ids = self.encoders[field].encode(text)[0]
+        matrix = self.matrix[field]
+        return np.unique(np.concatenate(
+            [matrix.indices[matrix.indptr[t]:matrix.indptr[t + 1]] for t in ids]
+            or [np.zeros(0, dtype=np.int32)]
+        ))
+
+    def scores(self, field, text):
+        """Cosine of text against every document's field; None without known terms."""
+        ids, weights = self.encoders[field].encode(text)
+        if not len(ids):
+            return None
+        return self.matrix[field][:, ids] @ weights
@@ -0,0 +1,258 @@
+from collections import deque
+from html.parser import HTMLParser
+
+
+# ------------------------------------------------------------------------------
+# Streaming parser for the crawler's HTML output
+#
+# Produces the same records BeautifulSoup(...).find_all("p") and
+# find_all("div", class_="quote") would, but from an event-driven parser fed
+# fixed-size chunks: only the blocks that are currently open are held in
+# memory, never the whole document tree.
+# ------------------------------------------------------------------------------
+CHUNK_SIZE = 1 << 16
+
+# Elements that never have children (BeautifulSoup's html.parser rules)
+VOID_ELEMENTS = {
+    "area", "base", "basefont", "bgsound", "br", "col", "command", "embed",
+    "frame", "hr", "image", "img", "input", "isindex", "keygen", "link",
+    "menuitem", "meta", "nextid", "param", "source", "spacer", "track", "wbr",
+}
+
+# Text inside these is not part of get_text() / stripped_strings
+SKIP_TEXT = {"script", "style", "template"}
+
+
+class _Open:
+    """One element on the open-element stack."""
+    __slots__ = ("name", "sinks", "on_close", "tag_groups")
+
+    def __init__(self, name):
+        self.name = name
+        self.sinks = []
+        self.on_close = None
+        self.tag_groups = None
+
+
+class QuoteBlockParser(HTMLParser):
+    """
+    Event-driven extractor. Completed records are queued in document order
+    (by start tag) and drained with pop_ready():
+
+        ("p", strong_text, strings)
+            strong_text: get_text(strip=True) of the first <strong> inside,
+                         or None when there is none
+            strings:     the block's stripped_strings
+        ("quote", text, author, tags)
+            for <div class="quote"> with span.text / span.author / div.tags a
+            (text is None when the div has no span.text)
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self._stack = []
+        self._order = deque()
+        self._text = []
+        self._skip_depth = 0
+        # Void tags opened as <br>; a later </br> for them is swallowed
+        # without ending the current text run, as BeautifulSoup does
+        self._void_open = []
+
+    # -- HTMLParser callbacks ---------------------------------------------
+
+    def handle_starttag(self, tag, attrs):
+        self._flush_text()
+        if tag in VOID_ELEMENTS:
+            self._void_open.append(tag)
+            return
+        self._open(tag, attrs)
+
+    def handle_startendtag(self, tag, attrs):
+        self._flush_text()
+        if tag in VOID_ELEMENTS:
+            return
+        self._open(tag, attrs)
+        self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        if tag in VOID_ELEMENTS:
+            if tag in self._void_open:
+                self._void_open.remove(tag)
+            else:
+                self._flush_text()
+            return
+        self._flush_text()
+
+        # Pop back to the most recent open element with this name;
+        # stray end tags are ignored.
+        for pos in range(len(self._stack) - 1, -1, -1):
+            if self._stack[pos].name == tag:
+                while len(self._stack) > pos:
+                    self._close(self._stack.pop())
+                break
+
+    def handle_data(self, data):
+        self._text.append(data)
+
+    def handle_comment(self, data):
+        self._flush_text()
+
+    def handle_decl(self, decl):
+        self._flush_text()
+
+    def handle_pi(self, data):
+        self._flush_text()
+
+    def unknown_decl(self, data):
+        self._flush_text()
+        if data.startswith("CDATA["):
+            self._emit_string(data[6:])
+
+    def close(self):
+        super().close()
+        self._flush_text()
+        while self._stack:
+            self._close(self._stack.pop())
+
+    # -- internals --------------------------------------------------------
+
+    def _open(self, tag, attrs):
+        entry = _Open(tag)
+        classes = set()
+        for key, value in attrs:
+            if key == "class" and value:
+                classes.update(value.split())
+
+        if tag in SKIP_TEXT:
+            self._skip_depth += 1
+
+        if tag == "p":
+            rec = {"kind": "p", "done": False, "strings": [], "strong": None}
+            entry.sinks.append(rec["strings"])
+            entry.on_close = rec
+            self._order.append(rec)
+
+        elif tag == "strong":
+            for rec in self._open_records("p"):
+                if rec["strong"] is None:
+                    rec["strong"] = []
+                    entry.sinks.append(rec["strong"])
+
+        elif tag == "div" and "quote" in classes:
+            rec = {"kind": "quote", "done": False,
+                   "text": None, "author": None, "tags": None}
+            entry.on_close = rec
+            self._order.append(rec)
+
+        if tag == "span":
+            for rec in self._open_records("quote"):
+                for field in ("text", "author"):
+                    if field in classes and rec[field] is None:
+                        rec[field] = []
+                        entry.sinks.append(rec[field])
+
+        if tag == "div" and "tags" in classes:
+            groups = [r for r in self._open_records("quote") if r["tags"] is None]
+            for rec in groups:
+                rec["tags"] = []
+            entry.tag_groups = groups
+
+        if tag == "a":
+            for open_entry in self._stack:
+                for rec in open_entry.tag_groups or ():
+                    parts = []
+                    rec["tags"].append(parts)
+                    entry.sinks.append(parts)
+
+        self._stack.append(entry)
+
+    def pop_ready(self):
+        """Yield records whose block (and every block opened before it) closed."""
+        while self._order and self._order[0]["done"]:
+            yield self._finish(self._order.popleft())
+
+    def _open_records(self, kind):
+        for entry in self._stack:
+            rec = entry.on_close
+            if rec is not None and rec["kind"] == kind:
+                yield rec
+
+    def _flush_text(self):
+        if self._text:
+            data = "".join(self._text)
+            self._text = []
+            if not self._skip_depth:
+                self._emit_string(data)
+
+    def _emit_string(self, data):
+        value = data.strip()
+        if not value:
+            return
+        for entry in self._stack:
+            for sink in entry.sinks:
+                sink.append(value)
+
+    def _close(self, entry):
+        if entry.name in SKIP_TEXT:
+            self._skip_depth -= 1
+        if entry.on_close is not None:
+            entry.on_close["done"] = True
+
+    @staticmethod
+    def _finish(rec):
+        if rec["kind"] == "p":
+            strong = rec["strong"]
+            return ("p", None if strong is None else "".join(strong), rec["strings"])
+
+        text = rec["text"]
+        return (
+            "quote",
+            None if text is None else "".join(text),
+            "".join(rec["author"] or []),
+            ["".join(parts) for parts in rec["tags"] or []],
+        )
+
+
+# ------------------------------------------------------------------------------
+# Record iterators
+# ------------------------------------------------------------------------------
+def iter_html_blocks(path, chunk_size=CHUNK_SIZE):
+    """Stream QuoteBlockParser records from an HTML file."""
+    parser = QuoteBlockParser()
+    with open(path, "r", encoding="utf-8") as fp:
+        while True:
+            chunk = fp.read(chunk_size)
+            if not chunk:
+                break
+            parser.feed(chunk)
+            yield from parser.pop_ready()
+    parser.close()
+    yield from parser.pop_ready()
+
+
+def iter_quote_records(path, chunk_size=CHUNK_SIZE):
+    """
+    Yield (quote, author, tags) for every <p> block of the form
+        <strong>Quote text</strong><br>
+        — Author<br>
+        Tags: tag1, tag2, ...
+    Tags are stripped but otherwise left as written.
+    """
+    for event in iter_html_blocks(path, chunk_size):
+        if event[0] != "p" or not event[1]:
+            continue
+
+        quote_line, parts = event[1], event[2]
+        author = ""
+        tags = []
+
+        k = 1
+        while k < len(parts):
+            txt = parts[k].strip()
+            if txt.startswith("—"):
+                author = txt[1:].strip()
+            elif txt.startswith("Tags:"):
+                tags = [t.strip() for t in txt[5:].split(",")]
+            k += 1
+
+        yield quote_line, author, tags
@@ -0,0 +1,391 @@
+import hashlib
+import json
+import mmap
+import os
+import re
+import struct
+from collections.abc import Mapping, Sequence
+
+import numpy as np
+from scipy.sparse import csr_matrix
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+
+# ------------------------------------------------------------------------------
+# Binary index artifact
+#
+# File layout:
+#     8 bytes   magic b"QLINDEX\0"
+#     4 bytes   format version   (little-endian uint32)
+#     4 bytes   header length    (little-endian uint32)
+#     header    UTF-8 JSON: checksum, counts, vectorizer params, section table
+#     sections  raw little-endian arrays, each aligned to SECTION_ALIGN bytes
+#
+# Sections are laid out so they can be memory-mapped read-only and used in
+# place: every process that maps the same file shares one page-cache copy.
+# ------------------------------------------------------------------------------
+MAGIC = b"QLINDEX\0"
+FORMAT_VERSION = 2
+SECTION_ALIGN = 64
+_PREFIX = struct.Struct("<8sII")
+
+VECTORIZER_PARAMS = {"stop_words": "english", "min_df": 1}
+
+
+class StaleIndexError(RuntimeError):
+    """Raised when an artifact is unreadable, outdated or built from another corpus."""
+
+
+def normalize_tag(value: str) -> str:
+    """Strip weird spaces, collapse whitespace, lowercase the tag."""
+    if not isinstance(value, str):
+        return ""
+    cleaned = value.replace("\xa0", " ")
+    cleaned = re.sub(r"\s+", " ", cleaned).strip()
+    return cleaned.lower()
+
+
+def corpus_checksum(paths, chunk_size=1 << 20):
+    """SHA-256 over the contents of every source file, in order."""
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, "rb") as fp:
+            while True:
+                chunk = fp.read(chunk_size)
+                if not chunk:
+                    break
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+# ------------------------------------------------------------------------------
+# Low-level section container (shared by every binary file we write)
+# ------------------------------------------------------------------------------
+def pack_strings(values):
+    """Encode a list of strings as (offsets, utf-8 pool) arrays."""
+    encoded = [v.encode("utf-8") for v in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    if encoded:
+        np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    pool = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+    return offsets, pool
+
+
+class StringPool(Sequence):
+    """Lazily decoded list of strings backed by (offsets, pool) arrays."""
+
+    def __init__(self, offsets, pool):
+        self.offsets = offsets
+        self.pool = pool
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return self.raw(i).decode("utf-8")
+
+    def raw(self, i):
+        return self.pool[self.offsets[i]:self.offsets[i + 1]].tobytes()
+
+    def find(self, value):
+        """Position of value in a sorted pool, or -1 (binary search)."""
+        key = value.encode("utf-8")
+        lo, hi = 0, len(self)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.raw(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < len(self) and self.raw(lo) == key:
+            return lo
+        return -1
+
+
+class PooledMapping(Mapping):
+    """
+    Read-only dict over a sorted StringPool of keys.
+    Lookups are binary searches, so nothing is materialized at load time.
+    """
+
+    def __init__(self, keys, value_at=None):
+        self.keys_pool = keys
+        self.value_at = value_at or (lambda i: i)
+
+    def __getitem__(self, key):
+        if not isinstance(key, str):
+            raise KeyError(key)
+        pos = self.keys_pool.find(key)
+        if pos < 0:
+            raise KeyError(key)
+        return self.value_at(pos)
+
+    def __contains__(self, key):
+        return isinstance(key, str) and self.keys_pool.find(key) >= 0
+
+    def __iter__(self):
+        return iter(self.keys_pool)
+
+    def __len__(self):
+        return len(self.keys_pool)
+
+
+def write_sections(path, header, sections, magic=MAGIC, version=FORMAT_VERSION):
+    """
+    Write named numpy arrays behind a JSON header.
+    The section table (offset/dtype/shape) is added to `header`.
+
+    The file is written next to `path` and renamed over it, so readers
+    (including live memory maps of the previous file) never see a partial
+    artifact.
+    """
+    arrays = {name: np.ascontiguousarray(arr) for name, arr in sections.items()}
+
+    # Offsets depend on the header size, which depends on the offsets;
+    # iterate until the header length is stable.
+    header = dict(header)
+    header_len = 0
+    while True:
+        table = {}
+        pos = _align(_PREFIX.size + header_len)
+        for name, arr in arrays.items():
+            table[name] = {
+                "offset": pos,
+                "dtype": arr.dtype.newbyteorder("<").str,
+                "shape": list(arr.shape),
+            }
+            pos = _align(pos + arr.nbytes)
+        header["sections"] = table
+        blob = json.dumps(header, sort_keys=True).encode("utf-8")
+        if len(blob) == header_len:
+            break
+        header_len = len(blob)
+
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as fp:
+        fp.write(_PREFIX.pack(magic, version, len(blob)))
+        fp.write(blob)
+        for name, arr in arrays.items():
+            fp.write(b"\0" * (table[name]["offset"] - fp.tell()))
+            fp.write(arr.astype(table[name]["dtype"], copy=False).tobytes())
+    os.replace(tmp, path)
+
+
+def read_sections(path, magic=MAGIC, version=FORMAT_VERSION, use_mmap=False):
+    """
+    Return (header, {name: array}) for a file written by write_sections.
+    With use_mmap the arrays are read-only views into a shared file mapping.
+    """
+    with open(path, "rb") as fp:
+        if use_mmap:
+            buf = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            buf = fp.read()
+    return _parse_sections(path, buf, magic, version)
+
+
+def _parse_sections(path, buf, magic, version):
+    if len(buf) < _PREFIX.size:
+        raise StaleIndexError(f"{path}: truncated artifact")
+
+    found_magic, found_version, header_len = _PREFIX.unpack_from(buf, 0)
+    if found_magic != magic:
+        raise StaleIndexError(f"{path}: not an index artifact")
+    if found_version != version:
+        raise StaleIndexError(
+            f"{path}: format version {found_version}, expected {version}"
+        )
+
+    start = _PREFIX.size
+    header = json.loads(bytes(buf[start:start + header_len]).decode("utf-8"))
+
+    arrays = {}
+    for name, spec in header["sections"].items():
+        dtype = np.dtype(spec["dtype"])
+        count = int(np.prod(spec["shape"], dtype=np.int64))
+        arrays[name] = np.frombuffer(
+            buf, dtype=dtype, count=count, offset=spec["offset"]
+        ).reshape(spec["shape"])
+    return header, arrays
+
+
+def _align(pos):
+    return (pos + SECTION_ALIGN - 1) // SECTION_ALIGN * SECTION_ALIGN
+
+
+# ------------------------------------------------------------------------------
+# Quote index artifact
+# ------------------------------------------------------------------------------
+def save_index(path, vectorizer, doc_vectors, metadata, source_files, checksum=None):
+    """
+    Persist a fitted TF-IDF index.
+
+    metadata: list of dicts with "quote", "author", "tags" (raw tags as parsed)
+    checksum: corpus_checksum(source_files) when the caller already has it
+    """
+    doc_vectors = csr_matrix(doc_vectors)
+    doc_vectors.sort_indices()
+    # indptr and indices must share a dtype or scipy copies them on load
+    index_dtype = np.int32 if doc_vectors.nnz < 2 ** 31 else np.int64
+
+    vocab = vectorizer.get_feature_names_out().tolist()
+    vocab_offsets, vocab_pool = pack_strings(vocab)
+
+    tag_names, tag_indptr, tag_docs = _build_tag_postings(metadata)
+    tag_offsets, tag_pool = pack_strings(tag_names)
+
+    quote_offsets, quote_pool = pack_strings([m["quote"] for m in metadata])
+    author_offsets, author_pool = pack_strings([m["author"] for m in metadata])
+    doc_tag_indptr = np.zeros(len(metadata) + 1, dtype=np.int64)
+    if metadata:
+        np.cumsum([len(m["tags"]) for m in metadata], out=doc_tag_indptr[1:])
+    raw_tag_offsets, raw_tag_pool = pack_strings(
+        [t for m in metadata for t in m["tags"]]
+    )
+
+    header = {
+        "format_version": FORMAT_VERSION,
+        "checksum": checksum or corpus_checksum(source_files),
+        "sources": [_file_stamp(p) for p in source_files],
+        "num_docs": int(doc_vectors.shape[0]),
+        "num_terms": int(doc_vectors.shape[1]),
+        "vectorizer": VECTORIZER_PARAMS,
+    }
+    sections = {
+        "vocab_offsets": vocab_offsets,
+        "vocab_pool": vocab_pool,
+        "idf": np.asarray(vectorizer.idf_, dtype=np.float64),
+        "indptr": doc_vectors.indptr.astype(index_dtype),
+        "indices": doc_vectors.indices.astype(index_dtype),
+        "data": doc_vectors.data.astype(np.float64),
+        "tag_offsets": tag_offsets,
+        "tag_pool": tag_pool,
+        "tag_indptr": tag_indptr,
+        "tag_docs": tag_docs,
+        "quote_offsets": quote_offsets,
+        "quote_pool": quote_pool,
+        "author_offsets": author_offsets,
+        "author_pool": author_pool,
+        "doc_tag_indptr": doc_tag_indptr,
+        "raw_tag_offsets": raw_tag_offsets,
+        "raw_tag_pool": raw_tag_pool,
+    }
+    write_sections(path, header, sections)
+
+
+def _file_stamp(path):
+    st = os.stat(path)
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+def _build_tag_postings(metadata):
+    """Normalized tag -> sorted doc ids, flattened into CSR-style arrays."""
+    postings = {}
+    for doc_id, m in enumerate(metadata):
+        for tag in m["tags"]:
+            norm = normalize_tag(tag)
+            if norm:
+                ids = postings.setdefault(norm, [])
+                if not ids or ids[-1] != doc_id:
+                    ids.append(doc_id)
+
+    names = sorted(postings)
+    indptr = np.zeros(len(names) + 1, dtype=np.int64)
+    if names:
+        np.cumsum([len(postings[t]) for t in names], out=indptr[1:])
+    docs = np.fromiter(
+        (d for t in names for d in postings[t]), dtype=np.int32, count=int(indptr[-1])
+    )
+    return names, indptr, docs
+
+
+class QuoteRecords(Sequence):
+    """Per-document metadata dicts decoded on access from the string pools."""
+
+    def __init__(self, quotes, authors, doc_tag_indptr, raw_tags):
+        self.quotes = quotes
+        self.authors = authors
+        self.doc_tag_indptr = doc_tag_indptr
+        self.raw_tags = raw_tags
+
+    def __len__(self):
+        return len(self.quotes)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        lo, hi = self.doc_tag_indptr[i], self.doc_tag_indptr[i + 1]
+        return {
+            "id": int(i),
+            "quote": self.quotes[i],
+            "author": self.authors[i],
+            "tags": [self.raw_tags[t] for t in range(lo, hi)],
+        }
+
+
+class LoadedIndex:
+    """
+    Read-only view over an artifact written by save_index.
+    Nothing proportional to the index size is decoded at load time.
+    """
+
+    def __init__(self, header, arrays):
+        self.header = header
+        self.checksum = header["checksum"]
+
+        self.vocabulary = StringPool(arrays["vocab_offsets"], arrays["vocab_pool"])
+        self.idf = arrays["idf"]
+        self.doc_vectors = csr_matrix(
+            (arrays["data"], arrays["indices"], arrays["indptr"]),
+            shape=(header["num_docs"], header["num_terms"]),
+            copy=False,
+        )
+
+        indptr, docs = arrays["tag_indptr"], arrays["tag_docs"]
+        self.tag_names = StringPool(arrays["tag_offsets"], arrays["tag_pool"])
+        self.tag_index = PooledMapping(
+            self.tag_names, lambda i: docs[indptr[i]:indptr[i + 1]]
+        )
+
+        self.metadata = QuoteRecords(
+            StringPool(arrays["quote_offsets"], arrays["quote_pool"]),
+            StringPool(arrays["author_offsets"], arrays["author_pool"]),
+            arrays["doc_tag_indptr"],
+            StringPool(arrays["raw_tag_offsets"], arrays["raw_tag_pool"]),
+        )
+
+    def build_vectorizer(self):
+        """Recreate the fitted TfidfVectorizer without refitting."""
+        vec = TfidfVectorizer(**self.header["vectorizer"])
+        vec.vocabulary_ = PooledMapping(self.vocabulary)
+        vec.idf_ = self.idf
+        return vec
+
+
+def load_index(path, source_files=None, use_mmap=False, checksum=None):
+    """
+    Load an artifact. When source_files is given, the corpus checksum must
+    match, otherwise StaleIndexError is raised. Files whose size and mtime
+    match the ones recorded at build time are trusted without re-hashing.
+
+    use_mmap maps the file read-only instead of reading it into memory.
+    checksum: corpus_checksum(source_files) when the caller already has it
+    """
+    header, arrays = read_sections(path, use_mmap=use_mmap)
+
+    if source_files is not None:
+        stamps = [_file_stamp(p) for p in source_files]
+        if stamps != header.get("sources"):
+            current = checksum or corpus_checksum(source_files)
+            if current != header["checksum"]:
+                raise StaleIndexError(f"{path}: built from a different corpus")
+
+    return LoadedIndex(header, arrays)
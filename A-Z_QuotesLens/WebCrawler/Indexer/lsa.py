@@ -0,0 +1,181 @@
+import numpy as np
+from sklearn.cluster import MiniBatchKMeans
+from sklearn.decomposition import TruncatedSVD
+
+from index_store import StaleIndexError, read_sections, write_sections
+from ranking import score_rows
+
+
+# ------------------------------------------------------------------------------
+# LSA projection + IVF candidate index
+#
+# Documents are projected into a low-rank LSA space with truncated SVD and
+# stored as a compact float32 matrix of unit rows. A coarse quantizer
+# (k-means centroids) partitions them into inverted lists, so a query only
+# looks at the lists of its `nprobe` nearest centroids:
+#
+#     1. project the query's TF-IDF vector with the SVD components
+#     2. pick the nprobe closest centroids, gather their documents
+#     3. score those candidates in LSA space, keep the best `rerank`
+#     4. re-rank the shortlist by exact TF-IDF cosine (the exhaustive
+#        engine's scores); candidates with no query term in common are
+#        kept behind them, in LSA order, when their LSA similarity reaches
+#        `min_semantic`
+#
+# Step 4 is what makes short queries useful: a related quote that shares no
+# word with the query still turns up, but never ahead of a lexical match.
+#
+# File (quotes.lsa, write_sections container):
+#     components  terms x dims  float32   SVD basis, one row per term
+#     embeddings  docs x dims   float32   unit-length document vectors
+#     centroids   lists x dims  float32   unit-length coarse quantizer
+#     list_ptr    lists + 1     int64     CSR offsets into list_docs
+#     list_docs   docs          int32     doc ids grouped by list, ascending
+# ------------------------------------------------------------------------------
+LSA_MAGIC = b"QLLSA\0\0\0"
+LSA_VERSION = 1
+
+DEFAULT_DIMS = 128
+RERANK_FACTOR = 20
+MIN_RERANK = 100
+MIN_SEMANTIC = 0.3
+
+
+def _unit_rows(mat):
+    norms = np.linalg.norm(mat, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return mat / norms
+
+
+def default_lists(num_docs):
+    """About sqrt(n) inverted lists, each ~sqrt(n) documents long."""
+    return max(1, min(num_docs, int(round(np.sqrt(num_docs)))))
+
+
+def default_nprobe(num_lists):
+    """Probe an eighth of the lists, at most 32."""
+    return max(1, min(32, -(-num_lists // 8)))
+
+
+def build_lsa(doc_vectors, checksum, dims=DEFAULT_DIMS, num_lists=None, seed=0):
+    """Fit the projection and the IVF index; returns an LsaIndex."""
+    num_docs, num_terms = doc_vectors.shape
+    dims = max(1, min(dims, num_terms - 1, num_docs - 1))
+
+    svd = TruncatedSVD(n_components=dims, algorithm="randomized", random_state=seed)
+    embeddings = _unit_rows(svd.fit_transform(doc_vectors)).astype(np.float32)
+
+    num_lists = num_lists or default_lists(num_docs)
+    kmeans = MiniBatchKMeans(
+        n_clusters=num_lists, random_state=seed, n_init=3,
+        batch_size=min(num_docs, 4096),
+    )
+    kmeans.fit(embeddings)
+    centroids = _unit_rows(kmeans.cluster_centers_).astype(np.float32)
+
+    # Assign by cosine to the normalized centroids, the way queries probe
+    assign = np.argmax(embeddings @ centroids.T, axis=1)
+    order = np.argsort(assign, kind="stable")
+    list_ptr = np.zeros(num_lists + 1, dtype=np.int64)
+    np.cumsum(np.bincount(assign, minlength=num_lists), out=list_ptr[1:])
+
+    header = {"checksum": checksum, "num_docs": int(num_docs), "dims": int(dims),
+              "num_lists": int(num_lists)}
+    arrays = {
+        "components": np.ascontiguousarray(svd.components_.T, dtype=np.float32),
+        "embeddings": embeddings,
+        "centroids": centroids,
+        "list_ptr": list_ptr,
+        "list_docs": order.astype(np.int32),
+    }
+    return LsaIndex(header, arrays)
+
+
+def load_lsa(path, checksum=None, use_mmap=False):
+    """Load quotes.lsa; StaleIndexError when built from another corpus."""
+    header, arrays = read_sections(path, LSA_MAGIC, LSA_VERSION, use_mmap)
+    if checksum is not None and header["checksum"] != checksum:
+        raise StaleIndexError(f"{path}: built from a different corpus")
+    return LsaIndex(header, arrays)
+
+
+class LsaIndex:
+
+    def __init__(self, header, arrays):
+        self.header = header
+        self.checksum = header["checksum"]
+        self.components = arrays["components"]
+        self.embeddings = arrays["embeddings"]
+        self.centroids = arrays["centroids"]
+        self.list_ptr = arrays["list_ptr"]
+        self.list_docs = arrays["list_docs"]
+        self.num_lists = len(self.list_ptr) - 1
+
+    def save(self, path):
+        write_sections(path, self.header, {
+            "components": self.components,
+            "embeddings": self.embeddings,
+            "centroids": self.centroids,
+            "list_ptr": self.list_ptr,
+            "list_docs": self.list_docs,
+        }, LSA_MAGIC, LSA_VERSION)
+
+    def project(self, q_vec):
+        """Unit LSA vector for a (1 x terms) TF-IDF query; None if it is empty."""
+        # Term-major basis: only the rows of the query's terms are touched
+        q_vec = q_vec.tocsr()
+        q = q_vec.data.astype(np.float32) @ self.components[q_vec.indices]
+        norm = np.linalg.norm(q)
+        if norm == 0:
+            return None
+        return q / norm
+
+    def candidates(self, q_lsa, nprobe):
+        """Doc ids in the nprobe inverted lists closest to the query."""
+        nprobe = min(nprobe, self.num_lists)
+        centroid_scores = self.centroids @ q_lsa
+        probe = np.argpartition(-centroid_scores, nprobe - 1)[:nprobe]
+        return np.concatenate([
+            self.list_docs[self.list_ptr[i]:self.list_ptr[i + 1]] for i in probe
+        ]).astype(np.int64)
+
+    def search(self, q_vec, k, matrix, allowed=None, nprobe=None, rerank=None,
+               min_semantic=MIN_SEMANTIC):
+        """
+        Approximate top-k: returns (doc_ids, exact TF-IDF scores), best first.
+        allowed: optional Bitset restricting the candidates (tag filters).
+        """
+        q_lsa = self.project(q_vec)
+        if q_lsa is None:
+            return _EMPTY, _EMPTY_SCORES
+
+        nprobe = nprobe or default_nprobe(self.num_lists)
+        probed = len(self.list_docs) * min(nprobe, self.num_lists) / self.num_lists
+        if allowed is not None and len(allowed) <= probed:
+            # A narrow tag filter: scanning its documents is cheaper than
+            # probing, and cannot miss matches in lists that were not probed
+            cand = allowed.to_ids()
+        else:
+            cand = self.candidates(q_lsa, nprobe)
+            if allowed is not None and len(cand):
+                cand = cand[allowed.contains(cand)]
+        if not len(cand):
+            return _EMPTY, _EMPTY_SCORES
+
+        # Coarse: LSA cosine on the float32 matrix, keep the best `rerank`
+        semantic = self.embeddings[cand] @ q_lsa
+        rerank = rerank or max(k * RERANK_FACTOR, MIN_RERANK)
+        if len(cand) > rerank:
+            keep = np.argpartition(-semantic, rerank - 1)[:rerank]
+            cand, semantic = cand[keep], semantic[keep]
+
+        # Fine: exact TF-IDF cosine, LSA similarity breaks ties (incl. zero)
+        exact = score_rows(q_vec, matrix, cand)
+        keep = (exact > 0) | (semantic >= min_semantic)
+        cand, exact, semantic = cand[keep], exact[keep], semantic[keep]
+        order = np.lexsort((cand, -semantic, -exact))[:k]
+        return cand[order], exact[order]
+
+
+_EMPTY = np.zeros(0, dtype=np.int64)
+_EMPTY_SCORES = np.zeros(0, dtype=np.float64)
@@ -0,0 +1,296 @@
+import numpy as np
+
+from index_store import StringPool, pack_strings, read_sections, write_sections
+
+
+# ------------------------------------------------------------------------------
+# Compressed postings file
+#
+# Sections:
+#     term_offsets, term_pool   sorted term dictionary (StringPool arrays)
+#     term_ptr                  byte offset of every term's entry in `blob`
+#     blob                      variable-byte encoded term entries
+#
+# A term entry is
+#     df
+#     [skip table]   only when df > SKIP_INTERVAL: for every block of
+#                    SKIP_INTERVAL postings, the gap from the previous block's
+#                    last doc id to this block's last doc id, and the block's
+#                    encoded length in bytes
+#     doc id gaps    first one relative to -1
+#
+# Integers are 7 bits per byte, low group first, high bit = "more follow".
+# Since every gap is relative to the previous doc id (across block
+# boundaries too), a block decodes on its own given the previous block's
+# last doc, which the skip table holds: a reader can jump straight to the
+# block that may contain a target id.
+# ------------------------------------------------------------------------------
+POSTINGS_MAGIC = b"QLPOSTS\0"
+POSTINGS_VERSION = 1
+SKIP_INTERVAL = 128
+# Longest encoding of one value: 64 bits in 7-bit groups
+MAX_VARBYTE = 10
+
+
+def varbyte_encode(values):
+    """Encode non-negative integers as one uint8 array."""
+    values = np.asarray(values, dtype=np.uint64)
+    nbytes = np.ones(len(values), dtype=np.int64)
+    shift = 7
+    while shift < 64:
+        more = values >= np.uint64(1 << shift)
+        if not more.any():
+            break
+        nbytes += more
+        shift += 7
+
+    starts = np.zeros(len(values), dtype=np.int64)
+    if len(values):
+        np.cumsum(nbytes[:-1], out=starts[1:])
+    out = np.empty(int(nbytes.sum()), dtype=np.uint8)
+
+    j = 0
+    while len(values) and j < nbytes.max():
+        m = nbytes > j
+        group = (values[m] >> np.uint64(7 * j)) & np.uint64(0x7F)
+        cont = np.where(nbytes[m] - 1 > j, 0x80, 0).astype(np.uint64)
+        out[starts[m] + j] = (group | cont).astype(np.uint8)
+        j += 1
+    return out
+
+
+def varbyte_decode(buf, count):
+    """
+    Decode `count` integers from the start of a uint8 buffer.
+    Returns (values, bytes consumed). Only the first count * MAX_VARBYTE
+    bytes are looked at, so the cost does not depend on what follows.
+    """
+    buf = np.asarray(buf, dtype=np.uint8)[:count * MAX_VARBYTE]
+    ends = np.flatnonzero(buf < 0x80)[:count]
+    if len(ends) < count:
+        raise ValueError("truncated varbyte stream")
+    if count == 0:
+        return np.zeros(0, dtype=np.int64), 0
+
+    starts = np.empty(count, dtype=np.int64)
+    starts[0] = 0
+    starts[1:] = ends[:-1] + 1
+    lengths = ends - starts + 1
+
+    values = np.zeros(count, dtype=np.uint64)
+    j = 0
+    while j < lengths.max():
+        m = lengths > j
+        group = buf[starts[m] + j].astype(np.uint64) & np.uint64(0x7F)
+        values[m] |= group << np.uint64(7 * j)
+        j += 1
+    return values.astype(np.int64), int(ends[-1]) + 1
+
+
+def encode_term(docs):
+    """One term entry (see the layout above) for ascending doc ids."""
+    docs = np.asarray(docs, dtype=np.int64)
+    gaps = np.diff(docs, prepend=-1)
+    parts = [varbyte_encode([len(docs)])]
+
+    if len(docs) > SKIP_INTERVAL:
+        blocks = [
+            varbyte_encode(gaps[s:s + SKIP_INTERVAL])
+            for s in range(0, len(docs), SKIP_INTERVAL)
+        ]
+        last = docs[SKIP_INTERVAL - 1::SKIP_INTERVAL].tolist()
+        if len(docs) % SKIP_INTERVAL:
+            last.append(int(docs[-1]))
+        skips = []
+        prev = -1
+        for doc, block in zip(last, blocks):
+            skips.extend((doc - prev, len(block)))
+            prev = doc
+        parts.append(varbyte_encode(skips))
+        parts.extend(blocks)
+    else:
+        parts.append(varbyte_encode(gaps))
+
+    return np.concatenate(parts)
+
+
+def save_postings(path, index, num_docs):
+    """Write {term: ascending doc ids} (QuoteIndexer.index) compressed."""
+    terms = sorted(index)
+    entries = [encode_term(index[t]) for t in terms]
+
+    term_ptr = np.zeros(len(terms) + 1, dtype=np.int64)
+    if entries:
+        np.cumsum([len(e) for e in entries], out=term_ptr[1:])
+    blob = np.concatenate(entries) if entries else np.zeros(0, dtype=np.uint8)
+
+    # Offsets only need as many bits as the data they point into
+    term_offsets, term_pool = pack_strings(terms)
+    offset_dtype = np.uint32 if max(len(blob), len(term_pool)) < 2 ** 32 else np.uint64
+
+    header = {
+        "format_version": POSTINGS_VERSION,
+        "num_docs": int(num_docs),
+        "num_terms": len(terms),
+        "skip_interval": SKIP_INTERVAL,
+    }
+    sections = {
+        "term_offsets": term_offsets.astype(offset_dtype),
+        "term_pool": term_pool,
+        "term_ptr": term_ptr.astype(offset_dtype),
+        "blob": blob,
+    }
+    write_sections(path, header, sections, magic=POSTINGS_MAGIC, version=POSTINGS_VERSION)
+
+
+# ------------------------------------------------------------------------------
+# Reader
+# ------------------------------------------------------------------------------
+class PostingsReader:
+    """
+    Random access to single terms of a postings file. With use_mmap nothing
+    but the section table is read up front; a term is decoded only when
+    asked for, and a cursor decodes one block at a time.
+    """
+
+    def __init__(self, path, use_mmap=True):
+        self.header, arrays = read_sections(
+            path, magic=POSTINGS_MAGIC, version=POSTINGS_VERSION, use_mmap=use_mmap
+        )
+        self.num_docs = self.header["num_docs"]
+        self.skip_interval = self.header["skip_interval"]
+        self.terms = StringPool(arrays["term_offsets"], arrays["term_pool"])
+        self.term_ptr = arrays["term_ptr"]
+        self.blob = arrays["blob"]
+
+    def __contains__(self, term):
+        return self.terms.find(term) >= 0
+
+    def __len__(self):
+        return len(self.terms)
+
+    def entry(self, term):
+        """
+        (df, block_last, block_start, entry bytes) of a term, or None.
+        block_last / block_start are empty for single-block terms.
+        """
+        t = self.terms.find(term)
+        if t < 0:
+            return None
+        buf = self.blob[int(self.term_ptr[t]):int(self.term_ptr[t + 1])]
+        (df,), pos = varbyte_decode(buf[:MAX_VARBYTE], 1)
+        df = int(df)
+
+        nblocks = -(-df // self.skip_interval)
+        if nblocks <= 1:
+            empty = np.zeros(0, dtype=np.int64)
+            return df, empty, empty, buf[pos:]
+
+        skips, used = varbyte_decode(buf[pos:pos + 2 * nblocks * MAX_VARBYTE], 2 * nblocks)
+        block_last = np.cumsum(skips[0::2]) - 1
+        block_start = np.zeros(nblocks, dtype=np.int64)
+        np.cumsum(skips[1::2][:-1], out=block_start[1:])
+        return df, block_last, block_start, buf[pos + used:]
+
+    def df(self, term):
+        entry = self.entry(term)
+        return 0 if entry is None else entry[0]
+
+    def postings(self, term):
+        """All doc ids of one term, ascending (empty when unknown)."""
+        entry = self.entry(term)
+        if entry is None:
+            return np.zeros(0, dtype=np.int64)
+        df, _, _, data = entry
+        gaps, _ = varbyte_decode(data, df)
+        return np.cumsum(gaps) - 1
+
+    def cursor(self, term):
+        return PostingsCursor(self, self.entry(term))
+
+
+class PostingsCursor:
+    """Forward iterator over one term's postings with skip-based seeking."""
+
+    def __init__(self, reader, entry):
+        self.skip_interval = reader.skip_interval
+        if entry is None:
+            entry = (0, np.zeros(0, dtype=np.int64), None, None)
+        self.df, self.block_last, self.block_start, self.data = entry
+        self.num_blocks = max(len(self.block_last), 1 if self.df else 0)
+        self.block = 0
+        self._load()
+
+    def _load(self):
+        self.pos = 0
+        if self.block >= self.num_blocks:
+            self.docs = np.zeros(0, dtype=np.int64)
+            return
+        if len(self.block_last) == 0:
+            gaps, _ = varbyte_decode(self.data, self.df)
+            self.docs = np.cumsum(gaps) - 1
+            return
+
+        b = self.block
+        count = min(self.skip_interval, self.df - b * self.skip_interval)
+        base = int(self.block_last[b - 1]) if b else -1
+        # Only this block's bytes: a load costs O(block), not O(rest of entry)
+        end = int(self.block_start[b + 1]) if b + 1 < self.num_blocks else len(self.data)
+        gaps, _ = varbyte_decode(self.data[int(self.block_start[b]):end], count)
+        self.docs = base + np.cumsum(gaps)
+
+    @property
+    def exhausted(self):
+        return self.block >= self.num_blocks
+
+    def doc(self):
+        """Current doc id, or None when exhausted."""
+        return None if self.exhausted else int(self.docs[self.pos])
+
+    def advance(self):
+        self.pos += 1
+        if self.pos >= len(self.docs):
+            self.block += 1
+            self._load()
+
+    def seek(self, target):
+        """Move to the first doc id >= target, skipping whole blocks."""
+        if self.exhausted or self.docs[self.pos] >= target:
+            return
+        # Targets inside the current block skip the block search
+        if len(self.block_last) and target > self.block_last[self.block]:
+            last = self.block_last[self.block:]
+            self.block += int(last.searchsorted(target))
+            self._load()
+            if self.exhausted:
+                return
+        self.pos = max(self.pos, int(self.docs.searchsorted(target)))
+        if self.pos >= len(self.docs):
+            self.block = self.num_blocks
+            self._load()
+
+
+def intersect(reader, terms):
+    """Doc ids containing every term; the rarest list drives the skips."""
+    cursors = [reader.cursor(t) for t in terms]
+    if not cursors or any(c.df == 0 for c in cursors):
+        return np.zeros(0, dtype=np.int64)
+    cursors.sort(key=lambda c: c.df)
+
+    out = []
+    lead, rest = cursors[0], cursors[1:]
+    while not lead.exhausted:
+        target = lead.doc()
+        matched = True
+        for c in rest:
+            c.seek(target)
+            if c.exhausted:
+                return np.asarray(out, dtype=np.int64)
+            if c.doc() != target:
+                matched = False
+                lead.seek(c.doc())
+                break
+        if matched:
+            out.append(target)
+            lead.advance()
+    return np.asarray(out, dtype=np.int64)
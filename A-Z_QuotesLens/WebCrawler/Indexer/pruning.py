@@ -0,0 +1,192 @@
+import heapq
+import sys
+
+import numpy as np
+from scipy.sparse import csc_matrix
+
+from ranking import score_rows, select_top_k
+
+
+# ------------------------------------------------------------------------------
+# Block-Max WAND over weighted postings
+#
+# Postings are the columns of the TF-IDF matrix: for every term the sorted
+# doc ids and their weights. Postings are cut into fixed-size blocks and the
+# maximum weight of each block (and of each whole list) is kept, so a
+# document-at-a-time walk can skip any run of documents whose score upper
+# bound cannot reach the current top-k threshold.
+# ------------------------------------------------------------------------------
+BLOCK_SIZE = 64
+
+# Scores computed here sum in a different order than the sparse product in
+# cosine_similarity; prune only below (1 - SLACK) * threshold and re-score the
+# survivors exactly so the final top-k is identical to the brute-force path.
+SLACK = 1e-9
+
+_EXHAUSTED = sys.maxsize
+
+
+class _Cursor:
+    __slots__ = ("pos", "end", "block", "last_block", "first_block", "start", "qw", "ub")
+
+    def __init__(self, start, end, first_block, last_block, qw, ub):
+        self.start = start
+        self.pos = start
+        self.end = end
+        self.first_block = first_block
+        self.block = first_block
+        self.last_block = last_block
+        self.qw = qw
+        self.ub = ub
+
+
+class WandSearcher:
+    """Exact top-k retrieval with dynamic pruning (Block-Max WAND)."""
+
+    def __init__(self, doc_vectors, block_size=BLOCK_SIZE):
+        self.doc_vectors = doc_vectors
+        self.block_size = block_size
+
+        csc = csc_matrix(doc_vectors)
+        csc.sort_indices()
+        self.ptr = csc.indptr.astype(np.int64)
+        self.docs = csc.indices
+        self.weights = csc.data
+
+        lengths = np.diff(self.ptr)
+        nblocks = (lengths + block_size - 1) // block_size
+        self.block_ptr = np.zeros(len(lengths) + 1, dtype=np.int64)
+        np.cumsum(nblocks, out=self.block_ptr[1:])
+
+        term_of_block = np.repeat(np.arange(len(lengths)), nblocks)
+        within = np.arange(len(term_of_block)) - self.block_ptr[term_of_block]
+        starts = self.ptr[term_of_block] + within * block_size
+        ends = np.minimum(starts + block_size, self.ptr[term_of_block + 1])
+
+        if len(starts):
+            self.block_max = np.maximum.reduceat(self.weights, starts)
+            self.block_last = self.docs[ends - 1]
+        else:
+            self.block_max = np.zeros(0)
+            self.block_last = np.zeros(0, dtype=self.docs.dtype)
+
+        self.term_max = np.zeros(len(lengths))
+        nonempty = lengths > 0
+        if nonempty.any():
+            self.term_max[nonempty] = np.maximum.reduceat(
+                self.weights, self.ptr[:-1][nonempty]
+            )
+
+    # ----------------------------------------------------------------------
+
+    def search(self, q_vec, k, allowed=None):
+        """
+        Return (doc_ids, scores) exactly as select_top_k over the full cosine
+        similarity would. `allowed` optionally restricts candidate docs.
+        """
+        cursors = []
+        for term, qw in zip(q_vec.indices, q_vec.data):
+            start, end = int(self.ptr[term]), int(self.ptr[term + 1])
+            if start == end or qw <= 0:
+                continue
+            cursors.append(_Cursor(
+                start, end,
+                int(self.block_ptr[term]), int(self.block_ptr[term + 1]),
+                float(qw), float(qw) * float(self.term_max[term])
+            ))
+
+        heap = []
+        candidates = []
+
+        while True:
+            cursors = [c for c in cursors if c.pos < c.end]
+            if not cursors:
+                break
+            cursors.sort(key=self._doc)
+
+            theta = heap[0] * (1 - SLACK) if len(heap) >= k else 0.0
+
+            # Pivot: first cursor where the summed upper bounds pass theta
+            acc = 0.0
+            pivot = -1
+            for i, c in enumerate(cursors):
+                acc += c.ub
+                if acc > theta:
+                    pivot = i
+                    break
+            if pivot < 0:
+                break
+
+            pdoc = self._doc(cursors[pivot])
+            while pivot + 1 < len(cursors) and self._doc(cursors[pivot + 1]) == pdoc:
+                pivot += 1
+            head = cursors[:pivot + 1]
+
+            # Block-max check: tighter bound from the blocks holding pdoc
+            # (a lagging cursor whose list ends before pdoc has no such block)
+            blocks = [self._shallow(c, pdoc) for c in head]
+            bound = 0.0
+            for c, b in zip(head, blocks):
+                if b < c.last_block:
+                    bound += c.qw * float(self.block_max[b])
+
+            if bound <= theta:
+                nxt = min(
+                    int(self.block_last[b])
+                    for c, b in zip(head, blocks) if b < c.last_block
+                ) + 1
+                if pivot + 1 < len(cursors):
+                    nxt = min(nxt, self._doc(cursors[pivot + 1]))
+                for c in head:
+                    self._seek(c, nxt)
+                continue
+
+            if self._doc(cursors[0]) == pdoc:
+                if allowed is None or pdoc in allowed:
+                    score = 0.0
+                    for c in head:
+                        score += c.qw * float(self.weights[c.pos])
+                    if score > theta:
+                        candidates.append(pdoc)
+                        if len(heap) < k:
+                            heapq.heappush(heap, score)
+                        elif score > heap[0]:
+                            heapq.heapreplace(heap, score)
+                for c in head:
+                    self._seek(c, pdoc + 1)
+            else:
+                for c in head:
+                    if self._doc(c) < pdoc:
+                        self._seek(c, pdoc)
+
+        rows = np.array(sorted(candidates), dtype=np.int64)
+        if len(rows) == 0:
+            return rows, np.zeros(0)
+        exact = score_rows(q_vec, self.doc_vectors, rows)
+        return select_top_k(exact, k, candidates=rows)
+
+    # ----------------------------------------------------------------------
+
+    def _doc(self, c):
+        return int(self.docs[c.pos]) if c.pos < c.end else _EXHAUSTED
+
+    def _shallow(self, c, target):
+        """
+        Block that would hold `target`, without moving the cursor;
+        c.last_block when the list ends before `target`.
+        """
+        last = self.block_last[c.block:c.last_block]
+        return c.block + int(np.searchsorted(last, target))
+
+    def _seek(self, c, target):
+        """Move the cursor to the first posting with doc id >= target."""
+        if c.pos >= c.end or self.docs[c.pos] >= target:
+            return
+        b = self._shallow(c, target)
+        if b >= c.last_block:
+            c.pos = c.end
+            return
+        c.block = b
+        lo = max(c.pos, c.start + (b - c.first_block) * self.block_size)
+        hi = min(c.end, lo + self.block_size)
+        c.pos = lo + int(np.searchsorted(self.docs[lo:hi], target))
@@ -0,0 +1,125 @@
+import csv
+import re
+
+import numpy as np
+from scipy.sparse import csr_matrix
+
+
+# ------------------------------------------------------------------------------
+# Query encoder
+#
+# TfidfVectorizer.transform on a one-to-five-word query spends most of its
+# time in parameter validation, the analyzer pipeline and building/normalizing
+# a CSR matrix through generic code. QueryEncoder keeps only what the fitted
+# vectorizer needs for a word-unigram model (vocabulary_, idf_, the token
+# pattern and the stop-word set) and computes the same vector directly:
+#
+#     1. lowercase, findall(token_pattern), drop stop words
+#     2. count the tokens that are in the vocabulary
+#     3. weight = count * idf[term], terms in ascending id order
+#     4. divide by the l2 norm, summed in that order like sklearn's
+#        inplace_csr_row_normalize_l2
+#
+# The result is bit-for-bit the vector sklearn returns, so every score and
+# every tie downstream is unchanged. test_query_encoder.py checks this
+# against sklearn for every query in the query log and every quote.
+# ------------------------------------------------------------------------------
+_EMPTY_IDS = np.zeros(0, dtype=np.int32)
+_EMPTY_WEIGHTS = np.zeros(0, dtype=np.float64)
+
+
+class QueryEncoder:
+    """Drop-in for a fitted TfidfVectorizer's transform() on short queries."""
+
+    def __init__(self, vocabulary, idf, token_pattern=r"(?u)\b\w\w+\b",
+                 stop_words=None, lowercase=True, sublinear_tf=False, norm="l2"):
+        self.vocabulary = vocabulary
+        self.idf = None if idf is None else np.asarray(idf, dtype=np.float64)
+        self.num_terms = len(vocabulary)
+        self.findall = re.compile(token_pattern).findall
+        self.stop_words = frozenset(stop_words or ())
+        self.lowercase = lowercase
+        self.sublinear_tf = sublinear_tf
+        self.norm = norm
+
+    @classmethod
+    def from_vectorizer(cls, vec):
+        """
+        Encoder for a fitted TfidfVectorizer. Only the default word-unigram
+        analyzer is supported; anything else raises ValueError.
+        """
+        unsupported = (
+            vec.analyzer != "word" or tuple(vec.ngram_range) != (1, 1)
+            or vec.tokenizer is not None or vec.preprocessor is not None
+            or vec.strip_accents is not None or vec.binary
+            or vec.input != "content" or vec.norm not in ("l2", None)
+        )
+        if unsupported:
+            raise ValueError("QueryEncoder only supports word-unigram TF-IDF vectorizers")
+        return cls(
+            vec.vocabulary_,
+            vec.idf_ if vec.use_idf else None,
+            token_pattern=vec.token_pattern,
+            stop_words=vec.get_stop_words(),
+            lowercase=vec.lowercase,
+            sublinear_tf=vec.sublinear_tf,
+            norm=vec.norm,
+        )
+
+    def encode(self, text):
+        """(term ids ascending, weights) of one query."""
+        if self.lowercase:
+            text = text.lower()
+
+        counts = {}
+        vocab_get = self.vocabulary.get
+        for token in self.findall(text):
+            if token in self.stop_words:
+                continue
+            term = vocab_get(token)
+            if term is not None:
+                counts[term] = counts.get(term, 0) + 1
+        if not counts:
+            return _EMPTY_IDS, _EMPTY_WEIGHTS
+
+        ids = sorted(counts)
+        weights = np.array([counts[t] for t in ids], dtype=np.float64)
+        ids = np.array(ids, dtype=np.int32)
+
+        if self.sublinear_tf:
+            np.log(weights, weights)
+            weights += 1.0
+        if self.idf is not None:
+            weights *= self.idf[ids]
+        if self.norm == "l2":
+            total = 0.0
+            for w in weights.tolist():
+                total += w * w
+            if total != 0.0:
+                weights /= np.sqrt(total)
+        return ids, weights
+
+    def transform(self, texts):
+        """CSR matrix with one row per text, like TfidfVectorizer.transform."""
+        if len(texts) == 1:
+            ids, weights = self.encode(texts[0])
+            indptr = np.array([0, len(ids)], dtype=np.int32)
+            return csr_matrix((weights, ids, indptr), shape=(1, self.num_terms))
+
+        encoded = [self.encode(text) for text in texts]
+        indptr = np.zeros(len(texts) + 1, dtype=np.int32)
+        np.cumsum([len(ids) for ids, _ in encoded], out=indptr[1:])
+        ids = np.concatenate([ids for ids, _ in encoded] or [_EMPTY_IDS])
+        weights = np.concatenate([w for _, w in encoded] or [_EMPTY_WEIGHTS])
+        return csr_matrix((weights, ids, indptr), shape=(len(texts), self.num_terms))
+
+
+# ------------------------------------------------------------------------------
+# Query logs
+# ------------------------------------------------------------------------------
+def read_queries(path):
+    """query_text column of a query CSV, or one query per line."""
+    with open(path, encoding="utf-8") as fp:
+        if path.endswith(".csv"):
+            return [row["query_text"] for row in csv.DictReader(fp) if row.get("query_text")]
+        return [line.rstrip("\n") for line in fp if line.strip()]
@@ -0,0 +1,40 @@
+import numpy as np
+from sklearn.metrics.pairwise import cosine_similarity
+
+
+# ------------------------------------------------------------------------------
+# Top-k selection shared by every ranking path
+# ------------------------------------------------------------------------------
+def select_top_k(scores, k, candidates=None):
+    """
+    Pick the k best positive scores without sorting the whole array.
+
+    scores:     1-D array of similarities
+    candidates: optional doc ids aligned with `scores` (when only a subset
+                of rows was scored); defaults to the positions themselves
+
+    Returns (doc_ids, scores) as arrays, best first; equal scores come in
+    ascending doc id order.
+    """
+    scores = np.asarray(scores)
+    pos = np.flatnonzero(scores > 0)
+    vals = scores[pos]
+
+    if 0 < k < len(vals):
+        # Keep everything tied with the k-th best so tie-breaking stays exact
+        kth = np.partition(vals, len(vals) - k)[len(vals) - k]
+        keep = vals >= kth
+        pos, vals = pos[keep], vals[keep]
+    elif k <= 0:
+        pos, vals = pos[:0], vals[:0]
+
+    ids = pos if candidates is None else np.asarray(candidates)[pos]
+    order = np.lexsort((ids, -vals))[:k]
+    return ids[order], vals[order]
+
+
+def score_rows(q_vec, matrix, rows=None):
+    """Cosine similarity of q_vec against all rows, or only the given ones."""
+    if rows is None:
+        return cosine_similarity(q_vec, matrix)[0]
+    return cosine_similarity(q_vec, matrix[rows])[0]
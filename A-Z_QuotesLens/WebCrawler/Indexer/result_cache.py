@@ -0,0 +1,95 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+# ------------------------------------------------------------------------------
+# Bounded LRU + TTL result cache
+#
+# Entries are tagged with the index generation they were computed against;
+# the first lookup made under a different generation drops everything, so a
+# reloaded index never serves results from the previous one.
+# ------------------------------------------------------------------------------
+class ResultCache:
+    """Thread-safe LRU cache with a size cap and per-entry time-to-live."""
+
+    def __init__(self, max_entries=1024, ttl=300.0, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.clock = clock
+        self._entries = OrderedDict()
+        self._generation = None
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0
+
+    def get(self, key, generation):
+        """Return the cached value, or None on a miss."""
+        if not self.enabled:
+            return None
+
+        with self._lock:
+            self._sync_generation(generation)
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            value, stored_at = entry
+            if self.ttl and self.clock() - stored_at > self.ttl:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value, generation):
+        if not self.enabled:
+            return
+
+        with self._lock:
+            self._sync_generation(generation)
+            self._entries[key] = (value, self.clock())
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "generation": self._generation,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
+
+    def _sync_generation(self, generation):
+        if generation != self._generation:
+            if self._entries:
+                self.invalidations += 1
+                self._entries.clear()
+            self._generation = generation
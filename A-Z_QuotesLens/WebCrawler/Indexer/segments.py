@@ -0,0 +1,583 @@
+import json
+import math
+import os
+import sys
+import threading
+from collections import Counter
+
+import numpy as np
+from scipy.sparse import csr_matrix, vstack
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.preprocessing import normalize
+
+from index_store import (
+    VECTORIZER_PARAMS, QuoteRecords, StaleIndexError, StringPool,
+    pack_strings, read_sections, save_index, write_sections
+)
+from ranking import select_top_k
+from sources import iter_records
+
+
+# ------------------------------------------------------------------------------
+# Segment-based incremental index
+#
+# New quotes are written to small immutable segment files holding raw term
+# counts, never TF-IDF weights. idf is derived at query time from the live
+# document frequencies of every segment together, so scores always match a
+# TfidfVectorizer fitted on the current live corpus. Deletes only add the
+# global doc id to a tombstone set in the manifest; merges rewrite segments
+# without their deleted documents.
+#
+# Directory layout:
+#     manifest.json     segment list, tombstones, id counters (atomic rewrite)
+#     seg_000001.seg    write_sections container (magic b"QLSEGMT\0")
+# ------------------------------------------------------------------------------
+SEGMENT_MAGIC = b"QLSEGMT\0"
+SEGMENT_VERSION = 1
+MANIFEST_FILE = "manifest.json"
+
+# Merge once this many segments fall in the same size tier
+MERGE_FACTOR = 4
+# Rewrite a segment on its own once this fraction of it is deleted
+COMPACT_RATIO = 0.5
+
+
+class Segment:
+    """One immutable segment: counts matrix, local vocabulary, metadata."""
+
+    def __init__(self, name, header, arrays):
+        self.name = name
+        self.doc_ids = arrays["doc_ids"]
+        self.terms = StringPool(arrays["vocab_offsets"], arrays["vocab_pool"])
+        self.df = arrays["df"]
+        counts = csr_matrix(
+            (arrays["data"], arrays["indices"], arrays["indptr"]),
+            shape=(header["num_docs"], header["num_terms"]),
+            copy=False,
+        )
+        self.counts = counts
+        self.postings = counts.tocsc()
+        self.records = QuoteRecords(
+            StringPool(arrays["quote_offsets"], arrays["quote_pool"]),
+            StringPool(arrays["author_offsets"], arrays["author_pool"]),
+            arrays["doc_tag_indptr"],
+            StringPool(arrays["raw_tag_offsets"], arrays["raw_tag_pool"]),
+        )
+        # (stats generation, deleted rows, per-term idf, doc norms)
+        self._weights = None
+
+    def __len__(self):
+        return len(self.doc_ids)
+
+    def locate(self, doc_id):
+        """Row of a global doc id in this segment, or -1."""
+        row = int(np.searchsorted(self.doc_ids, doc_id))
+        if row < len(self.doc_ids) and self.doc_ids[row] == doc_id:
+            return row
+        return -1
+
+    def record(self, row):
+        rec = self.records[row]
+        rec["id"] = int(self.doc_ids[row])
+        return rec
+
+    def deleted_rows(self, deleted):
+        if not deleted:
+            return np.zeros(0, dtype=np.int64)
+        dead = np.fromiter(deleted, dtype=np.int64, count=len(deleted))
+        return np.flatnonzero(np.isin(self.doc_ids, dead))
+
+    def live_df(self, dead_rows):
+        """Per-term document frequency over the rows that are not deleted."""
+        if len(dead_rows) == 0:
+            return self.df
+        dead = self.counts[dead_rows]
+        return self.df - np.bincount(dead.indices, minlength=len(self.df))
+
+
+def build_segment(path, records):
+    """
+    Write a segment for records of (doc_id, quote, author, raw tags),
+    doc ids ascending.
+    """
+    analyze = TfidfVectorizer(**VECTORIZER_PARAMS).build_analyzer()
+    doc_counts = [Counter(analyze(quote)) for _, quote, _, _ in records]
+
+    terms = sorted(set().union(*doc_counts)) if doc_counts else []
+    column = {t: i for i, t in enumerate(terms)}
+
+    indptr = np.zeros(len(records) + 1, dtype=np.int64)
+    indices = []
+    data = []
+    for row, counts in enumerate(doc_counts):
+        cols = sorted(column[t] for t in counts)
+        indices.extend(cols)
+        data.extend(counts[terms[c]] for c in cols)
+        indptr[row + 1] = len(indices)
+
+    indices = np.asarray(indices, dtype=np.int32)
+    df = np.bincount(indices, minlength=len(terms)).astype(np.int64)
+
+    vocab_offsets, vocab_pool = pack_strings(terms)
+    quote_offsets, quote_pool = pack_strings([r[1] for r in records])
+    author_offsets, author_pool = pack_strings([r[2] for r in records])
+    doc_tag_indptr = np.zeros(len(records) + 1, dtype=np.int64)
+    if records:
+        np.cumsum([len(r[3]) for r in records], out=doc_tag_indptr[1:])
+    raw_tag_offsets, raw_tag_pool = pack_strings([t for r in records for t in r[3]])
+
+    header = {
+        "format_version": SEGMENT_VERSION,
+        "num_docs": len(records),
+        "num_terms": len(terms),
+    }
+    sections = {
+        "doc_ids": np.asarray([r[0] for r in records], dtype=np.int64),
+        "vocab_offsets": vocab_offsets,
+        "vocab_pool": vocab_pool,
+        "df": df,
+        "indptr": indptr,
+        "indices": indices.astype(np.int64),
+        "data": np.asarray(data, dtype=np.float64),
+        "quote_offsets": quote_offsets,
+        "quote_pool": quote_pool,
+        "author_offsets": author_offsets,
+        "author_pool": author_pool,
+        "doc_tag_indptr": doc_tag_indptr,
+        "raw_tag_offsets": raw_tag_offsets,
+        "raw_tag_pool": raw_tag_pool,
+    }
+    write_sections(path, header, sections, magic=SEGMENT_MAGIC, version=SEGMENT_VERSION)
+
+
+def load_segment(path, use_mmap=False):
+    header, arrays = read_sections(
+        path, magic=SEGMENT_MAGIC, version=SEGMENT_VERSION, use_mmap=use_mmap
+    )
+    return Segment(os.path.basename(path), header, arrays)
+
+
+# ------------------------------------------------------------------------------
+# Segmented index
+# ------------------------------------------------------------------------------
+class SegmentedIndex:
+    """
+    Append / delete / search over a directory of segments.
+
+    All public methods are thread-safe; searches work on a snapshot of the
+    segment list, so they never block on a running merge.
+    """
+
+    def __init__(self, directory, use_mmap=False):
+        self.directory = directory
+        self.use_mmap = use_mmap
+        self._lock = threading.RLock()
+        self._analyze = TfidfVectorizer(**VECTORIZER_PARAMS).build_analyzer()
+
+        self.segments = []
+        self.deleted = set()
+        self.next_doc_id = 0
+        self.next_segment = 1
+        # Bumped on every change to the live document set
+        self.generation = 0
+        self._stats = None
+
+        self._merge_wakeup = threading.Event()
+        self._merge_stop = threading.Event()
+        self._merger = None
+
+        os.makedirs(directory, exist_ok=True)
+        self._load_manifest()
+
+    # -- persistence ------------------------------------------------------
+
+    def _load_manifest(self):
+        path = os.path.join(self.directory, MANIFEST_FILE)
+        if not os.path.exists(path):
+            return
+        with open(path, "r", encoding="utf-8") as fp:
+            manifest = json.load(fp)
+        if manifest.get("format_version") != SEGMENT_VERSION:
+            raise StaleIndexError(f"{path}: unsupported manifest version")
+
+        self.next_doc_id = manifest["next_doc_id"]
+        self.next_segment = manifest["next_segment"]
+        self.deleted = set(manifest["deleted"])
+        self.segments = [
+            load_segment(os.path.join(self.directory, name), self.use_mmap)
+            for name in manifest["segments"]
+        ]
+
+    def _write_manifest(self):
+        manifest = {
+            "format_version": SEGMENT_VERSION,
+            "next_doc_id": self.next_doc_id,
+            "next_segment": self.next_segment,
+            "segments": [seg.name for seg in self.segments],
+            "deleted": sorted(self.deleted),
+        }
+        path = os.path.join(self.directory, MANIFEST_FILE)
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as fp:
+            json.dump(manifest, fp, indent=2)
+            fp.flush()
+            os.fsync(fp.fileno())
+        os.replace(tmp, path)
+
+    def _new_segment_path(self):
+        name = f"seg_{self.next_segment:06d}.seg"
+        self.next_segment += 1
+        return os.path.join(self.directory, name)
+
+    # -- writes -----------------------------------------------------------
+
+    def add(self, records):
+        """
+        Index new quotes given as (quote, author, raw tags) into one new
+        segment. Returns the global doc ids assigned to them.
+        """
+        records = list(records)
+        if not records:
+            return []
+
+        with self._lock:
+            first = self.next_doc_id
+            self.next_doc_id += len(records)
+            path = self._new_segment_path()
+
+        rows = [(first + i, q, a, list(t)) for i, (q, a, t) in enumerate(records)]
+        build_segment(path, rows)
+        segment = load_segment(path, self.use_mmap)
+
+        with self._lock:
+            self.segments.append(segment)
+            self._changed()
+            self._write_manifest()
+
+        self._merge_wakeup.set()
+        return [r[0] for r in rows]
+
+    def delete(self, doc_ids):
+        """Tombstone live documents; returns how many were deleted."""
+        removed = 0
+        with self._lock:
+            for doc_id in doc_ids:
+                doc_id = int(doc_id)
+                if doc_id in self.deleted:
+                    continue
+                if any(seg.locate(doc_id) >= 0 for seg in self.segments):
+                    self.deleted.add(doc_id)
+                    removed += 1
+            if removed:
+                self._changed()
+                self._write_manifest()
+
+        if removed:
+            self._merge_wakeup.set()
+        return removed
+
+    def reset(self):
+        """Drop every segment and tombstone (a full re-index starts here)."""
+        with self._lock:
+            names = [seg.name for seg in self.segments]
+            self.segments = []
+            self.deleted = set()
+            self.next_doc_id = 0
+            self._changed()
+            self._write_manifest()
+        for name in names:
+            os.remove(os.path.join(self.directory, name))
+
+    def _changed(self):
+        self.generation += 1
+        self._stats = None
+
+    # -- merging ----------------------------------------------------------
+
+    def pick_merge(self):
+        """
+        Tiered policy: segments are grouped by floor(log_MERGE_FACTOR(live
+        docs)); the smallest MERGE_FACTOR segments of the first full tier
+        are merged. Otherwise a segment that is mostly tombstones is
+        rewritten alone. Returns the chosen segments, or [].
+        """
+        with self._lock:
+            segments, deleted = list(self.segments), set(self.deleted)
+
+        tiers = {}
+        compact = []
+        for seg in segments:
+            dead = len(seg.deleted_rows(deleted))
+            live = len(seg) - dead
+            if len(seg) and dead / len(seg) >= COMPACT_RATIO:
+                compact.append(seg)
+            tier = int(math.log(max(live, 1), MERGE_FACTOR))
+            tiers.setdefault(tier, []).append((live, seg))
+
+        for tier in sorted(tiers):
+            if len(tiers[tier]) >= MERGE_FACTOR:
+                group = sorted(tiers[tier], key=lambda x: (x[0], x[1].name))
+                return [seg for _, seg in group[:MERGE_FACTOR]]
+
+        return compact[:1]
+
+    def merge(self, chosen):
+        """Rewrite `chosen` segments as one, dropping deleted documents."""
+        with self._lock:
+            deleted = set(self.deleted)
+            path = self._new_segment_path()
+
+        rows = []
+        for seg in chosen:
+            dead = set(seg.deleted_rows(deleted).tolist())
+            for row in range(len(seg)):
+                if row not in dead:
+                    rec = seg.record(row)
+                    rows.append((rec["id"], rec["quote"], rec["author"], rec["tags"]))
+        rows.sort(key=lambda r: r[0])
+
+        merged = None
+        if rows:
+            build_segment(path, rows)
+            merged = load_segment(path, self.use_mmap)
+
+        with self._lock:
+            names = {seg.name for seg in chosen}
+            if not names <= {seg.name for seg in self.segments}:
+                # Someone else merged these meanwhile
+                if merged is not None:
+                    os.remove(path)
+                return False
+
+            pos = min(i for i, seg in enumerate(self.segments) if seg.name in names)
+            kept = [seg for seg in self.segments if seg.name not in names]
+            if merged is not None:
+                kept.insert(pos, merged)
+            self.segments = kept
+
+            # Tombstones of documents that no longer exist anywhere are dropped
+            self.deleted = {
+                d for d in self.deleted
+                if any(seg.locate(d) >= 0 for seg in self.segments)
+            }
+            self._changed()
+            self._write_manifest()
+
+        for name in names:
+            os.remove(os.path.join(self.directory, name))
+        return True
+
+    def maybe_merge(self):
+        """Run merges until the policy has nothing left to do."""
+        merged = 0
+        while True:
+            chosen = self.pick_merge()
+            if not chosen:
+                return merged
+            if self.merge(chosen):
+                merged += 1
+
+    def start_background_merge(self, interval=5.0):
+        """Merge in a daemon thread after writes (and every `interval` s)."""
+        if self._merger is not None:
+            return
+
+        def run():
+            while not self._merge_stop.is_set():
+                self._merge_wakeup.wait(interval)
+                self._merge_wakeup.clear()
+                if not self._merge_stop.is_set():
+                    self.maybe_merge()
+
+        self._merge_stop.clear()
+        self._merger = threading.Thread(target=run, name="segment-merge", daemon=True)
+        self._merger.start()
+
+    def close(self):
+        """Stop the background merger, waiting for a running merge."""
+        if self._merger is not None:
+            self._merge_stop.set()
+            self._merge_wakeup.set()
+            self._merger.join()
+            self._merger = None
+
+    # -- reads ------------------------------------------------------------
+
+    def snapshot(self):
+        """(segments, global stats) consistent with each other."""
+        with self._lock:
+            if self._stats is None:
+                self._stats = self._global_stats(self.segments, self.deleted)
+            return list(self.segments), self._stats
+
+    def _global_stats(self, segments, deleted):
+        """Live doc count, term -> live df, and per-segment dead rows."""
+        df = Counter()
+        live = 0
+        dead_rows = {}
+        for seg in segments:
+            dead = seg.deleted_rows(deleted)
+            dead_rows[seg.name] = dead
+            live += len(seg) - len(dead)
+            seg_df = seg.live_df(dead)
+            for col in np.flatnonzero(seg_df):
+                df[seg.terms[int(col)]] += int(seg_df[col])
+        return {
+            "generation": self.generation,
+            "num_docs": live,
+            "df": df,
+            "dead_rows": dead_rows,
+        }
+
+    @staticmethod
+    def idf(stats, term):
+        """Smoothed idf, as TfidfVectorizer(smooth_idf=True) computes it."""
+        n = stats["num_docs"]
+        return math.log((1 + n) / (1 + stats["df"][term])) + 1
+
+    def _segment_weights(self, seg, stats):
+        cached = seg._weights
+        if cached is not None and cached[0] == stats["generation"]:
+            return cached
+
+        dead = stats["dead_rows"][seg.name]
+        seg_idf = np.array(
+            [self.idf(stats, t) if stats["df"][t] else 0.0 for t in seg.terms],
+            dtype=np.float64,
+        )
+        weighted = seg.counts.multiply(seg_idf.reshape(1, -1)).tocsr()
+        norms = np.sqrt(np.asarray(weighted.multiply(weighted).sum(axis=1)).ravel())
+        cached = (stats["generation"], dead, seg_idf, norms)
+        seg._weights = cached
+        return cached
+
+    def search(self, query, k=5):
+        """
+        Top-k (doc_id, score) over every live document, scored exactly as
+        cosine similarity between TF-IDF vectors fitted on the live corpus.
+        Ties are broken by ascending doc id.
+        """
+        segments, stats = self.snapshot()
+
+        q_counts = Counter(t for t in self._analyze(query) if stats["df"][t])
+        if not q_counts:
+            return []
+        q_weights = {t: c * self.idf(stats, t) for t, c in q_counts.items()}
+        q_norm = math.sqrt(sum(w * w for w in q_weights.values()))
+
+        ids = []
+        scores = []
+        for seg in segments:
+            _, dead, seg_idf, norms = self._segment_weights(seg, stats)
+            acc = np.zeros(len(seg), dtype=np.float64)
+            for term, qw in q_weights.items():
+                col = seg.terms.find(term)
+                if col < 0:
+                    continue
+                lo, hi = seg.postings.indptr[col], seg.postings.indptr[col + 1]
+                rows = seg.postings.indices[lo:hi]
+                acc[rows] += (qw / q_norm) * seg_idf[col] * seg.postings.data[lo:hi]
+
+            np.divide(acc, norms, out=acc, where=norms > 0)
+            acc[dead] = 0.0
+            hit = np.flatnonzero(acc > 0)
+            ids.append(seg.doc_ids[hit])
+            scores.append(acc[hit])
+
+        if not ids:
+            return []
+        ranked, vals = select_top_k(
+            np.concatenate(scores), k, candidates=np.concatenate(ids)
+        )
+        return [(int(d), float(s)) for d, s in zip(ranked, vals)]
+
+    def get(self, doc_id):
+        """Metadata dict of a live document, or None."""
+        with self._lock:
+            if doc_id in self.deleted:
+                return None
+            segments = list(self.segments)
+        for seg in segments:
+            row = seg.locate(doc_id)
+            if row >= 0:
+                return seg.record(row)
+        return None
+
+    def __len__(self):
+        return self.snapshot()[1]["num_docs"]
+
+    # -- export -----------------------------------------------------------
+
+    def export(self):
+        """
+        The live corpus as one fitted index: (vectorizer, doc_vectors,
+        metadata), documents in ascending doc id order renumbered from 0.
+        Built from the stored counts; nothing is re-tokenized.
+        """
+        segments, stats = self.snapshot()
+        if not stats["num_docs"]:
+            raise RuntimeError("No quotes indexed yet.")
+
+        terms = sorted(t for t, df in stats["df"].items() if df)
+        column = {t: i for i, t in enumerate(terms)}
+        idf = np.array([self.idf(stats, t) for t in terms], dtype=np.float64)
+
+        blocks = []
+        ids = []
+        metadata = []
+        for seg in segments:
+            live = np.setdiff1d(np.arange(len(seg)), stats["dead_rows"][seg.name])
+            if not len(live):
+                continue
+            # Terms that only occur in deleted rows map nowhere and never
+            # appear in a live row
+            remap = np.array([column.get(t, -1) for t in seg.terms], dtype=np.int64)
+            coo = seg.counts[live].tocoo()
+            blocks.append(csr_matrix(
+                (coo.data, (coo.row, remap[coo.col])), shape=(len(live), len(terms))
+            ))
+            ids.append(seg.doc_ids[live])
+            metadata.extend(seg.record(int(r)) for r in live)
+
+        order = np.argsort(np.concatenate(ids), kind="stable")
+        counts = vstack(blocks).tocsr()[order]
+        doc_vectors = normalize(counts.multiply(idf.reshape(1, -1)).tocsr())
+
+        vec = TfidfVectorizer(**VECTORIZER_PARAMS)
+        vec.vocabulary_ = column
+        vec.idf_ = idf
+        return vec, doc_vectors, [metadata[i] for i in order]
+
+    def save_artifact(self, path, source_files):
+        """Write the live corpus as a quotes.idx artifact for the Processor."""
+        vec, doc_vectors, metadata = self.export()
+        save_index(path, vec, doc_vectors, metadata, source_files)
+        return len(metadata)
+
+
+# ----------------------------------------------------------------------
+# MAIN EXECUTION
+#     python segments.py add ../quotes_output.html
+#     python segments.py delete 3 17
+#     python segments.py merge
+#     python segments.py search "love and peace"
+# ----------------------------------------------------------------------
+
+if __name__ == "__main__":
+    index = SegmentedIndex("quotes_segments")
+    command, args = sys.argv[1], sys.argv[2:]
+
+    if command == "add":
+        for path in args:
+            added = index.add(iter_records(path))
+            print(f"[{path}] indexed {len(added)} quotes")
+    elif command == "delete":
+        print("deleted:", index.delete(int(a) for a in args))
+    elif command == "merge":
+        print("merges:", index.maybe_merge())
+    elif command == "search":
+        for doc_id, score in index.search(" ".join(args), k=5):
+            r = index.get(doc_id)
+            print(f"[{doc_id}] \"{r['quote']}\" — {r['author']} score={score:.4f}")
+
+    print(f"{len(index.segments)} segments, {len(index)} live quotes")
@@ -0,0 +1,187 @@
+import atexit
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from scipy.sparse import csr_matrix
+
+from bitset import Bitset
+from boolean_query import BooleanEngine
+from ranking import score_rows, select_top_k
+
+
+# ------------------------------------------------------------------------------
+# Sharded scatter-gather search
+#
+# The corpus is split into contiguous doc-id ranges. Each shard lives in its
+# own worker process with its rows of the TF-IDF matrix (global columns, so
+# scores are the exact global cosine similarities), the vocabulary of the
+# terms that occur in it, and its slice of the tag index. A query is sent to
+# every shard at once:
+#
+#     free text   the parent transforms the query once; each shard scores its
+#                 rows and returns its own top-k with global doc ids; the
+#                 lists are merged with the same (score desc, doc id asc)
+#                 order select_top_k uses, so the result is the global top-k
+#     Boolean     each shard evaluates the expression over its postings (NOT
+#                 complements within the shard's range) and returns its k
+#                 lowest matching ids; concatenated in shard order they are
+#                 already ascending
+#
+# Tag filters are applied inside the shards against their own tag bitsets.
+# ------------------------------------------------------------------------------
+def shard_bounds(num_docs, num_shards):
+    """Start offsets of `num_shards` near-equal doc ranges, plus num_docs."""
+    num_shards = max(1, min(num_shards, num_docs))
+    return np.linspace(0, num_docs, num_shards + 1).astype(np.int64)
+
+
+class Shard:
+    """One doc range [offset, offset + rows) of the index."""
+
+    def __init__(self, offset, matrix, vocabulary, tag_ids):
+        self.offset = offset
+        self.matrix = matrix
+        self.num_docs = matrix.shape[0]
+        self.vocabulary = vocabulary
+        self.tag_ids = tag_ids
+        self._tag_bitsets = {}
+        self._boolean = None
+
+    def pool(self, tags, tag_mode):
+        """Local candidate bitset for the tag filters; None when unfiltered."""
+        if not tags:
+            return None
+        bitsets = []
+        for tag in tags:
+            bits = self._tag_bitsets.get(tag)
+            if bits is None:
+                bits = Bitset.from_ids(self.tag_ids.get(tag, _EMPTY), self.num_docs)
+                self._tag_bitsets[tag] = bits
+            bitsets.append(bits)
+        if tag_mode == "all":
+            return Bitset.intersection(bitsets, self.num_docs)
+        return Bitset.union(bitsets, self.num_docs)
+
+    def search(self, q_vec, k, tags=(), tag_mode="any"):
+        """Top-k (global doc ids, scores) within the shard."""
+        pool = self.pool(tags, tag_mode)
+        if pool is not None and not pool.any():
+            return _EMPTY, _EMPTY_SCORES
+
+        if pool is not None and len(pool) * 2 < self.num_docs:
+            rows = pool.to_ids()
+            ids, scores = select_top_k(score_rows(q_vec, self.matrix, rows), k, candidates=rows)
+        else:
+            sim = score_rows(q_vec, self.matrix)
+            if pool is not None:
+                sim[~pool.mask()] = 0.0
+            ids, scores = select_top_k(sim, k)
+        return ids + self.offset, scores
+
+    def boolean(self, expr, k, tags=(), tag_mode="any"):
+        """The k lowest global doc ids matching a Boolean expression."""
+        if self._boolean is None:
+            by_term = self.matrix.tocsc()
+            by_term.sort_indices()
+
+            def postings(term):
+                col = self.vocabulary.get(term)
+                if col is None:
+                    return _EMPTY
+                return by_term.indices[by_term.indptr[col]:by_term.indptr[col + 1]]
+
+            self._boolean = BooleanEngine(postings, self.num_docs)
+
+        matched = self._boolean.search(expr)
+        pool = self.pool(tags, tag_mode)
+        if pool is not None and len(matched):
+            matched = matched[pool.contains(matched)]
+        return matched[:k] + self.offset
+
+
+_EMPTY = np.zeros(0, dtype=np.int64)
+_EMPTY_SCORES = np.zeros(0, dtype=np.float64)
+
+
+# ----------------------------------------------------------------------
+# Worker side: one Shard per process, set up by the pool initializer
+# ----------------------------------------------------------------------
+_WORKER_SHARD = None
+
+
+def _init_shard(offset, arrays, shape, vocabulary, tag_ids):
+    global _WORKER_SHARD
+    matrix = csr_matrix(arrays, shape=shape)
+    _WORKER_SHARD = Shard(offset, matrix, vocabulary, tag_ids)
+
+
+def _shard_search(q_vec, k, tags, tag_mode):
+    return _WORKER_SHARD.search(q_vec, k, tags, tag_mode)
+
+
+def _shard_boolean(expr, k, tags, tag_mode):
+    return _WORKER_SHARD.boolean(expr, k, tags, tag_mode)
+
+
+# ----------------------------------------------------------------------
+# Coordinator
+# ----------------------------------------------------------------------
+class ShardedSearcher:
+    """
+    Splits `matrix` (rows = docs) into `num_shards` ranges, each served by a
+    single-process pool, and fans queries out to all of them.
+
+    feature_names: term for every matrix column
+    tag_index:     normalized tag -> iterable of global doc ids
+    """
+
+    def __init__(self, matrix, feature_names, tag_index, num_shards):
+        matrix = csr_matrix(matrix)
+        self.num_docs = matrix.shape[0]
+        self.bounds = shard_bounds(self.num_docs, num_shards)
+        sorted_tags = {
+            tag: np.sort(np.fromiter(ids, dtype=np.int64)) for tag, ids in tag_index.items()
+        }
+
+        self.pools = []
+        for start, end in zip(self.bounds[:-1], self.bounds[1:]):
+            part = matrix[start:end]
+            part.sort_indices()
+            cols = np.unique(part.indices)
+            vocabulary = {str(feature_names[c]): int(c) for c in cols}
+
+            tag_ids = {}
+            for tag, ids in sorted_tags.items():
+                lo, hi = np.searchsorted(ids, [start, end])
+                if hi > lo:
+                    tag_ids[tag] = ids[lo:hi] - start
+
+            self.pools.append(ProcessPoolExecutor(
+                max_workers=1,
+                initializer=_init_shard,
+                initargs=(int(start), (part.data, part.indices, part.indptr),
+                          part.shape, vocabulary, tag_ids),
+            ))
+        atexit.register(self.close)
+
+    def __len__(self):
+        return len(self.pools)
+
+    def search(self, q_vec, k, tags=(), tag_mode="any"):
+        """Global top-k (doc ids, scores), identical to scoring one matrix."""
+        futures = [pool.submit(_shard_search, q_vec, k, tags, tag_mode) for pool in self.pools]
+        parts = [f.result() for f in futures]
+        ids = np.concatenate([p[0] for p in parts])
+        scores = np.concatenate([p[1] for p in parts])
+        return select_top_k(scores, k, candidates=ids)
+
+    def boolean(self, expr, k, tags=(), tag_mode="any"):
+        """The k lowest doc ids matching `expr`, ascending."""
+        futures = [pool.submit(_shard_boolean, expr, k, tags, tag_mode) for pool in self.pools]
+        matched = np.concatenate([f.result() for f in futures])
+        return matched[:k]
+
+    def close(self):
+        for pool in self.pools:
+            pool.shutdown(wait=False, cancel_futures=True)
+        self.pools = []
@@ -0,0 +1,156 @@
+import threading
+import time
+from contextlib import contextmanager
+
+
+# ------------------------------------------------------------------------------
+# Hot-swappable index snapshots
+#
+# Everything derived from one index generation lives in one snapshot object;
+# a request takes the current snapshot once and uses it to the end, so it
+# never mixes two generations. A reload builds the next snapshot on a
+# background thread while the current one keeps serving, then swaps the
+# reference under a lock. The previous snapshot is retired: requests that
+# already hold it finish normally, and the last one out calls close() on it
+# (shard processes etc.), after which nothing references it any more.
+#
+# A snapshot needs a `generation` attribute and a close() method.
+# ------------------------------------------------------------------------------
+class SnapshotManager:
+    """
+    load():  builds a new snapshot (may take seconds)
+    stamp(): cheap fingerprint of the inputs (file mtimes/sizes); the
+             watcher reloads when it changes and has stayed put for a poll
+    """
+
+    def __init__(self, load, stamp=None, on_swap=None):
+        self._load = load
+        self._stamp = stamp or (lambda: None)
+        self._on_swap = on_swap
+        self._lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        self._reloader = None
+        self._watcher = None
+        self._active = {}
+
+        self.loaded_stamp = self._stamp()
+        self.current = load()
+        self.loaded_at = time.time()
+        self.retired = []
+        self.reloads = 0
+        self.last_error = None
+
+    @contextmanager
+    def acquire(self):
+        """The current snapshot, held until the block exits."""
+        with self._lock:
+            snap = self.current
+            self._active[id(snap)] = self._active.get(id(snap), 0) + 1
+        try:
+            yield snap
+        finally:
+            with self._lock:
+                left = self._active[id(snap)] - 1
+                if left:
+                    self._active[id(snap)] = left
+                else:
+                    del self._active[id(snap)]
+                drained = not left and snap in self.retired
+                if drained:
+                    self.retired.remove(snap)
+            if drained:
+                snap.close()
+
+    def in_flight(self, snap):
+        with self._lock:
+            return self._active.get(id(snap), 0)
+
+    # ----------------------------------------------------------------------
+
+    def reload(self, force=False):
+        """
+        Start a background reload unless one is running; returns the thread.
+        Without `force` a load that yields the same generation is dropped.
+        """
+        with self._lock:
+            if self._reloader is None or not self._reloader.is_alive():
+                self._reloader = threading.Thread(
+                    target=self.reload_now, args=(force,), name="index-reload", daemon=True
+                )
+                self._reloader.start()
+            return self._reloader
+
+    def reload_now(self, force=False):
+        """Load and swap in the calling thread; True when a swap happened."""
+        with self._reload_lock:
+            stamp = self._stamp()
+            try:
+                snap = self._load()
+            except Exception as err:
+                # Keep serving the current generation; the watcher retries
+                # once the inputs change again
+                self.last_error = f"{type(err).__name__}: {err}"
+                print(f"[reload] failed, keeping generation "
+                      f"{self.current.generation[:12]}: {self.last_error}")
+                self.loaded_stamp = stamp
+                return False
+
+            self.loaded_stamp = stamp
+            self.last_error = None
+            if snap.generation == self.current.generation and not force:
+                snap.close()
+                return False
+
+            if self._on_swap is not None:
+                self._on_swap(self.current, snap)
+            self._swap(snap)
+            return True
+
+    def _swap(self, snap):
+        with self._lock:
+            old, self.current = self.current, snap
+            self.loaded_at = time.time()
+            self.reloads += 1
+            drained = not self._active.get(id(old))
+            if not drained:
+                self.retired.append(old)
+        print(f"[reload] generation {old.generation[:12]} -> {snap.generation[:12]}")
+        if drained:
+            old.close()
+
+    # ----------------------------------------------------------------------
+
+    def watch(self, interval):
+        """Poll stamp() every `interval` seconds on a daemon thread."""
+        if self._watcher is not None:
+            return self._watcher
+
+        def run():
+            previous = self.loaded_stamp
+            while True:
+                time.sleep(interval)
+                stamp = self._stamp()
+                # Wait until the files stop changing (a crawl in progress)
+                if stamp != self.loaded_stamp and stamp == previous:
+                    self.reload()
+                previous = stamp
+
+        self._watcher = threading.Thread(target=run, name="index-watch", daemon=True)
+        self._watcher.start()
+        return self._watcher
+
+    def stats(self):
+        with self._lock:
+            current = self.current
+            return {
+                "generation": current.generation,
+                "loaded_at": self.loaded_at,
+                "reloads": self.reloads,
+                "reloading": self._reloader is not None and self._reloader.is_alive(),
+                "in_flight": self._active.get(id(current), 0),
+                "retired": [
+                    {"generation": s.generation, "in_flight": self._active.get(id(s), 0)}
+                    for s in self.retired
+                ],
+                "last_error": self.last_error,
+            }
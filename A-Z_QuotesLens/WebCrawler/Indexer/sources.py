@@ -0,0 +1,54 @@
+import json
+import os
+
+from html_stream import iter_quote_records
+
+
+# ------------------------------------------------------------------------------
+# Crawl output readers
+#
+# The crawler's item pipeline writes quotes_output.jsonl (one quote object per
+# line) and, for older consumers, the legacy quotes_output.html. Indexing
+# prefers the JSONL feed: no HTML to parse and no ambiguity in the fields.
+# ------------------------------------------------------------------------------
+CORPUS_CANDIDATES = ("quotes_output.jsonl", "quotes_output.html")
+
+
+def find_corpus(directory):
+    """Crawl output to index: the JSONL feed when present, else the HTML."""
+    for name in CORPUS_CANDIDATES:
+        path = os.path.join(directory, name)
+        if os.path.exists(path):
+            return path
+    return os.path.join(directory, CORPUS_CANDIDATES[-1])
+
+
+def iter_jsonl_records(path):
+    """
+    Yield (quote, author, tags) from a JSONL feed of
+        {"text": ..., "author": ..., "tags": [...], "url": ...}
+    Lines that do not decode (e.g. a write cut short by a crash) are skipped.
+    """
+    with open(path, "r", encoding="utf-8") as fp:
+        for line in fp:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                obj = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+
+            text = (obj.get("text") or "").strip()
+            if not text:
+                continue
+            author = (obj.get("author") or "").strip()
+            tags = [t.strip() for t in obj.get("tags") or [] if isinstance(t, str)]
+            yield text, author, tags
+
+
+def iter_records(path):
+    """(quote, author, raw tags) from either crawl output format."""
+    if path.endswith(".jsonl"):
+        return iter_jsonl_records(path)
+    return iter_quote_records(path)
@@ -0,0 +1,201 @@
+import heapq
+import re
+
+import numpy as np
+
+from index_store import (
+    StaleIndexError, StringPool, normalize_tag, pack_strings, read_sections, write_sections
+)
+
+
+# ------------------------------------------------------------------------------
+# Prefix completion (typeahead)
+#
+# Every completion is an entry (kind, key, display text, weight):
+#
+#     term    vocabulary token      weight = document frequency
+#     tag     normalized tag        weight = documents carrying it
+#     author  author name           weight = quotes by the author; one key
+#                                   per word start, so "fra" finds
+#                                   "Joe Frazier" as well as "Frank ..."
+#
+# Entries are sorted by (kind, utf-8 key), so the keys starting with a
+# prefix are one contiguous range per kind, found with two binary searches.
+# A sparse table over the weights answers "heaviest entry in [lo, hi)" in
+# O(1); the top-n of a range come out of a small heap that splits the
+# range around each pick, so a lookup costs O(n log n) whatever the size
+# of the range.
+#
+# File (quotes.suggest, write_sections container):
+#     key_offsets / key_pool          sorted keys
+#     display_offsets / display_pool  unique display strings
+#     display   entries  int32   display string of each entry
+#     weight    entries  int64
+#     kind_ptr  kinds+1  int64   entry range of each kind
+# ------------------------------------------------------------------------------
+SUGGEST_MAGIC = b"QLSUGG\0\0"
+SUGGEST_VERSION = 1
+
+KINDS = ("term", "tag", "author")
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 50
+
+
+def normalize_prefix(value):
+    """Lowercase and collapse whitespace, like tag normalization."""
+    return normalize_tag(value)
+
+
+def _author_keys(name):
+    """The name from each word start: "joe frazier", "frazier"."""
+    norm = normalize_prefix(name)
+    return [norm[m.start():] for m in re.finditer(r"\S+", norm)]
+
+
+def build_suggester(checksum, terms, term_df, tag_counts, author_counts):
+    """
+    terms / term_df:  vocabulary and document frequencies
+    tag_counts:       normalized tag -> documents
+    author_counts:    author name -> quotes
+    """
+    by_kind = {kind: [] for kind in KINDS}
+    for term, df in zip(terms, term_df):
+        by_kind["term"].append((term, term, int(df)))
+    for tag, count in tag_counts.items():
+        by_kind["tag"].append((tag, tag, int(count)))
+    for name, count in author_counts.items():
+        for key in _author_keys(name):
+            by_kind["author"].append((key, name, int(count)))
+
+    keys, displays, weights = [], [], []
+    display_ids = {}
+    kind_ptr = [0]
+    for kind in KINDS:
+        for key, display, weight in sorted(by_kind[kind], key=lambda e: e[0].encode("utf-8")):
+            keys.append(key)
+            displays.append(display_ids.setdefault(display, len(display_ids)))
+            weights.append(weight)
+        kind_ptr.append(len(keys))
+
+    key_offsets, key_pool = pack_strings(keys)
+    display_offsets, display_pool = pack_strings(list(display_ids))
+    header = {"checksum": checksum, "entries": len(keys)}
+    arrays = {
+        "key_offsets": key_offsets,
+        "key_pool": key_pool,
+        "display_offsets": display_offsets,
+        "display_pool": display_pool,
+        "display": np.asarray(displays, dtype=np.int32),
+        "weight": np.asarray(weights, dtype=np.int64),
+        "kind_ptr": np.asarray(kind_ptr, dtype=np.int64),
+    }
+    return Suggester(header, arrays)
+
+
+def suggester_from_index(checksum, terms, doc_vectors, tag_index, authors):
+    """
+    Suggester for a fitted index: doc_vectors (docs x terms), tag_index
+    (normalized tag -> doc ids), authors (one name per document).
+    """
+    term_df = np.bincount(doc_vectors.indices, minlength=doc_vectors.shape[1])
+    tag_counts = {tag: len(ids) for tag, ids in tag_index.items()}
+    author_counts = {}
+    for name in authors:
+        if name:
+            author_counts[name] = author_counts.get(name, 0) + 1
+    return build_suggester(checksum, terms, term_df, tag_counts, author_counts)
+
+
+def load_suggester(path, checksum=None, use_mmap=False):
+    """Load quotes.suggest; StaleIndexError when built from another corpus."""
+    header, arrays = read_sections(path, SUGGEST_MAGIC, SUGGEST_VERSION, use_mmap)
+    if checksum is not None and header["checksum"] != checksum:
+        raise StaleIndexError(f"{path}: built from a different corpus")
+    return Suggester(header, arrays)
+
+
+class Suggester:
+
+    def __init__(self, header, arrays):
+        self.header = header
+        self.arrays = arrays
+        self.keys = StringPool(arrays["key_offsets"], arrays["key_pool"])
+        self.displays = StringPool(arrays["display_offsets"], arrays["display_pool"])
+        self.display = arrays["display"]
+        self.weight = arrays["weight"]
+        self.kind_ptr = arrays["kind_ptr"]
+        self._table = self._build_table()
+
+    def save(self, path):
+        write_sections(path, self.header, self.arrays, SUGGEST_MAGIC, SUGGEST_VERSION)
+
+    def _build_table(self):
+        """levels[j][i]: position of the heaviest entry in [i, i + 2**j)."""
+        levels = [np.arange(len(self.weight), dtype=np.int32)]
+        span = 1
+        while span * 2 <= len(self.weight):
+            prev = levels[-1]
+            left, right = prev[:len(prev) - span], prev[span:]
+            # Ties keep the left (alphabetically first) entry
+            levels.append(np.where(self.weight[right] > self.weight[left], right, left))
+            span *= 2
+        return levels
+
+    def _heaviest(self, lo, hi):
+        j = (hi - lo).bit_length() - 1
+        a = int(self._table[j][lo])
+        b = int(self._table[j][hi - (1 << j)])
+        return b if self.weight[b] > self.weight[a] else a
+
+    def prefix_range(self, prefix, kind):
+        """Entries of `kind` whose key starts with prefix, as [lo, hi)."""
+        k = KINDS.index(kind)
+        start, end = int(self.kind_ptr[k]), int(self.kind_ptr[k + 1])
+        key = prefix.encode("utf-8")
+
+        lo, hi = start, end
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.keys.raw(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        first = lo
+
+        hi = end
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.keys.raw(mid)[:len(key)] == key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return first, lo
+
+    def suggest(self, prefix, limit=DEFAULT_LIMIT, kinds=KINDS):
+        """Top `limit` completions by weight: [(text, kind, weight)]."""
+        prefix = normalize_prefix(prefix)
+        if not prefix or limit <= 0:
+            return []
+
+        heap = []
+
+        def push(lo, hi, kind):
+            if lo < hi:
+                m = self._heaviest(lo, hi)
+                heapq.heappush(heap, (-int(self.weight[m]), m, lo, hi, kind))
+
+        for kind in kinds:
+            push(*self.prefix_range(prefix, kind), kind)
+
+        results = []
+        seen = set()
+        while heap and len(results) < limit:
+            neg_weight, m, lo, hi, kind = heapq.heappop(heap)
+            # An author is reachable from several word starts; list it once
+            display = int(self.display[m])
+            if (kind, display) not in seen:
+                seen.add((kind, display))
+                results.append((self.displays[display], kind, -neg_weight))
+            push(lo, m, kind)
+            push(m + 1, hi, kind)
+        return results
@@ -0,0 +1,46 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from boolean_query import BooleanEngine, is_boolean, parse  # noqa: E402
+
+DOCS = [
+    "life is love",
+    "life goes on",
+    "love wins",
+    "life and war",
+    "peace and love",
+    "war and peace",
+]
+
+
+@pytest.fixture(scope="module")
+def engine():
+    index = {}
+    for doc_id, text in enumerate(DOCS):
+        for word in set(text.split()):
+            index.setdefault(word, []).append(doc_id)
+    return BooleanEngine(lambda term: np.asarray(index.get(term, []), dtype=np.int64), len(DOCS))
+
+
+@pytest.mark.parametrize("expr, expected", [
+    ("life NOT love", [1, 3]),
+    ("life AND NOT love", [1, 3]),
+    ("life NOT love NOT war", [1]),
+    ("peace NOT war OR wins", [2, 4]),
+    ("(life OR peace) NOT love", [1, 3, 5]),
+    ("life OR NOT love", [0, 1, 3, 5]),
+    ("life OR war", [0, 1, 3, 5]),
+    ("life NOT", [0, 1, 3]),
+])
+def test_search(engine, expr, expected):
+    assert is_boolean(expr)
+    assert engine.search(expr).tolist() == expected
+
+
+def test_juxtaposed_not_is_and_not():
+    assert repr(parse("life NOT love")) == repr(parse("life AND NOT love"))
@@ -0,0 +1,123 @@
+import os
+import random
+import sys
+
+import pytest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+
+from html_stream import iter_html_blocks, iter_quote_records  # noqa: E402
+
+bs4 = pytest.importorskip("bs4")
+
+CORPUS_HTML = os.path.join(HERE, "../quotes_output.html")
+# Small chunks split tags, attributes, entities and comments across feeds
+CHUNK_SIZES = (1, 7, 64, 1 << 16)
+
+
+# ------------------------------------------------------------------------------
+# The BeautifulSoup extraction the streaming parser replaced
+# ------------------------------------------------------------------------------
+def bs4_quote_records(html):
+    """QuoteIndexer._extract_content before html_stream."""
+    soup = bs4.BeautifulSoup(html, "html.parser")
+    records = []
+    for p in soup.find_all("p"):
+        strong_tag = p.find("strong")
+        if not strong_tag:
+            continue
+        quote_line = strong_tag.get_text(strip=True)
+        if not quote_line:
+            continue
+        parts = list(p.stripped_strings)
+        author = ""
+        tags = []
+        for txt in parts[1:]:
+            txt = txt.strip()
+            if txt.startswith("—"):
+                author = txt[1:].strip()
+            elif txt.startswith("Tags:"):
+                tags = [t.strip() for t in txt[5:].split(",")]
+        records.append((quote_line, author, tags))
+    return records
+
+
+def bs4_blocks(html):
+    """The <p> and <div class="quote"> records, as iter_html_blocks yields them."""
+    soup = bs4.BeautifulSoup(html, "html.parser")
+    paragraphs = []
+    for p in soup.find_all("p"):
+        strong_tag = p.find("strong")
+        strong = strong_tag.get_text(strip=True) if strong_tag else None
+        paragraphs.append(("p", strong, list(p.stripped_strings)))
+
+    quotes = []
+    for div in soup.find_all("div", class_="quote"):
+        text_tag = div.find("span", class_="text")
+        author_tag = div.find("span", class_="author")
+        tag_group = div.find("div", class_="tags")
+        text = text_tag.get_text(strip=True) if text_tag else None
+        author = author_tag.get_text(strip=True) if author_tag else ""
+        tags = [a.get_text(strip=True) for a in tag_group.find_all("a")] if tag_group else []
+        quotes.append(("quote", text, author, tags))
+    return paragraphs, quotes
+
+
+def stream_blocks(path, chunk_size):
+    events = list(iter_html_blocks(path, chunk_size))
+    paragraphs = [(e[0], e[1], list(e[2])) for e in events if e[0] == "p"]
+    quotes = [(e[0], e[1], e[2], list(e[3])) for e in events if e[0] == "quote"]
+    return paragraphs, quotes
+
+
+# ------------------------------------------------------------------------------
+# Malformed documents
+# ------------------------------------------------------------------------------
+PIECES = [
+    "<p>", "</p>", "<p/>", "<strong>", "</strong>", "<b>", "</b>",
+    "<br>", "<br/>", "</br>", "<img src='x.png'>", "</img>", "<hr/>", "<input>",
+    "<!-- a <p> comment -->", "<!DOCTYPE html>", "<?pi x?>", "<![CDATA[x]]>",
+    "<script>var s = '<p><strong>no</strong></p>';</script>",
+    "<style>p { color: red }</style>", "<template><p>t</p></template>",
+    '<div class="quote">', "<div class='quote big'>", "<div>", "</div>",
+    '<span class="text">', "<span class=author>", "<span>", "</span>",
+    '<div class="tags">', "<a href='#'>", "</a>", "</x>", "</strong></p>",
+    "Life", "is", "short", "  ", "\n", "\xa0", "&amp;", "&nbsp;", "&lt;p&gt;",
+    "— Mark Twain", "—", "Tags: life, love , ", "Tags:", "“quoted”",
+]
+
+
+def malformed_documents(count, seed=0):
+    rng = random.Random(seed)
+    for _ in range(count):
+        yield "".join(rng.choice(PIECES) for _ in range(rng.randint(1, 40)))
+
+
+# ------------------------------------------------------------------------------
+# Tests
+# ------------------------------------------------------------------------------
+@pytest.mark.parametrize("chunk_size", CHUNK_SIZES)
+def test_corpus_records_match_bs4(chunk_size):
+    with open(CORPUS_HTML, encoding="utf-8") as fp:
+        expected = bs4_quote_records(fp.read())
+    assert expected
+    assert list(iter_quote_records(CORPUS_HTML, chunk_size)) == expected
+
+
+@pytest.mark.parametrize("chunk_size", CHUNK_SIZES)
+def test_corpus_blocks_match_bs4(chunk_size):
+    with open(CORPUS_HTML, encoding="utf-8") as fp:
+        expected = bs4_blocks(fp.read())
+    assert stream_blocks(CORPUS_HTML, chunk_size) == expected
+
+
+@pytest.mark.parametrize("chunk_size", (1, 5, 1 << 16))
+def test_malformed_documents_match_bs4(tmp_path, chunk_size):
+    path = tmp_path / "doc.html"
+    for i, html in enumerate(malformed_documents(1000, seed=chunk_size)):
+        path.write_text(html, encoding="utf-8")
+        assert list(iter_quote_records(str(path), chunk_size)) == bs4_quote_records(html), \
+            f"document {i}: {html!r}"
+        assert stream_blocks(str(path), chunk_size) == bs4_blocks(html), \
+            f"document {i}: {html!r}"
@@ -0,0 +1,83 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import postings  # noqa: E402
+from postings import (  # noqa: E402
+    MAX_VARBYTE, SKIP_INTERVAL, PostingsReader, intersect, save_postings
+)
+
+NUM_DOCS = 400_000
+
+
+@pytest.fixture(scope="module")
+def reader(tmp_path_factory):
+    rng = np.random.default_rng(7)
+    index = {
+        "rare": np.sort(rng.choice(NUM_DOCS, 300, replace=False)),
+        "mid": np.sort(rng.choice(NUM_DOCS, 20_000, replace=False)),
+        "long": np.sort(rng.choice(NUM_DOCS, 200_000, replace=False)),
+        "small": np.array([3, 17, 40]),
+    }
+    path = tmp_path_factory.mktemp("postings") / "quotes.postings"
+    save_postings(str(path), index, NUM_DOCS)
+    return PostingsReader(str(path)), index
+
+
+@pytest.fixture
+def decoded_sizes(monkeypatch):
+    """Lengths of the buffers handed to varbyte_decode."""
+    sizes = []
+    decode = postings.varbyte_decode
+
+    def recording(buf, count):
+        sizes.append(len(buf))
+        return decode(buf, count)
+
+    monkeypatch.setattr(postings, "varbyte_decode", recording)
+    return sizes
+
+
+def test_postings_round_trip(reader):
+    reader, index = reader
+    for term, docs in index.items():
+        assert np.array_equal(reader.postings(term), docs)
+        assert reader.df(term) == len(docs)
+    assert reader.df("missing") == 0
+
+
+@pytest.mark.parametrize("terms", [
+    ("rare", "long"), ("mid", "long"), ("rare", "mid", "long"), ("small", "long"), ("missing", "long"),
+])
+def test_intersect_matches_numpy(reader, terms):
+    reader, index = reader
+    expected = index.get(terms[0], np.zeros(0, dtype=np.int64))
+    for term in terms[1:]:
+        expected = np.intersect1d(expected, index.get(term, []))
+    assert np.array_equal(intersect(reader, terms), expected)
+
+
+def test_block_load_reads_one_block(reader, decoded_sizes):
+    reader, index = reader
+    cursor = reader.cursor("long")
+    decoded_sizes.clear()
+    while not cursor.exhausted:
+        cursor.seek(cursor.doc() + 1000)
+
+    # Every load sees at most one block, and a full walk reads the entry once
+    assert max(decoded_sizes) <= SKIP_INTERVAL * MAX_VARBYTE
+    assert sum(decoded_sizes) <= len(cursor.data)
+
+
+def test_entry_header_is_bounded(reader, decoded_sizes):
+    reader, index = reader
+    df, block_last, _, _ = reader.entry("long")
+    assert df == len(index["long"])
+
+    # df, then the skip table: neither depends on the length of the doc ids
+    assert decoded_sizes[0] <= MAX_VARBYTE
+    assert decoded_sizes[1] <= 2 * len(block_last) * MAX_VARBYTE
@@ -0,0 +1,96 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+
+from index_store import VECTORIZER_PARAMS  # noqa: E402
+from query_encoder import QueryEncoder, read_queries  # noqa: E402
+from sources import find_corpus, iter_records  # noqa: E402
+
+# The query log; QUOTES_QUERY_LOGS adds more files (os.pathsep-separated)
+QUERY_LOGS = [os.path.join(HERE, "../Processor/queries.csv")] + [
+    p for p in os.environ.get("QUOTES_QUERY_LOGS", "").split(os.pathsep) if p
+]
+
+EDGE_CASES = [
+    "",
+    "   ",
+    "the and of",                      # stop words only
+    "a I x",                           # single-character tokens only
+    "zzqx unseenword",                 # out of vocabulary
+    "love zzqx",                       # known and unknown terms
+    "Love LOVE love life",             # case, repeated terms
+    "naïve café über déjà vu",         # non-ASCII
+    "愛と人生",                          # non-Latin script
+    "life's   meaning -- (truth)!?",   # punctuation and whitespace runs
+    "don't stop believing",
+    "123 2024 love42",
+]
+
+
+@pytest.fixture(scope="module")
+def corpus():
+    path = find_corpus(os.path.join(HERE, ".."))
+    quotes = [quote for quote, _, _ in iter_records(path)]
+    assert quotes, f"no quotes in {path}"
+    return quotes
+
+
+@pytest.fixture(scope="module")
+def queries(corpus):
+    texts = [text for path in QUERY_LOGS for text in read_queries(path)]
+    assert texts, "empty query log"
+    # Every quote as a query too: long inputs, repeated terms, punctuation
+    return texts + EDGE_CASES + corpus
+
+
+@pytest.mark.parametrize("params", [
+    VECTORIZER_PARAMS,
+    dict(VECTORIZER_PARAMS, sublinear_tf=True),
+    dict(VECTORIZER_PARAMS, use_idf=False),
+    dict(VECTORIZER_PARAMS, norm=None),
+    {"min_df": 1},
+])
+def test_transform_matches_sklearn(corpus, queries, params):
+    vectorizer = TfidfVectorizer(**params).fit(corpus)
+    encoder = QueryEncoder.from_vectorizer(vectorizer)
+
+    expected = vectorizer.transform(queries)
+    expected.sort_indices()
+    actual = encoder.transform(queries)
+    assert actual.shape == expected.shape
+
+    for row, text in enumerate(queries):
+        want = expected[row]
+        got = actual[row]
+        assert np.array_equal(got.indices, want.indices), text
+        np.testing.assert_allclose(got.data, want.data, rtol=0, atol=1e-12, err_msg=text)
+
+
+def test_single_query_transform(corpus):
+    vectorizer = TfidfVectorizer(**VECTORIZER_PARAMS).fit(corpus)
+    encoder = QueryEncoder.from_vectorizer(vectorizer)
+    for text in EDGE_CASES:
+        got = encoder.transform([text])
+        want = vectorizer.transform([text])
+        want.sort_indices()
+        assert got.shape == want.shape
+        assert np.array_equal(got.indices, want.indices), text
+        np.testing.assert_allclose(got.data, want.data, rtol=0, atol=1e-12, err_msg=text)
+
+
+@pytest.mark.parametrize("params", [
+    {"ngram_range": (1, 2)},
+    {"analyzer": "char"},
+    {"binary": True},
+    {"strip_accents": "unicode"},
+])
+def test_unsupported_vectorizers_are_rejected(corpus, params):
+    vectorizer = TfidfVectorizer(**params).fit(corpus[:50])
+    with pytest.raises(ValueError):
+        QueryEncoder.from_vectorizer(vectorizer)
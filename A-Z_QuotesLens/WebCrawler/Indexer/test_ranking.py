@@ -0,0 +1,37 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from ranking import select_top_k  # noqa: E402
+
+
+def reference(scores, k, candidates=None):
+    ids = np.arange(len(scores)) if candidates is None else np.asarray(candidates)
+    ranked = sorted((-s, int(i)) for s, i in zip(scores, ids) if s > 0)[:k]
+    return [i for _, i in ranked], [-s for s, _ in ranked]
+
+
+def test_ties_by_ascending_id():
+    scores = [0.1, 0.2, 0.1, 0.2, 0.1, 0, 0.2, 0.1, 0.3, 0.1]
+    ids, vals = select_top_k(scores, 10)
+    assert ids.tolist() == [8, 1, 3, 6, 0, 2, 4, 7, 9]
+    assert vals.tolist() == [0.3, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.1, 0.1]
+
+
+@pytest.mark.parametrize("seed", range(50))
+def test_matches_full_sort(seed):
+    rng = np.random.default_rng(seed)
+    n = int(rng.integers(1, 500))
+    # Few distinct values: plenty of ties, some zeros
+    scores = rng.integers(0, 6, n) / 5
+    k = int(rng.integers(1, n + 5))
+    candidates = np.sort(rng.choice(10 * n, n, replace=False)) if seed % 2 else None
+
+    ids, vals = select_top_k(scores, k, candidates)
+    want_ids, want_vals = reference(scores, k, candidates)
+    assert ids.tolist() == want_ids
+    assert vals.tolist() == want_vals
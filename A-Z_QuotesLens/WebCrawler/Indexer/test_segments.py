@@ -0,0 +1,101 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+
+from index_store import VECTORIZER_PARAMS  # noqa: E402
+from ranking import select_top_k  # noqa: E402
+from segments import SegmentedIndex  # noqa: E402
+from sources import find_corpus, iter_records  # noqa: E402
+
+# Ten same-tier segments (two merge groups) and one larger one
+BATCHES = [6] * 10 + [25]
+QUERIES = [
+    "love", "life love", "the meaning of life", "Be yourself; everyone else is taken",
+    "imagination knowledge", "zzqx", "the and of",
+]
+
+
+@pytest.fixture(scope="module")
+def records():
+    path = find_corpus(os.path.join(HERE, ".."))
+    records = list(iter_records(path))
+    assert len(records) >= sum(BATCHES), f"too few quotes in {path}"
+    return records[:sum(BATCHES)]
+
+
+@pytest.fixture(scope="module")
+def index_dir(tmp_path_factory, records):
+    directory = str(tmp_path_factory.mktemp("segments"))
+    index = SegmentedIndex(directory)
+
+    ids = []
+    start = 0
+    for size in BATCHES:
+        ids += index.add(records[start:start + size])
+        start += size
+    assert ids == list(range(len(records)))
+
+    # Scattered deletes, plus most of one segment (compacted on its own)
+    dead = set(ids[::7]) | set(ids[-25:-10])
+    assert index.delete(sorted(dead)) == len(dead)
+    assert index.delete([ids[0], len(ids) + 5]) == 0
+
+    segments_before = len(index.segments)
+    assert index.maybe_merge() > 0
+    assert len(index.segments) < segments_before
+    return directory, dead
+
+
+@pytest.fixture(scope="module")
+def reopened(index_dir):
+    directory, _ = index_dir
+    return SegmentedIndex(directory)
+
+
+@pytest.fixture(scope="module")
+def expected(index_dir, records):
+    """(live doc ids, fitted vectorizer, doc vectors) over the live documents."""
+    _, dead = index_dir
+    live = [i for i in range(len(records)) if i not in dead]
+    vectorizer = TfidfVectorizer(**VECTORIZER_PARAMS)
+    doc_vectors = vectorizer.fit_transform([records[i][0] for i in live])
+    return np.array(live), vectorizer, doc_vectors
+
+
+def test_export_matches_sklearn(reopened, expected, records):
+    live, want_vec, want_vectors = expected
+    vec, doc_vectors, metadata = reopened.export()
+
+    assert vec.vocabulary_ == want_vec.vocabulary_
+    np.testing.assert_allclose(vec.idf_, want_vec.idf_, rtol=0, atol=1e-12)
+    np.testing.assert_allclose(
+        doc_vectors.toarray(), want_vectors.toarray(), rtol=0, atol=1e-12
+    )
+    assert [m["id"] for m in metadata] == live.tolist()
+    for m in metadata:
+        quote, author, tags = records[m["id"]]
+        assert (m["quote"], m["author"], m["tags"]) == (quote, author, list(tags))
+
+
+@pytest.mark.parametrize("query", QUERIES)
+@pytest.mark.parametrize("k", (1, 5, 1000))
+def test_search_matches_sklearn(reopened, expected, query, k):
+    live, vectorizer, doc_vectors = expected
+    scores = (doc_vectors @ vectorizer.transform([query]).T).toarray().ravel()
+    want_ids, want_scores = select_top_k(scores, k, candidates=live)
+
+    got = reopened.search(query, k)
+    assert [doc_id for doc_id, _ in got] == want_ids.tolist()
+    np.testing.assert_allclose([s for _, s in got], want_scores, rtol=0, atol=1e-12)
+
+
+def test_deleted_documents_stay_deleted(reopened, index_dir):
+    _, dead = index_dir
+    assert len(reopened) == len(reopened.export()[2])
+    assert all(reopened.get(doc_id) is None for doc_id in dead)
@@ -0,0 +1,325 @@
+import argparse
+import asyncio
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from aiohttp import web
+from sklearn.metrics.pairwise import cosine_similarity
+
+ROOT_PATH = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(ROOT_PATH, "../Indexer"))
+
+# The index, validation and result formatting are shared with the Flask app
+import flask_processor as fp  # noqa: E402
+from bitset import Bitset  # noqa: E402
+from metrics import CONTENT_TYPE  # noqa: E402
+from ranking import select_top_k  # noqa: E402
+
+
+# ------------------------------------------------------------------------------
+# Micro-batching /query server (asyncio + aiohttp)
+#
+# Serves the same /query, /tags and /suggest API as flask_processor.
+# Exhaustive free-text queries that arrive together are collected for up to
+# BATCH_WINDOW_MS (or until BATCH_MAX are waiting), encoded with one
+# query_encoder.transform call and scored with one sparse
+# (batch x vocab) . (vocab x docs) product; each
+# request's row is then filtered and cut to its own top-k. Results are the
+# same as the Flask app's.
+#
+# While a batch is being scored the next one fills up, so under load the
+# batch size grows on its own; the window only bounds how long a request
+# waits when traffic is light. Boolean, WAND, sharded and author:/tag:
+# queries are not batched and run on the worker threads directly.
+#
+#     python async_processor.py --port 5001 --window-ms 2 --max-batch 64
+# ------------------------------------------------------------------------------
+BATCH_WINDOW_MS = float(os.environ.get("QUOTES_BATCH_WINDOW_MS", "2"))
+BATCH_MAX = int(os.environ.get("QUOTES_BATCH_MAX", "64"))
+QUERY_WORKERS = int(os.environ.get("QUOTES_QUERY_WORKERS", "4"))
+
+BATCH_SIZE = fp.METRICS.histogram(
+    "quotes_query_batch_size", "Queries scored per micro-batch.",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256),
+)
+BATCH_WAIT_SECONDS = fp.METRICS.histogram(
+    "quotes_query_batch_wait_seconds", "Time a query waited for its batch to start."
+)
+
+
+def score_batch(items):
+    """
+    Exhaustive semantic search for many requests at once.
+    items: (snapshot, user_query, cleaned_filters, tag_mode, k) tuples.
+    Returns one JSON-ready result list per item, in order.
+    """
+    # A batch formed across an index reload is scored per generation
+    results = [None] * len(items)
+    groups = {}
+    for i, item in enumerate(items):
+        groups.setdefault(id(item[0]), []).append(i)
+    for positions in groups.values():
+        batch = [items[i] for i in positions]
+        for i, result in zip(positions, _score_snapshot(batch[0][0], batch)):
+            results[i] = result
+    return results
+
+
+def _score_snapshot(snap, items):
+    q_mat = snap.query_encoder.transform([item[1] for item in items])
+    sim = cosine_similarity(q_mat, snap.matrix, dense_output=False).tocsr()
+
+    results = []
+    i = 0
+    while i < len(items):
+        _, _, cleaned_filters, tag_mode, k = items[i]
+        lo, hi = sim.indptr[i], sim.indptr[i + 1]
+        doc_ids, scores = sim.indices[lo:hi], sim.data[lo:hi]
+
+        if cleaned_filters:
+            bitsets = [snap.tag_bitset(tag) for tag in cleaned_filters]
+            if tag_mode == "all":
+                pool = Bitset.intersection(bitsets, snap.num_docs)
+            else:
+                pool = Bitset.union(bitsets, snap.num_docs)
+            keep = pool.contains(doc_ids) if len(doc_ids) else np.zeros(0, dtype=bool)
+            doc_ids, scores = doc_ids[keep], scores[keep]
+
+        ranked_ids, ranked_scores = select_top_k(scores, k, candidates=doc_ids)
+        results.append(fp.format_results(ranked_ids, ranked_scores, snap))
+        i += 1
+    return results
+
+
+class MicroBatcher:
+    """Collects concurrent requests and hands them to score_batch together."""
+
+    def __init__(self, executor, window_ms=BATCH_WINDOW_MS, max_batch=BATCH_MAX):
+        self.executor = executor
+        self.window = window_ms / 1000
+        self.max_batch = max(1, max_batch)
+        self.queue = asyncio.Queue()
+        self.batches = 0
+        self.requests = 0
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def submit(self, item):
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((item, future, time.perf_counter()))
+        return await future
+
+    def stats(self):
+        return {
+            "window_ms": self.window * 1000,
+            "max_batch": self.max_batch,
+            "batches": self.batches,
+            "requests": self.requests,
+            "mean_batch_size": round(self.requests / self.batches, 3) if self.batches else 0.0,
+        }
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.window
+            while len(batch) < self.max_batch:
+                # Whatever is already queued joins without waiting
+                if not self.queue.empty():
+                    batch.append(self.queue.get_nowait())
+                    continue
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            started = time.perf_counter()
+            self.batches += 1
+            self.requests += len(batch)
+            if fp.METRICS_ENABLED:
+                BATCH_SIZE.observe(len(batch))
+                for _, _, queued in batch:
+                    BATCH_WAIT_SECONDS.observe(started - queued)
+
+            try:
+                results = await loop.run_in_executor(
+                    self.executor, score_batch, [item for item, _, _ in batch]
+                )
+            except Exception as err:
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(err)
+                continue
+
+            for (_, future, _), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+
+# ------------------------------------------------------------------------------
+# aiohttp Application
+# ------------------------------------------------------------------------------
+async def handle_query(request):
+    started = time.perf_counter()
+    try:
+        body = await request.json()
+    except ValueError:
+        body = None
+    params, error = fp.parse_query_request(body if isinstance(body, dict) else {})
+    if error:
+        return _finish(request, web.json_response({"error": error}, status=400), started)
+    user_query, cleaned_filters, tag_mode, k, engine, facets = params
+
+    key = fp.cache_key(user_query, cleaned_filters, tag_mode, k, engine, facets)
+    with fp.INDEX.acquire() as snap:
+        cacheable = snap is fp.INDEX.current
+        result = fp.RESULT_CACHE.get(key, snap.generation) if cacheable else None
+        if result is None:
+            app = request.app
+            batchable = (
+                engine == "exhaustive" and fp.NUM_SHARDS <= 1
+                and not fp.detect_boolean(user_query) and not fp.has_fields(user_query)
+            )
+            if batchable:
+                item = (snap, user_query, cleaned_filters, tag_mode, k)
+                result = await app["batcher"].submit(item)
+            else:
+                result = await asyncio.get_running_loop().run_in_executor(
+                    app["executor"], fp.run_query,
+                    user_query, cleaned_filters, tag_mode, k, engine, fp.NULL_TIMER, snap,
+                )
+            if facets:
+                summary = await asyncio.get_running_loop().run_in_executor(
+                    app["executor"], fp.facet_summary,
+                    snap, user_query, cleaned_filters, tag_mode, facets,
+                )
+                result = {"results": result, "facets": summary}
+            if cacheable:
+                fp.RESULT_CACHE.put(key, result, snap.generation)
+
+    if fp.METRICS_ENABLED:
+        mode = "boolean" if fp.detect_boolean(user_query) else engine
+        fp.QUERY_RESULTS.observe(len(result["results"] if facets else result), mode)
+    return _finish(request, web.json_response(result), started)
+
+
+def _finish(request, response, started):
+    if fp.METRICS_ENABLED:
+        fp.HTTP_REQUESTS.inc("/query", response.status)
+        fp.HTTP_SECONDS.observe(time.perf_counter() - started, "/query")
+    return response
+
+
+async def list_tags(request):
+    if not request.query:
+        return web.json_response(fp.INDEX.current.unique_tags)
+    page, error = fp.tags_page(fp.INDEX.current, request.query)
+    if error:
+        return web.json_response({"error": error}, status=400)
+    return web.json_response(page)
+
+
+async def suggest(request):
+    result, error = fp.suggest_request(fp.INDEX.current, request.query)
+    if error:
+        return web.json_response({"error": error}, status=400)
+    return web.json_response(result)
+
+
+async def cache_stats(request):
+    return web.json_response(fp.RESULT_CACHE.stats())
+
+
+async def batching_stats(request):
+    return web.json_response(request.app["batcher"].stats())
+
+
+def _admin_allowed(request):
+    return not fp.ADMIN_TOKEN or request.headers.get("X-Admin-Token") == fp.ADMIN_TOKEN
+
+
+async def index_stats(request):
+    if not _admin_allowed(request):
+        return web.json_response({"error": "Forbidden"}, status=403)
+    stats = fp.INDEX.stats()
+    stats["documents"] = fp.INDEX.current.num_docs
+    return web.json_response(stats)
+
+
+async def reload_index(request):
+    if not _admin_allowed(request):
+        return web.json_response({"error": "Forbidden"}, status=403)
+    try:
+        body = await request.json()
+    except ValueError:
+        body = None
+    force = bool(body.get("force")) if isinstance(body, dict) else False
+    fp.INDEX.reload(force=force)
+    return web.json_response(fp.INDEX.stats(), status=202)
+
+
+async def metrics(request):
+    return web.Response(
+        body=fp.METRICS.render().encode("utf-8"), headers={"Content-Type": CONTENT_TYPE}
+    )
+
+
+def create_app(window_ms=BATCH_WINDOW_MS, max_batch=BATCH_MAX, workers=QUERY_WORKERS):
+    app = web.Application()
+    app["executor"] = ThreadPoolExecutor(max_workers=workers)
+    app["batcher"] = MicroBatcher(app["executor"], window_ms, max_batch)
+
+    async def on_startup(app):
+        app["batcher"].start()
+
+    async def on_cleanup(app):
+        await app["batcher"].stop()
+        app["executor"].shutdown(wait=False)
+
+    app.on_startup.append(on_startup)
+    app.on_cleanup.append(on_cleanup)
+
+    app.router.add_post("/query", handle_query)
+    app.router.add_get("/tags", list_tags)
+    app.router.add_get("/suggest", suggest)
+    app.router.add_get("/cache", cache_stats)
+    app.router.add_get("/batching", batching_stats)
+    app.router.add_get("/metrics", metrics)
+    app.router.add_get("/admin/index", index_stats)
+    app.router.add_post("/admin/reload", reload_index)
+    return app
+
+
+# ------------------------------------------------------------------------------
+# Run Server
+# ------------------------------------------------------------------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Micro-batching async /query server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5001)
+    parser.add_argument("--window-ms", type=float, default=BATCH_WINDOW_MS,
+                        help="longest a query waits for others to batch with")
+    parser.add_argument("--max-batch", type=int, default=BATCH_MAX)
+    parser.add_argument("--workers", type=int, default=QUERY_WORKERS,
+                        help="threads scoring batches and unbatched queries")
+    args = parser.parse_args()
+
+    web.run_app(create_app(args.window_ms, args.max_batch, args.workers),
+                host=args.host, port=args.port)
@@ -1,75 +1,133 @@
 import os
 import re
-from flask import Flask, request, jsonify, render_template
-from bs4 import BeautifulSoup
+import bisect
+import sys
+import threading
+import time
+from collections.abc import Sequence
+import numpy as np
+from flask import Flask, Response, g, request, jsonify, render_template
 from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
 
 
 # ------------------------------------------------------------------------------
-# Normalizer: Clean tag names for unified matching
+# Shared index code (artifact format, tag normalizer) lives in ../Indexer
 # ------------------------------------------------------------------------------
-def normalize_tag(value: str) -> str:
-    """Strip weird spaces, collapse whitespace, lowercase the tag."""
-    if not isinstance(value, str):
-        return ""
-    cleaned = value.replace("\xa0", " ")
-    cleaned = re.sub(r"\s+", " ", cleaned).strip()
-    return cleaned.lower()
+ROOT_PATH = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(ROOT_PATH, "../Indexer"))
+
+from bitset import Bitset  # noqa: E402
+from boolean_query import BooleanEngine, is_boolean  # noqa: E402
+from facets import build_facets, load_facets  # noqa: E402
+from fields import (  # noqa: E402
+    build_fields, has_fields, load_fields, parse_weights, split_fields
+)
+from index_store import (  # noqa: E402
+    StaleIndexError, corpus_checksum, load_index, normalize_tag
+)
+from lsa import build_lsa, load_lsa  # noqa: E402
+from metrics import CONTENT_TYPE, NullTimer, Registry, StageTimer  # noqa: E402
+from pruning import WandSearcher  # noqa: E402
+from query_encoder import QueryEncoder  # noqa: E402
+from ranking import score_rows, select_top_k  # noqa: E402
+from result_cache import ResultCache  # noqa: E402
+from sharding import ShardedSearcher  # noqa: E402
+from snapshots import SnapshotManager  # noqa: E402
+from sources import find_corpus, iter_records  # noqa: E402
+from suggest import (  # noqa: E402
+    DEFAULT_LIMIT, KINDS, MAX_LIMIT, load_suggester, suggester_from_index
+)
 
 
 # ------------------------------------------------------------------------------
-# Paths + HTML Parser
+# Paths + Corpus Parser
 # ------------------------------------------------------------------------------
-ROOT_PATH = os.path.dirname(os.path.abspath(__file__))
-HTML_FILE = os.path.join(ROOT_PATH, "../quotes_output.html")
+# The crawler's JSONL feed when present, else the legacy HTML output
+CORPUS_FILE = os.environ.get("QUOTES_CORPUS_FILE") or find_corpus(os.path.join(ROOT_PATH, ".."))
+INDEX_FILE = os.environ.get(
+    "QUOTES_INDEX_FILE", os.path.join(ROOT_PATH, "../Indexer/quotes.idx")
+)
+# LSA projection + IVF index for engine="lsa", written by Indexer.py --lsa
+LSA_FILE = os.environ.get("QUOTES_LSA_FILE", os.path.splitext(INDEX_FILE)[0] + ".lsa")
+# Tag / author incidence matrices for facet counts, written by Indexer.py
+FACETS_FILE = os.environ.get("QUOTES_FACETS_FILE", os.path.splitext(INDEX_FILE)[0] + ".facets")
+# Author / tag field indexes for author: and tag: clauses, written by Indexer.py
+FIELDS_FILE = os.environ.get("QUOTES_FIELDS_FILE", os.path.splitext(INDEX_FILE)[0] + ".fields")
+# Score weight of each field when a query has field clauses, e.g. "author=2,tag=0.5"
+FIELD_WEIGHTS = parse_weights(os.environ.get("QUOTES_FIELD_WEIGHTS", ""))
+# Prefix completions for /suggest, written by Indexer.py
+SUGGEST_FILE = os.environ.get(
+    "QUOTES_SUGGEST_FILE", os.path.splitext(INDEX_FILE)[0] + ".suggest"
+)
+# Memory-map the artifact so every worker on the host shares one copy
+INDEX_MMAP = os.environ.get("QUOTES_INDEX_MMAP", "1") != "0"
+# /query result cache: max entries (0 disables) and time-to-live in seconds
+CACHE_SIZE = int(os.environ.get("QUOTES_CACHE_SIZE", "1024"))
+CACHE_TTL = float(os.environ.get("QUOTES_CACHE_TTL", "300"))
+# Stage histograms behind /metrics, and Server-Timing headers for debugging
+METRICS_ENABLED = os.environ.get("QUOTES_METRICS", "1") != "0"
+TIMING_HEADERS = os.environ.get("QUOTES_TIMING_HEADERS", "0") == "1"
+# Worker processes for sharded search (0 or 1: score in this process)
+NUM_SHARDS = int(os.environ.get("QUOTES_SHARDS", "0"))
+# Seconds between checks of INDEX_FILE / CORPUS_FILE for a new generation
+# (0: reload only through POST /admin/reload)
+RELOAD_INTERVAL = float(os.environ.get("QUOTES_RELOAD_INTERVAL", "0"))
+# When set, /admin routes require it in the X-Admin-Token header
+ADMIN_TOKEN = os.environ.get("QUOTES_ADMIN_TOKEN", "")
 TEMPLATE_PATH = os.path.join(ROOT_PATH, "templates")
 
 
-def parse_quotes_html(path):
-    """Extract quotes, authors, tags from HTML."""
-    with open(path, "r", encoding="utf-8") as fp:
-        soup_obj = BeautifulSoup(fp.read(), "html.parser")
-
+# ------------------------------------------------------------------------------
+# Metrics (Prometheus text format on /metrics)
+# ------------------------------------------------------------------------------
+METRICS = Registry()
+HTTP_REQUESTS = METRICS.counter(
+    "quotes_http_requests_total", "HTTP requests by route and status.", ("route", "status")
+)
+HTTP_SECONDS = METRICS.histogram(
+    "quotes_http_request_duration_seconds", "Request handling time by route.", ("route",)
+)
+QUERY_STAGE_SECONDS = METRICS.histogram(
+    "quotes_query_stage_seconds", "Time spent in each /query stage.", ("stage",)
+)
+QUERY_RESULTS = METRICS.histogram(
+    "quotes_query_results", "Results returned per /query by mode.", ("mode",),
+    buckets=(0, 1, 2, 5, 10, 20, 50, 100, 500),
+)
+INDEX_BUILD_SECONDS = METRICS.gauge(
+    "quotes_index_build_seconds", "Duration of the last index load or lazy build.", ("component",)
+)
+INDEX_DOCUMENTS = METRICS.gauge("quotes_index_documents", "Documents in the loaded index.")
+INDEX_RELOADS = METRICS.counter(
+    "quotes_index_reloads_total", "Index generations swapped in after startup."
+)
+INDEX_RETIRED = METRICS.gauge(
+    "quotes_index_retired_snapshots", "Replaced generations still serving in-flight requests."
+)
+CACHE_EVENTS = METRICS.counter(
+    "quotes_result_cache_events_total", "Result cache hits, misses and removals.", ("event",)
+)
+CACHE_ENTRIES = METRICS.gauge("quotes_result_cache_entries", "Entries in the result cache.")
+
+
+def parse_quotes(path):
+    """Extract quotes, authors, tags from the crawl output, one record at a time."""
     text_list = []
     meta_list = []
 
-    blocks = soup_obj.find_all("p")
-    idx = 0
-    while idx < len(blocks):
-        block = blocks[idx]
-        strong_tag = block.find("strong")
-
-        if strong_tag:
-            raw_quote = strong_tag.get_text(strip=True)
-            if raw_quote:
-                lines = list(block.stripped_strings)
-
-                author_val = ""
-                tags_val = []
-
-                j = 1
-                while j < len(lines):
-                    row = lines[j].strip()
-                    if row.startswith("—"):
-                        author_val = row[1:].strip()
-                    elif row.startswith("Tags:"):
-                        extracted = row[5:].split(",")
-                        tags_val = [
-                            normalize_tag(t)
-                            for t in extracted
-                            if normalize_tag(t)
-                        ]
-                    j += 1
-
-                text_list.append(raw_quote)
-                meta_list.append({
-                    "body": raw_quote,
-                    "writer": author_val,
-                    "labels": tags_val
-                })
-
-        idx += 1
+    for raw_quote, author_val, raw_tags in iter_records(path):
+        tags_val = [
+            normalize_tag(t)
+            for t in raw_tags
+            if normalize_tag(t)
+        ]
+
+        text_list.append(raw_quote)
+        meta_list.append({
+            "body": raw_quote,
+            "writer": author_val,
+            "labels": tags_val
+        })
 
     return text_list, meta_list
 
@@ -77,79 +135,285 @@ def parse_quotes_html(path):
 # ------------------------------------------------------------------------------
 # Load + Prepare Data
 # ------------------------------------------------------------------------------
-CORPUS, METAINFO = parse_quotes_html(HTML_FILE)
-if not CORPUS:
-    raise RuntimeError("Failed to load quotes from HTML.")
-
-TFIDF = TfidfVectorizer(stop_words="english", min_df=1)
-MATRIX = TFIDF.fit_transform(CORPUS)
+def build_from_corpus(path):
+    """Parse the crawl output and fit TF-IDF from scratch (slow path)."""
+    corpus, metainfo = parse_quotes(path)
+    if not corpus:
+        raise RuntimeError(f"Failed to load quotes from {path}.")
+
+    tfidf = TfidfVectorizer(stop_words="english", min_df=1)
+    matrix = tfidf.fit_transform(corpus)
+
+    # Build tag → document mapping
+    tag_index = {}
+    i = 0
+    while i < len(metainfo):
+        for tag in metainfo[i]["labels"]:
+            norm = normalize_tag(tag)
+            if norm:
+                tag_index.setdefault(norm, set()).add(i)
+        i += 1
+
+    return corpus, metainfo, tfidf, matrix, tag_index
+
+
+class ArtifactMetaView(Sequence):
+    """metainfo-shaped records ({body, writer, labels}) decoded on access."""
+
+    def __init__(self, records):
+        self.records = records
+
+    def __len__(self):
+        return len(self.records)
+
+    def __getitem__(self, i):
+        m = self.records[i]
+        return {
+            "body": m["quote"],
+            "writer": m["author"],
+            "labels": [normalize_tag(t) for t in m["tags"] if normalize_tag(t)]
+        }
+
+
+def load_from_artifact(path, source_files):
+    """Load the binary index written by Indexer.py (fast path)."""
+    art = load_index(path, source_files=source_files, use_mmap=INDEX_MMAP)
+
+    corpus = art.metadata.quotes
+    metainfo = ArtifactMetaView(art.metadata)
+    loaded = (corpus, metainfo, art.build_vectorizer(), art.doc_vectors, art.tag_index)
+    return loaded, art.checksum
+
+
+def load_quotes_index():
+    """
+    Prefer the prebuilt artifact; rebuild from the crawl output when it is
+    missing or stale.
+    Also returns the index generation (checksum of the corpus it was built
+    from), which keys the result cache.
+    """
+    started = time.perf_counter()
+    sources = [CORPUS_FILE] if os.path.exists(CORPUS_FILE) else None
+    try:
+        loaded, generation = load_from_artifact(INDEX_FILE, sources)
+        origin = INDEX_FILE
+    except (FileNotFoundError, StaleIndexError) as err:
+        print(f"[index] {err} -- rebuilding from {CORPUS_FILE}")
+        loaded = build_from_corpus(CORPUS_FILE)
+        generation = corpus_checksum([CORPUS_FILE])
+        origin = CORPUS_FILE
 
-# Build tag → document mapping
-TAG_INDEX = {}
-i = 0
-while i < len(METAINFO):
-    for tag in METAINFO[i]["labels"]:
-        norm = normalize_tag(tag)
-        if norm:
-            TAG_INDEX.setdefault(norm, set()).add(i)
-    i += 1
+    elapsed = (time.perf_counter() - started) * 1000
+    print(f"[index] {len(loaded[0])} quotes from {origin} in {elapsed:.1f} ms")
+    INDEX_BUILD_SECONDS.set(elapsed / 1000, "artifact" if origin == INDEX_FILE else "corpus")
+    INDEX_DOCUMENTS.set(len(loaded[0]))
+    return loaded, generation
 
-UNIQUE_TAGS = sorted(set(normalize_tag(t) for m in METAINFO for t in m["labels"]))
 
-VOCAB_TOKENS = set(TFIDF.get_feature_names_out())
+# ------------------------------------------------------------------------------
+# Index Snapshots + Hot Reload
+# ------------------------------------------------------------------------------
+class IndexSnapshot:
+    """
+    One index generation and everything derived from it. Requests take a
+    snapshot from INDEX once and read only from it; the lazily built
+    structures (tag bitsets, WAND, LSA, Boolean postings, shard workers)
+    belong to the snapshot, so a reload replaces them all at once.
+    """
+
+    def __init__(self, loaded, generation):
+        self.corpus, self.metainfo, self.tfidf, self.matrix, self.tag_index = loaded
+        self.generation = generation
+        self.unique_tags = sorted(self.tag_index)
+        self.num_docs = len(self.corpus)
+        self.vocab_tokens = self.tfidf.vocabulary_
+        # tfidf.transform without the sklearn overhead; identical vectors
+        self.query_encoder = QueryEncoder.from_vectorizer(self.tfidf)
+
+        self._tag_bitsets = {}
+        self._lazy = {}
+        # Re-entrant: one lazy structure may be built from another
+        self._lock = threading.RLock()
+
+    def tag_bitset(self, tag):
+        """Bitset of the documents carrying a normalized tag, built on first use."""
+        bits = self._tag_bitsets.get(tag)
+        if bits is None:
+            ids = np.fromiter(self.tag_index.get(tag, ()), dtype=np.int64)
+            bits = Bitset.from_ids(ids, self.num_docs)
+            self._tag_bitsets[tag] = bits
+        return bits
+
+    def _get(self, component, build):
+        value = self._lazy.get(component)
+        if value is None:
+            with self._lock:
+                value = self._lazy.get(component)
+                if value is None:
+                    started = time.perf_counter()
+                    value, label = build()
+                    INDEX_BUILD_SECONDS.set(time.perf_counter() - started, label)
+                    self._lazy[component] = value
+        return value
+
+    def wand_searcher(self):
+        """Block-Max WAND postings are derived from the matrix on first use."""
+        return self._get("wand", lambda: (WandSearcher(self.matrix), "wand"))
+
+    def lsa_index(self):
+        """quotes.lsa when it matches this corpus, else fitted here once."""
+        def build():
+            try:
+                return load_lsa(LSA_FILE, self.generation, use_mmap=INDEX_MMAP), "lsa_load"
+            except (FileNotFoundError, StaleIndexError) as err:
+                print(f"[index] {err} -- fitting LSA in memory")
+                return build_lsa(self.matrix, self.generation), "lsa_build"
+        return self._get("lsa", build)
+
+    def suggester(self):
+        """quotes.suggest when it matches this corpus, else built here once."""
+        def build():
+            try:
+                return load_suggester(SUGGEST_FILE, self.generation, INDEX_MMAP), "suggest_load"
+            except (FileNotFoundError, StaleIndexError) as err:
+                print(f"[index] {err} -- building suggestions in memory")
+                suggester = suggester_from_index(
+                    self.generation, self.tfidf.get_feature_names_out().tolist(),
+                    self.matrix, self.tag_index, (m["writer"] for m in self.metainfo),
+                )
+                return suggester, "suggest_build"
+        return self._get("suggest", build)
+
+    def sharded_searcher(self):
+        """Shard worker processes are started on first use."""
+        return self._get("shards", lambda: (ShardedSearcher(
+            self.matrix, self.tfidf.get_feature_names_out(), self.tag_index, NUM_SHARDS
+        ), "shards"))
+
+    def by_term(self):
+        """The matrix as CSC: column t holds the sorted doc ids of term t."""
+        def build():
+            by_term = self.matrix.tocsc()
+            by_term.sort_indices()
+            return by_term, "by_term"
+        return self._get("by_term", build)
+
+    def boolean_engine(self):
+        """Term postings (sorted doc ids) are the columns of the matrix, built once."""
+        def build():
+            by_term = self.by_term()
+            empty = np.zeros(0, dtype=np.int64)
+            vocab = self.vocab_tokens
+
+            def postings(term):
+                col = vocab.get(term)
+                if col is None:
+                    return empty
+                return by_term.indices[by_term.indptr[col]:by_term.indptr[col + 1]]
+
+            def field_postings(field, term):
+                return self.fields().postings(field, term)
+
+            engine = BooleanEngine(postings, self.matrix.shape[0], field_postings)
+            return engine, "boolean"
+        return self._get("boolean", build)
+
+    def fields(self):
+        """quotes.fields when it matches this corpus, else built here once."""
+        def build():
+            try:
+                return load_fields(FIELDS_FILE, self.generation, INDEX_MMAP), "fields_load"
+            except (FileNotFoundError, StaleIndexError) as err:
+                print(f"[index] {err} -- building field indexes in memory")
+                metainfo = [self.metainfo[i] for i in range(self.num_docs)]
+                fields = build_fields(
+                    self.generation,
+                    [m["writer"] for m in metainfo],
+                    [m["labels"] for m in metainfo],
+                )
+                return fields, "fields_build"
+        return self._get("fields", build)
+
+    def facets(self):
+        """quotes.facets when it matches this corpus, else built here once."""
+        def build():
+            try:
+                return load_facets(FACETS_FILE, self.generation, INDEX_MMAP), "facets_load"
+            except (FileNotFoundError, StaleIndexError) as err:
+                print(f"[index] {err} -- building facets in memory")
+                metainfo = [self.metainfo[i] for i in range(self.num_docs)]
+                facets = build_facets(
+                    self.generation,
+                    [m["labels"] for m in metainfo],
+                    [m["writer"] for m in metainfo],
+                )
+                return facets, "facets_build"
+        return self._get("facets", build)
+
+    def warm_like(self, other):
+        """Build the lazy structures `other` had built, before taking traffic."""
+        builders = {
+            "wand": self.wand_searcher, "lsa": self.lsa_index,
+            "shards": self.sharded_searcher, "boolean": self.boolean_engine,
+            "suggest": self.suggester, "by_term": self.by_term, "facets": self.facets,
+            "fields": self.fields,
+        }
+        for component in list(other._lazy):
+            builders[component]()
+
+    def close(self):
+        """Stop the shard workers; the rest is freed with the snapshot."""
+        shards = self._lazy.get("shards")
+        if shards is not None:
+            shards.close()
+
+
+def load_snapshot():
+    return IndexSnapshot(*load_quotes_index())
+
+
+def index_stamp():
+    """(mtime, size) of the artifact and the crawl output; None if missing."""
+    stamps = []
+    for path in (INDEX_FILE, CORPUS_FILE):
+        try:
+            st = os.stat(path)
+            stamps.append((st.st_mtime_ns, st.st_size))
+        except FileNotFoundError:
+            stamps.append(None)
+    return tuple(stamps)
+
+
+def prepare_swap(old, new):
+    new.warm_like(old)
+    INDEX_RELOADS.inc()
+
+
+INDEX = SnapshotManager(load_snapshot, index_stamp, on_swap=prepare_swap)
+if RELOAD_INTERVAL > 0:
+    INDEX.watch(RELOAD_INTERVAL)
+
+# "any": a document needs one of the tag filters, "all": every one of them
+TAG_MODES = ("any", "all")
+
+# Semantic engines selectable per request via "engine"
+SEARCH_ENGINES = ("exhaustive", "wand", "lsa")
+# Largest "facets" (values per field) a /query may ask for
+MAX_FACETS = 100
+
+RESULT_CACHE = ResultCache(max_entries=CACHE_SIZE, ttl=CACHE_TTL)
 
 
 # ------------------------------------------------------------------------------
 # Boolean Search Utilities
 # ------------------------------------------------------------------------------
 def detect_boolean(expr: str) -> bool:
-    expanded = " " + expr.upper() + " "
-    return (" AND " in expanded) or (" OR " in expanded)
-
+    return is_boolean(expr)
 
-def resolve_boolean(expr: str) -> set:
-    pieces = [p.strip() for p in expr.split() if p.strip()]
-    if not pieces:
-        return set()
 
-    seq = []
-    idx = 0
-    while idx < len(pieces):
-        token = pieces[idx]
-        if token.upper() in ("AND", "OR"):
-            seq.append(token.upper())
-        else:
-            cleaned = re.sub(r"[^a-zA-Z]", "", token).lower()
-            if cleaned in VOCAB_TOKENS:
-                col = TFIDF.vocabulary_.get(cleaned)
-                rows, _ = MATRIX[:, col].nonzero()
-                seq.append(set(int(x) for x in rows))
-            else:
-                seq.append(set())
-        idx += 1
-
-    # Handle AND first
-    k = 0
-    while k < len(seq):
-        if seq[k] == "AND" and 0 < k < len(seq) - 1:
-            A = seq[k - 1]
-            B = seq[k + 1]
-            if isinstance(A, set) and isinstance(B, set):
-                merged = A & B
-                seq = seq[:k - 1] + [merged] + seq[k + 2:]
-                k -= 1
-            else:
-                k += 1
-        else:
-            k += 1
-
-    # Handle OR
-    final = set()
-    for element in seq:
-        if isinstance(element, set):
-            final |= element
-
-    return final
+def resolve_boolean(expr: str, snap=None):
+    """Doc ids matching an AND / OR / NOT / ( ) / "quoted" query, ascending."""
+    return (snap or INDEX.current).boolean_engine().search(expr)
 
 
 # ------------------------------------------------------------------------------
@@ -157,6 +421,33 @@ def resolve_boolean(expr: str) -> set:
 # ------------------------------------------------------------------------------
 app = Flask(__name__, template_folder=TEMPLATE_PATH)
 
+NULL_TIMER = NullTimer()
+
+
+@app.before_request
+def start_timer():
+    g.started = time.perf_counter()
+    if METRICS_ENABLED or TIMING_HEADERS:
+        g.timer = StageTimer(QUERY_STAGE_SECONDS if METRICS_ENABLED else None)
+    else:
+        g.timer = NULL_TIMER
+
+
+@app.after_request
+def record_request(response):
+    elapsed = time.perf_counter() - g.started
+    g.timer.finish()
+    if METRICS_ENABLED:
+        # The matched rule, not the raw path, keeps label values bounded
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        HTTP_REQUESTS.inc(route, response.status_code)
+        HTTP_SECONDS.observe(elapsed, route)
+    if TIMING_HEADERS:
+        timing = g.timer.server_timing()
+        total = f"total;dur={elapsed * 1000:.3f}"
+        response.headers["Server-Timing"] = f"{timing}, {total}" if timing else total
+    return response
+
 
 @app.route("/")
 def index_page():
@@ -165,25 +456,173 @@ def index_page():
 
 @app.route("/tags")
 def list_tags():
-    return jsonify(UNIQUE_TAGS)
-
+    """
+    Every tag as a list, or with ?prefix=, ?offset= or ?limit= one page:
+    {"tags", "total", "offset", "next"}.
+    """
+    if not request.args:
+        return jsonify(INDEX.current.unique_tags)
+    page, error = tags_page(INDEX.current, request.args)
+    if error:
+        return jsonify({"error": error}), 400
+    return jsonify(page)
+
+
+@app.route("/suggest")
+def suggest():
+    """Top completions for ?prefix= over terms, tags and authors."""
+    result, error = suggest_request(INDEX.current, request.args)
+    if error:
+        return jsonify({"error": error}), 400
+    return jsonify(result)
 
-@app.route("/query", methods=["POST"])
-def handle_query():
-    body = request.get_json() or {}
 
+def _int_arg(args, name, default, lo, hi):
+    """Integer query parameter clamped to [lo, hi]; None when malformed."""
+    try:
+        return min(max(int(args.get(name, default)), lo), hi)
+    except (TypeError, ValueError):
+        return None
+
+
+def tags_page(snap, args):
+    """Returns (page, None) or (None, error message) for a 400 response."""
+    offset = _int_arg(args, "offset", 0, 0, 2 ** 31)
+    limit = _int_arg(args, "limit", 100, 1, 1000)
+    if offset is None or limit is None:
+        return None, "Invalid offset or limit"
+
+    # unique_tags is sorted, so a prefix is one slice of it
+    tags = snap.unique_tags
+    prefix = normalize_tag(args.get("prefix", ""))
+    lo, hi = 0, len(tags)
+    if prefix:
+        lo = bisect.bisect_left(tags, prefix)
+        hi = bisect.bisect_left(tags, prefix + "\U0010ffff", lo)
+
+    start = lo + offset
+    page = tags[start:min(start + limit, hi)]
+    end = start + len(page)
+    return {
+        "tags": page,
+        "total": hi - lo,
+        "offset": offset,
+        "next": end - lo if end < hi else None,
+    }, None
+
+
+def suggest_request(snap, args):
+    """Returns (completions, None) or (None, error message) for a 400 response."""
+    limit = _int_arg(args, "limit", DEFAULT_LIMIT, 1, MAX_LIMIT)
+    if limit is None:
+        return None, "Invalid limit"
+
+    kinds = KINDS
+    if args.get("kind"):
+        kinds = tuple(k for k in KINDS if k in args.get("kind").split(","))
+        if not kinds:
+            return None, "Invalid kind"
+
+    completions = snap.suggester().suggest(args.get("prefix", ""), limit, kinds)
+    return [
+        {"text": text, "kind": kind, "weight": weight} for text, kind, weight in completions
+    ], None
+
+
+@app.route("/cache")
+def cache_stats():
+    return jsonify(RESULT_CACHE.stats())
+
+
+def collect_cache_metrics():
+    stats = RESULT_CACHE.stats()
+    for event in ("hits", "misses", "evictions", "expirations", "invalidations"):
+        CACHE_EVENTS.set(stats[event], event)
+    CACHE_ENTRIES.set(stats["entries"])
+    INDEX_RETIRED.set(len(INDEX.retired))
+
+
+METRICS.collectors.append(collect_cache_metrics)
+
+
+def admin_allowed():
+    return not ADMIN_TOKEN or request.headers.get("X-Admin-Token") == ADMIN_TOKEN
+
+
+@app.route("/admin/index")
+def index_stats():
+    if not admin_allowed():
+        return jsonify({"error": "Forbidden"}), 403
+    stats = INDEX.stats()
+    stats["documents"] = INDEX.current.num_docs
+    return jsonify(stats)
+
+
+@app.route("/admin/reload", methods=["POST"])
+def reload_index():
+    """
+    Load the index again in the background; the current generation keeps
+    serving until the new one is ready. {"force": true} swaps even when the
+    generation did not change.
+    """
+    if not admin_allowed():
+        return jsonify({"error": "Forbidden"}), 403
+    body = request.get_json(silent=True) or {}
+    INDEX.reload(force=bool(body.get("force")))
+    return jsonify(INDEX.stats()), 202
+
+
+@app.route("/metrics")
+def metrics():
+    return Response(METRICS.render(), content_type=CONTENT_TYPE)
+
+
+def cache_key(user_query, cleaned_filters, tag_mode, k, engine, facets=0):
+    """
+    Requests that must produce the same results share a key: tokenization
+    is case-insensitive and tag filters are a set. The query is lowercased,
+    so the mode goes in too: "life NOT love" is Boolean (only a capital NOT
+    is an operator) while "life not love" is free text.
+    """
+    return (
+        user_query.lower(), detect_boolean(user_query),
+        tuple(sorted(set(cleaned_filters))), tag_mode, k, engine, facets,
+    )
+
+
+def parse_query_request(body):
+    """
+    Validate a /query body. Returns ((query, filters, tag_mode, k, engine,
+    facets), None), or (None, error message) for a 400 response.
+    """
     user_query = (body.get("query") or "").strip()
     raw_filters = body.get("tag_filter") or []
 
     if not user_query and not raw_filters:
-        return jsonify({"error": "Provide a search query or tag filters."}), 400
+        return None, "Provide a search query or tag filters."
 
     try:
         k = int(body.get("top_k", 5))
         if k <= 0:
             raise ValueError
     except Exception:
-        return jsonify({"error": "Invalid top_k"}), 400
+        return None, "Invalid top_k"
+
+    engine = body.get("engine") or "exhaustive"
+    if engine not in SEARCH_ENGINES:
+        return None, "Invalid engine"
+
+    # Top-n tag and author counts over every match; 0 leaves them out
+    try:
+        facets = int(body.get("facets") or 0)
+        if not 0 <= facets <= MAX_FACETS:
+            raise ValueError
+    except Exception:
+        return None, "Invalid facets"
+
+    tag_mode = body.get("tag_mode") or "any"
+    if tag_mode not in TAG_MODES:
+        return None, "Invalid tag_mode"
 
     cleaned_filters = []
     x = 0
@@ -194,71 +633,233 @@ def handle_query():
                 cleaned_filters.append(t)
         x += 1
 
-    # Start with all documents
-    pool = set(range(len(CORPUS)))
+    return (user_query, cleaned_filters, tag_mode, k, engine, facets), None
+
+
+@app.route("/query", methods=["POST"])
+def handle_query():
+    params, error = parse_query_request(request.get_json() or {})
+    if error:
+        return jsonify({"error": error}), 400
+    user_query, cleaned_filters, tag_mode, k, engine, facets = params
+
+    timer = g.timer
+    mode = "boolean" if detect_boolean(user_query) else engine
+
+    with INDEX.acquire() as snap:
+        # A request that started on a replaced generation must not reset
+        # the cache (it drops entries of any other generation)
+        cacheable = snap is INDEX.current
+        key = cache_key(user_query, cleaned_filters, tag_mode, k, engine, facets)
+        cached = None
+        if cacheable:
+            with timer.stage("cache"):
+                cached = RESULT_CACHE.get(key, snap.generation)
+        if cached is not None:
+            result = cached
+        else:
+            result = run_query(user_query, cleaned_filters, tag_mode, k, engine, timer, snap)
+            if facets:
+                result = {
+                    "results": result,
+                    "facets": facet_summary(
+                        snap, user_query, cleaned_filters, tag_mode, facets, timer
+                    ),
+                }
+            if cacheable:
+                RESULT_CACHE.put(key, result, snap.generation)
+
+    if METRICS_ENABLED:
+        QUERY_RESULTS.observe(len(result["results"] if facets else result), mode)
+    with timer.stage("jsonify"):
+        return jsonify(result)
+
+
+def run_query(user_query, cleaned_filters, tag_mode, k, engine, timer=NULL_TIMER, snap=None):
+    """
+    Answer a validated /query request; returns the JSON-ready result list.
+    Each stage is timed through `timer` (see metrics.StageTimer). `snap` is
+    the IndexSnapshot to search, by default the current one.
+    """
+    snap = snap or INDEX.current
+    # Shard workers only hold the body postings
+    if NUM_SHARDS > 1 and engine == "exhaustive" and not has_fields(user_query):
+        return run_sharded_query(user_query, cleaned_filters, tag_mode, k, timer, snap)
+
+    # Candidate pool as a bitset; None means every document
+    pool = None
 
     # Apply tag filters
     if cleaned_filters:
-        allowed = set()
-        y = 0
-        while y < len(cleaned_filters):
-            tag = cleaned_filters[y]
-            allowed |= TAG_INDEX.get(tag, set())
-            y += 1
-        pool &= allowed
-
-        if not pool:
-            return jsonify([])
+        with timer.stage("tag_filter"):
+            pool = tag_pool(snap, cleaned_filters, tag_mode)
+        if not pool.any():
+            return []
 
     # Boolean mode
     if detect_boolean(user_query):
-        matched = resolve_boolean(user_query)
-        pool &= matched
-
-        if not pool:
-            return jsonify([])
-
-        selected = list(pool)[:k]
-        out = []
-        z = 0
-        while z < len(selected):
-            ref = METAINFO[selected[z]]
-            out.append({
-                "writer": ref["writer"],
-                "content": ref["body"],
-                "labels": ref["labels"],
-                "similarity": None
-            })
-            z += 1
-        return jsonify(out)
+        with timer.stage("boolean"):
+            matched = resolve_boolean(user_query, snap)
+            if pool is not None and len(matched):
+                matched = matched[pool.contains(matched)]
+            matched = matched.tolist()
+
+        if not matched:
+            return []
+
+        # Lowest doc ids first, so the same query always returns the same page
+        with timer.stage("format"):
+            return format_results(matched[:k], snap=snap)
+
+    # Field clauses: weighted sum of the body and field cosines, every engine
+    body_text, clauses = split_fields(user_query)
+    if clauses:
+        with timer.stage("fields"):
+            sim_scores = field_scores(snap, body_text, clauses)
+        with timer.stage("select"):
+            if pool is not None:
+                sim_scores[~pool.mask()] = 0.0
+            ranked_ids, ranked_scores = select_top_k(sim_scores, k)
+        with timer.stage("format"):
+            return format_results(ranked_ids, ranked_scores, snap)
 
     # Semantic mode
-    q_vec = TFIDF.transform([user_query])
-    sim_scores = cosine_similarity(q_vec, MATRIX)[0]
+    with timer.stage("transform"):
+        q_vec = snap.query_encoder.transform([user_query])
+
+    if engine == "wand":
+        # Scoring and top-k selection are one pass over the postings
+        with timer.stage("wand"):
+            ranked_ids, ranked_scores = snap.wand_searcher().search(q_vec, k, pool)
+    elif engine == "lsa":
+        # IVF candidates in LSA space, re-ranked by exact TF-IDF cosine
+        with timer.stage("lsa"):
+            ranked_ids, ranked_scores = snap.lsa_index().search(q_vec, k, snap.matrix, pool)
+    elif pool is not None and len(pool) * 2 < snap.num_docs:
+        # A narrow tag filter: only score the rows in the pool
+        with timer.stage("score"):
+            rows = pool.to_ids()
+            sim_scores = score_rows(q_vec, snap.matrix, rows)
+        with timer.stage("select"):
+            ranked_ids, ranked_scores = select_top_k(sim_scores, k, candidates=rows)
+    else:
+        # Score everything; a wide pool is applied as a row mask
+        with timer.stage("score"):
+            sim_scores = score_rows(q_vec, snap.matrix)
+        with timer.stage("select"):
+            if pool is not None:
+                sim_scores[~pool.mask()] = 0.0
+            ranked_ids, ranked_scores = select_top_k(sim_scores, k)
+
+    with timer.stage("format"):
+        return format_results(ranked_ids, ranked_scores, snap)
+
+
+def field_scores(snap, body_text, clauses, weights=None):
+    """
+    Score of every document for a query split by split_fields():
+    sum over body and fields of weight * cosine on that field.
+    """
+    weights = weights or FIELD_WEIGHTS
+    scores = np.zeros(snap.num_docs)
+    if body_text and weights["body"]:
+        q_vec = snap.query_encoder.transform([body_text])
+        scores += weights["body"] * score_rows(q_vec, snap.matrix)
+    for field, text in clauses.items():
+        field_sim = snap.fields().scores(field, text) if weights[field] else None
+        if field_sim is not None:
+            scores += weights[field] * field_sim
+    return scores
+
+
+def tag_pool(snap, cleaned_filters, tag_mode):
+    """Candidate pool of the tag filters as a bitset; None means every document."""
+    if not cleaned_filters:
+        return None
+    bitsets = [snap.tag_bitset(tag) for tag in cleaned_filters]
+    if tag_mode == "all":
+        return Bitset.intersection(bitsets, snap.num_docs)
+    return Bitset.union(bitsets, snap.num_docs)
+
+
+def match_set(snap, user_query, cleaned_filters, tag_mode):
+    """
+    Every document the query matches, ascending: the Boolean matches, the
+    documents sharing a term with a free-text query (a positive score for
+    every semantic engine, field clauses included), or the tag pool alone
+    for an empty query.
+    """
+    pool = tag_pool(snap, cleaned_filters, tag_mode)
+    if not user_query:
+        return pool.to_ids() if pool is not None else np.arange(snap.num_docs)
 
-    ranked_ids = sorted(pool, key=lambda r: sim_scores[r], reverse=True)
+    if detect_boolean(user_query):
+        matched = resolve_boolean(user_query, snap)
+    else:
+        body_text, clauses = split_fields(user_query)
+        terms = snap.query_encoder.encode(body_text)[0]
+        if clauses and not FIELD_WEIGHTS["body"]:
+            terms = terms[:0]
+        by_term = snap.by_term()
+        lists = [by_term.indices[by_term.indptr[t]:by_term.indptr[t + 1]] for t in terms]
+        for field, text in clauses.items():
+            if FIELD_WEIGHTS[field]:
+                lists.append(snap.fields().docs(field, text))
+        matched = np.unique(np.concatenate(lists or [np.zeros(0, dtype=np.int64)]))
+    if pool is not None and len(matched):
+        matched = matched[pool.contains(matched)]
+    return matched
+
+
+def facet_summary(snap, user_query, cleaned_filters, tag_mode, n, timer=NULL_TIMER):
+    """{"total": matching documents, "tags": [...], "authors": [...]} (top n each)."""
+    with timer.stage("facet_match"):
+        matched = match_set(snap, user_query, cleaned_filters, tag_mode)
+    with timer.stage("facet_count"):
+        summary = {"total": int(len(matched))}
+        summary.update(snap.facets().top(matched, n))
+    return summary
+
+
+def run_sharded_query(user_query, cleaned_filters, tag_mode, k, timer=NULL_TIMER, snap=None):
+    """
+    run_query over the shard workers: the tag filters and the Boolean or
+    scoring work happen inside every shard, and the per-shard top-k lists
+    are merged here. Results are identical to the single-process path.
+    """
+    snap = snap or INDEX.current
+    searcher = snap.sharded_searcher()
+    tags = tuple(cleaned_filters)
 
+    if detect_boolean(user_query):
+        with timer.stage("boolean"):
+            matched = searcher.boolean(user_query, k, tags, tag_mode)
+        with timer.stage("format"):
+            return format_results(matched, snap=snap)
+
+    with timer.stage("transform"):
+        q_vec = snap.query_encoder.transform([user_query])
+    with timer.stage("scatter"):
+        ranked_ids, ranked_scores = searcher.search(q_vec, k, tags, tag_mode)
+    with timer.stage("format"):
+        return format_results(ranked_ids, ranked_scores, snap)
+
+
+def format_results(doc_ids, scores=None, snap=None):
+    """JSON-ready records; similarity is None for Boolean matches."""
+    metainfo = (snap or INDEX.current).metainfo
     result = []
     idx2 = 0
-    while idx2 < len(ranked_ids):
-        doc_id = ranked_ids[idx2]
-        if sim_scores[doc_id] <= 0:
-            break
-
-        m = METAINFO[doc_id]
+    while idx2 < len(doc_ids):
+        m = metainfo[int(doc_ids[idx2])]
         result.append({
             "writer": m["writer"],
             "content": m["body"],
             "labels": m["labels"],
-            "similarity": round(float(sim_scores[doc_id]), 4)
+            "similarity": None if scores is None else round(float(scores[idx2]), 4)
         })
-
-        if len(result) >= k:
-            break
-
         idx2 += 1
-
-    return jsonify(result)
+    return result
 
 
 # ------------------------------------------------------------------------------
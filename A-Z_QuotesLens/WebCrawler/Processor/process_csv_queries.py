@@ -2,7 +2,10 @@ import csv
 import json
 import os
 import sys
-from bs4 import BeautifulSoup
+import threading
+from collections import deque
+from collections.abc import Sequence
+from concurrent.futures import ProcessPoolExecutor
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
 
@@ -10,15 +13,29 @@ from sklearn.metrics.pairwise import cosine_similarity
 # Paths
 # ------------------------------------------------------------
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-HTML_PATH = os.path.join(BASE_DIR, "../quotes_output.html")
+INDEX_PATH = os.environ.get(
+    "QUOTES_INDEX_FILE", os.path.join(BASE_DIR, "../Indexer/quotes.idx")
+)
+
+sys.path.insert(0, os.path.join(BASE_DIR, "../Indexer"))
+from html_stream import iter_html_blocks  # noqa: E402
+from index_store import StaleIndexError, corpus_checksum, load_index  # noqa: E402
+from query_encoder import QueryEncoder  # noqa: E402
+from ranking import select_top_k  # noqa: E402
+from sources import find_corpus, iter_jsonl_records  # noqa: E402
+
+# The crawler's JSONL feed when present, else the legacy HTML output
+CORPUS_PATH = os.environ.get("QUOTES_CORPUS_FILE") or find_corpus(os.path.join(BASE_DIR, ".."))
 
 
 # ------------------------------------------------------------
-# HTML → Corpus Loader
+# Crawl Output → Corpus Loader
 # ------------------------------------------------------------
-def load_corpus():
+def load_corpus(corpus_path=None):
     """
-    Parse 'quotes_output.html' and extract a normalized list of quotes.
+    Read the crawl output ('quotes_output.jsonl', or 'quotes_output.html';
+    CORPUS_PATH unless corpus_path is given) and extract a normalized list
+    of quotes.
 
     Output:
         articles  → list of dicts: { text, author, tags }
@@ -28,44 +45,55 @@ def load_corpus():
         - GoodReads-style structure
         - Simplified <p> fallback format
     """
-    if not os.path.exists(HTML_PATH):
-        raise FileNotFoundError(f"Could not locate corpus file at: {HTML_PATH}")
-
-    with open(HTML_PATH, "r", encoding="utf-8") as fp:
-        soup = BeautifulSoup(fp.read(), "html.parser")
+    corpus_path = corpus_path or CORPUS_PATH
+    if not os.path.exists(corpus_path):
+        raise FileNotFoundError(f"Could not locate corpus file at: {corpus_path}")
+
+    if corpus_path.endswith(".jsonl"):
+        articles = [
+            {"text": text, "author": author, "tags": tags}
+            for text, author, tags in iter_jsonl_records(corpus_path)
+        ]
+        if not articles:
+            raise ValueError(f"No quotes detected inside {corpus_path}")
+        return articles, [item["text"] for item in articles]
 
     articles = []
+    fallback = []
 
-    # --- Primary: <div class='quote'> blocks (GoodReads layout)
-    for div in soup.find_all("div", class_="quote"):
-        text_tag = div.find("span", class_="text")
-        author_tag = div.find("span", class_="author")
-        tag_group = div.find("div", class_="tags")
+    # Single streaming pass; <p> records are only kept until the first
+    # <div class='quote'> block shows the primary layout is present.
+    for event in iter_html_blocks(corpus_path):
 
-        if text_tag:
-            quote_text = text_tag.get_text(strip=True)
-            author = author_tag.get_text(strip=True) if author_tag else ""
-            tags = [a.get_text(strip=True) for a in tag_group.find_all("a")] if tag_group else []
-            articles.append({"text": quote_text, "author": author, "tags": tags})
+        # --- Primary: <div class='quote'> blocks (GoodReads layout)
+        if event[0] == "quote":
+            _, quote_text, author, tags = event
+            if quote_text is not None:
+                articles.append({"text": quote_text, "author": author, "tags": tags})
+                fallback = None
+            continue
 
-    # --- Fallback: <p> block extraction
-    if not articles:
-        for p in soup.find_all("p"):
-            stripped = list(p.stripped_strings)
-            if not stripped:
-                continue
+        # --- Fallback: <p> block extraction
+        if fallback is None:
+            continue
+        stripped = event[2]
+        if not stripped:
+            continue
 
-            text = stripped[0]
-            author = stripped[1].replace("—", "").strip() if len(stripped) > 1 else ""
-            tags = []
+        text = stripped[0]
+        author = stripped[1].replace("—", "").strip() if len(stripped) > 1 else ""
+        tags = []
 
-            if len(stripped) > 2 and stripped[2].startswith("Tags:"):
-                tags = [t.strip() for t in stripped[2].replace("Tags:", "").split(",")]
+        if len(stripped) > 2 and stripped[2].startswith("Tags:"):
+            tags = [t.strip() for t in stripped[2].replace("Tags:", "").split(",")]
 
-            articles.append({"text": text, "author": author, "tags": tags})
+        fallback.append({"text": text, "author": author, "tags": tags})
 
     if not articles:
-        raise ValueError("No quotes detected inside quotes_output.html")
+        articles = fallback
+
+    if not articles:
+        raise ValueError(f"No quotes detected inside {corpus_path}")
 
     documents = [item["text"] for item in articles]
     return articles, documents
@@ -83,6 +111,47 @@ def build_tfidf(documents):
     return vec, mat
 
 
+# ------------------------------------------------------------
+# Prebuilt Index Loader
+# ------------------------------------------------------------
+def load_index_or_build(corpus_path=None, checksum=None):
+    """
+    Load the binary artifact written by Indexer.py, falling back to
+    parsing the crawl output and fitting TF-IDF when it is missing or stale.
+
+    corpus_path: crawl output the index must match (CORPUS_PATH by default)
+    checksum:    its corpus_checksum, when the caller already computed it
+
+    Returns:
+        articles, query encoder (same transform() as the vectorizer), matrix
+    """
+    corpus_path = corpus_path or CORPUS_PATH
+    sources = [corpus_path] if os.path.exists(corpus_path) else None
+    try:
+        art = load_index(INDEX_PATH, source_files=sources, use_mmap=True, checksum=checksum)
+    except (FileNotFoundError, StaleIndexError):
+        articles, docs = load_corpus(corpus_path)
+        vec, mat = build_tfidf(docs)
+        return articles, QueryEncoder.from_vectorizer(vec), mat
+
+    articles = ArticleView(art.metadata)
+    return articles, QueryEncoder.from_vectorizer(art.build_vectorizer()), art.doc_vectors
+
+
+class ArticleView(Sequence):
+    """load_corpus-shaped articles ({text, author, tags}) decoded on access."""
+
+    def __init__(self, records):
+        self.records = records
+
+    def __len__(self):
+        return len(self.records)
+
+    def __getitem__(self, i):
+        m = self.records[i]
+        return {"text": m["quote"], "author": m["author"], "tags": m["tags"]}
+
+
 # ------------------------------------------------------------
 # Ranking Logic
 # ------------------------------------------------------------
@@ -95,18 +164,33 @@ def rank_docs(vec, matrix, query_text, top_k=3):
     """
     q_vec = vec.transform([query_text])
     sim = cosine_similarity(q_vec, matrix)[0]
-    ordered = sim.argsort()[::-1]  # high → low
 
-    results = []
-    for idx in ordered:
-        sc = float(sim[idx])
-        if sc <= 0:
-            break
-        results.append((idx, sc))
-        if len(results) >= top_k:
-            break
+    # high → low; equal scores by ascending doc id like every other path (the
+    # old sim.argsort()[::-1] used an unstable sort, so its tie order was
+    # platform-dependent and is not reproduced)
+    ordered, scores = select_top_k(sim, top_k)
+    return [(int(idx), float(sc)) for idx, sc in zip(ordered, scores)]
+
+
+def rank_docs_batch(vec, matrix, query_texts, top_k=3):
+    """
+    Rank many queries at once: one transform call and one sparse
+    matrix product for the whole batch.
+
+    Returns:
+        one rank_docs-style list per query, in input order.
+    """
+    q_mat = vec.transform(query_texts)
+    sim = cosine_similarity(q_mat, matrix, dense_output=False).tocsr()
 
-    return results
+    batch = []
+    for i in range(sim.shape[0]):
+        lo, hi = sim.indptr[i], sim.indptr[i + 1]
+        ordered, scores = select_top_k(
+            sim.data[lo:hi], top_k, candidates=sim.indices[lo:hi]
+        )
+        batch.append([(int(idx), float(sc)) for idx, sc in zip(ordered, scores)])
+    return batch
 
 
 # ------------------------------------------------------------
@@ -119,13 +203,62 @@ def _resolve_path(p: str) -> str:
 # ------------------------------------------------------------
 # CSV Query Processor
 # ------------------------------------------------------------
-def process_queries_csv(input_csv, output_csv, top_k=3):
+def _iter_queries(fin):
+    """Stream valid (query_id, query_text) rows from the CSV."""
+    for row in csv.DictReader(fin):
+        q_id = (row.get("query_id") or "").strip()
+        q_text = (row.get("query_text") or "").strip()
+        if q_id and q_text:
+            yield q_id, q_text
+
+
+def _iter_query_chunks(fin, batch_size):
+    """Group streamed query rows into fixed-size chunks."""
+    chunk = []
+    for item in _iter_queries(fin):
+        chunk.append(item)
+        if len(chunk) >= batch_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _write_ranked(writer, q_id, ranked):
+    for position, (doc_id, _) in enumerate(ranked, start=1):
+        writer.writerow({
+            "query_id": q_id,
+            "rank": position,
+            "document_id": str(doc_id)
+        })
+
+
+# Per-process index used by pool workers (loaded once in the initializer)
+_WORKER_INDEX = None
+
+
+def _init_worker():
+    global _WORKER_INDEX
+    _, vec, mat = load_index_or_build()
+    _WORKER_INDEX = (vec, mat)
+
+
+def _rank_chunk(chunk, top_k):
+    vec, mat = _WORKER_INDEX
+    ranked = rank_docs_batch(vec, mat, [text for _, text in chunk], top_k=top_k)
+    return [(q_id, r) for (q_id, _), r in zip(chunk, ranked)]
+
+
+def process_queries_csv(input_csv, output_csv, top_k=3, batch_size=None, workers=1):
     """
     Read a CSV of queries and output ranked results.
-    """
-    articles, docs = load_corpus()
-    vec, mat = build_tfidf(docs)
 
+    batch_size: when set, queries are streamed in chunks of this size and
+                each chunk is scored with a single sparse matrix product
+    workers:    with batch_size, number of processes scoring chunks; at
+                most 2 * workers chunks are in flight, so memory stays flat
+                and output rows keep the input order
+    """
     input_csv = _resolve_path(input_csv)
     output_csv = _resolve_path(output_csv)
 
@@ -133,27 +266,85 @@ def process_queries_csv(input_csv, output_csv, top_k=3):
         output_csv, "w", encoding="utf-8", newline=""
     ) as fout:
 
-        reader = csv.DictReader(fin)
         writer = csv.DictWriter(fout, fieldnames=["query_id", "rank", "document_id"])
         writer.writeheader()
 
-        for row in reader:
-            q_id = (row.get("query_id") or "").strip()
-            q_text = (row.get("query_text") or "").strip()
-            if not q_id or not q_text:
-                continue
-
-            ranked = rank_docs(vec, mat, q_text, top_k=top_k)
-            for position, (doc_id, _) in enumerate(ranked, start=1):
-                writer.writerow({
-                    "query_id": q_id,
-                    "rank": position,
-                    "document_id": str(doc_id)
-                })
+        if not batch_size:
+            articles, vec, mat = load_index_or_build()
+            for q_id, q_text in _iter_queries(fin):
+                ranked = rank_docs(vec, mat, q_text, top_k=top_k)
+                _write_ranked(writer, q_id, ranked)
+
+        elif workers <= 1:
+            _init_worker()
+            for chunk in _iter_query_chunks(fin, batch_size):
+                for q_id, ranked in _rank_chunk(chunk, top_k):
+                    _write_ranked(writer, q_id, ranked)
+
+        else:
+            with ProcessPoolExecutor(workers, initializer=_init_worker) as pool:
+                pending = deque()
+                for chunk in _iter_query_chunks(fin, batch_size):
+                    pending.append(pool.submit(_rank_chunk, chunk, top_k))
+                    if len(pending) >= 2 * workers:
+                        for q_id, ranked in pending.popleft().result():
+                            _write_ranked(writer, q_id, ranked)
+                while pending:
+                    for q_id, ranked in pending.popleft().result():
+                        _write_ranked(writer, q_id, ranked)
 
     print(f"CSV processed → {output_csv}")
 
 
+# ------------------------------------------------------------
+# Long-lived Query Engine
+# ------------------------------------------------------------
+class QueryEngine:
+    """
+    Holds (articles, vectorizer, matrix) across calls.
+
+    Built lazily on first use and shared by all threads. Every call stats
+    the corpus file; only when its mtime/size moved is the content hashed,
+    and the index is rebuilt only if that hash changed too.
+    """
+
+    def __init__(self, corpus_path=CORPUS_PATH):
+        self.corpus_path = corpus_path
+        self._lock = threading.Lock()
+        # (file stamp, content hash, (articles, vec, mat)), swapped as one tuple
+        self._current = None
+
+    def _stamp(self):
+        try:
+            st = os.stat(self.corpus_path)
+        except FileNotFoundError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def get(self):
+        stamp = self._stamp()
+        current = self._current
+        if current is not None and current[0] == stamp:
+            return current[2]
+
+        with self._lock:
+            current = self._current
+            if current is not None and current[0] == stamp:
+                return current[2]
+
+            digest = corpus_checksum([self.corpus_path]) if stamp else None
+            if current is not None and current[1] == digest:
+                state = current[2]
+            else:
+                state = load_index_or_build(self.corpus_path, digest)
+
+            self._current = (stamp, digest, state)
+            return state
+
+
+_ENGINE = QueryEngine()
+
+
 # ------------------------------------------------------------
 # JSON Query Handler (used by your UI)
 # ------------------------------------------------------------
@@ -161,8 +352,7 @@ def process_query_json(query_text, top_k=5):
     """
     Rank a single query and return JSON-compatible results.
     """
-    articles, docs = load_corpus()
-    vec, mat = build_tfidf(docs)
+    articles, vec, mat = _ENGINE.get()
     ranked = rank_docs(vec, mat, query_text, top_k=top_k)
 
     output = []
@@ -183,14 +373,19 @@ def process_query_json(query_text, top_k=5):
 # ------------------------------------------------------------
 if __name__ == "__main__":
     if len(sys.argv) < 3:
-        print("Usage: python3 process_csv_queries.py queries.csv results.csv [top_k]")
+        print(
+            "Usage: python3 process_csv_queries.py queries.csv results.csv "
+            "[top_k] [batch_size] [workers]"
+        )
         sys.exit(1)
 
     in_csv = sys.argv[1]
     out_csv = sys.argv[2]
     k = int(sys.argv[3]) if len(sys.argv) >= 4 else 3
+    batch = int(sys.argv[4]) if len(sys.argv) >= 5 else None
+    n_workers = int(sys.argv[5]) if len(sys.argv) >= 6 else 1
 
-    process_queries_csv(in_csv, out_csv, top_k=k)
+    process_queries_csv(in_csv, out_csv, top_k=k, batch_size=batch, workers=n_workers)
 
     # Quick verification
     quotes, docs = load_corpus()
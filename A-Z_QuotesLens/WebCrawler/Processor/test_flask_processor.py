@@ -0,0 +1,73 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import flask_processor as fp  # noqa: E402
+
+
+@pytest.fixture
+def client():
+    fp.RESULT_CACHE.clear()
+    yield fp.app.test_client()
+    fp.RESULT_CACHE.clear()
+
+
+def expected(query, k=5):
+    return fp.run_query(query, [], "any", k, "exhaustive")
+
+
+@pytest.mark.parametrize("first, second", [
+    ("life NOT love", "life not love"),
+    ("life not love", "life NOT love"),
+])
+def test_cache_keeps_boolean_and_free_text_apart(client, first, second):
+    assert fp.detect_boolean(first) != fp.detect_boolean(second)
+    for query in (first, second):
+        response = client.post("/query", json={"query": query})
+        assert response.status_code == 200
+        assert response.get_json() == expected(query), query
+
+
+QUERIES = [
+    "life love", "the meaning of life", "Love is patient", "zzqx",
+    "life AND love", "love OR friendship NOT death", "NOT life",
+]
+FILTERS = [
+    ([], "any"), (["love"], "any"), (["life", "inspirational"], "any"),
+    (["life", "inspirational"], "all"), (["no-such-tag"], "any"),
+]
+# k = 1000 is larger than the whole corpus
+K_VALUES = (1, 10, 1000)
+
+
+@pytest.mark.parametrize("query", QUERIES)
+@pytest.mark.parametrize("filters, tag_mode", FILTERS)
+@pytest.mark.parametrize("k", K_VALUES)
+def test_wand_matches_exhaustive(query, filters, tag_mode, k):
+    want = fp.run_query(query, filters, tag_mode, k, "exhaustive")
+    assert fp.run_query(query, filters, tag_mode, k, "wand") == want
+
+
+@pytest.fixture(scope="module")
+def sharded():
+    """run_query as with QUOTES_SHARDS=3, on its own snapshot and workers."""
+    snap = fp.load_snapshot()
+
+    def run(*args):
+        with pytest.MonkeyPatch.context() as patch:
+            patch.setattr(fp, "NUM_SHARDS", 3)
+            return fp.run_query(*args, snap=snap)
+
+    yield run
+    snap.close()
+
+
+@pytest.mark.parametrize("query", QUERIES)
+@pytest.mark.parametrize("filters, tag_mode", FILTERS)
+@pytest.mark.parametrize("k", K_VALUES)
+def test_shards_match_single_process(sharded, query, filters, tag_mode, k):
+    want = fp.run_query(query, filters, tag_mode, k, "exhaustive")
+    assert sharded(query, filters, tag_mode, k, "exhaustive") == want
@@ -0,0 +1,74 @@
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import process_csv_queries as pcq  # noqa: E402
+import index_store  # noqa: E402
+
+QUOTES = [
+    {"text": "Zebras dream of striped meadows.", "author": "A. Tester", "tags": ["zebra"]},
+    {"text": "Meadows are quiet at dawn.", "author": "B. Tester", "tags": ["dawn"]},
+    {"text": "Striped socks never match.", "author": "C. Tester", "tags": ["socks"]},
+]
+
+
+@pytest.fixture
+def corpus(tmp_path):
+    path = tmp_path / "quotes_output.jsonl"
+    path.write_text("".join(json.dumps(q) + "\n" for q in QUOTES), encoding="utf-8")
+    return str(path)
+
+
+@pytest.fixture
+def hashes(monkeypatch):
+    """Paths hashed by corpus_checksum, wherever it is called from."""
+    calls = []
+    checksum = index_store.corpus_checksum
+
+    def counting(paths, *args, **kwargs):
+        calls.append(list(paths))
+        return checksum(paths, *args, **kwargs)
+
+    monkeypatch.setattr(index_store, "corpus_checksum", counting)
+    monkeypatch.setattr(pcq, "corpus_checksum", counting)
+    return calls
+
+
+def test_engine_serves_its_own_corpus(corpus, hashes):
+    engine = pcq.QueryEngine(corpus)
+    articles, vec, mat = engine.get()
+
+    assert [a["text"] for a in articles] == [q["text"] for q in QUOTES]
+    assert mat.shape[0] == len(QUOTES)
+    assert hashes == [[corpus]]
+
+    # Unchanged file: served from memory without hashing again
+    assert engine.get()[0] is articles
+    assert len(hashes) == 1
+
+
+def test_engine_rebuilds_when_its_corpus_changes(corpus):
+    engine = pcq.QueryEngine(corpus)
+    assert len(engine.get()[0]) == len(QUOTES)
+
+    with open(corpus, "a", encoding="utf-8") as fp:
+        fp.write(json.dumps({"text": "Dawn breaks over zebras.", "author": "D", "tags": []}) + "\n")
+    articles, _, _ = engine.get()
+    assert articles[-1]["text"] == "Dawn breaks over zebras."
+
+
+def test_artifact_articles_are_decoded_on_access():
+    records = index_store.load_index(pcq.INDEX_PATH).metadata
+    articles, _, mat = pcq.load_index_or_build()
+
+    # A view over the artifact's string pools, not a copied list
+    assert isinstance(articles, pcq.ArticleView)
+    assert len(articles) == len(records) == mat.shape[0]
+    for i in (0, len(records) - 1, -1):
+        m = records[i]
+        assert articles[i] == {"text": m["quote"], "author": m["author"], "tags": m["tags"]}
+    assert pcq.process_query_json("love", top_k=3)